@@ -3,12 +3,16 @@ import numpy as np
 from dataclasses import dataclass
 from typing import List, Tuple, Optional, Dict
 import os
+import time
 from tracker import CentroidTracker
 from camera_geometry import CameraProjector
 from calibration import load_calibration
-from detector_base import DetectorBase
-from detector_mediapipe import MediaPipeDetector
-from detector_yolov8 import YOLOv8Detector
+from detector_base import DetectorBase, as_detection_batch
+from detector_pool import create_detector
+from detector_handle import DetectorHandle
+from association import ASSOCIATION_METHODS
+from track_bank import unroll_history
+from frame_context import FrameBufferPool, as_frame_context
 
 @dataclass
 class AnalyticState:
@@ -17,58 +21,140 @@ class AnalyticState:
     currently_tracked: int = 0
     fps: float = 0.0
 
+@dataclass
+class RenderState:
+    """Copy of the tracker arrays published by analyze(), safe to draw from another thread"""
+    seq: int
+    frame_step: int  # source frames between the last two analyzed frames
+    ids: np.ndarray  # (n,)
+    centroids: np.ndarray  # (n, 2)
+    velocities: np.ndarray  # (n, 2) pixels per analyzed frame
+    bboxes: np.ndarray  # (n, 4) x1, y1, x2, y2
+    speeds: np.ndarray  # (n,) km/h
+    history: np.ndarray  # (n, H, 2) trail ring buffers, camera-compensated
+    history_head: np.ndarray  # (n,) next write slot of each ring
+    history_length: np.ndarray  # (n,) valid points in each trail
+    camera_offset: np.ndarray  # cumulative camera shift, added back at draw time
+    frame_size: Tuple[int, int] = (0, 0)  # width, height of the analyzed frame
+
+    @classmethod
+    def from_bank(cls, bank, seq: int, frame_step: int, frame_size=(0, 0)) -> "RenderState":
+        n = len(bank)
+        return cls(
+            seq=seq,
+            frame_step=frame_step,
+            ids=bank.ids[:n].copy(),
+            centroids=bank.centroids.copy(),
+            velocities=bank.velocities.copy(),
+            bboxes=bank.bboxes[:n].copy(),
+            speeds=bank.speed[:n].copy(),
+            history=bank.history[:n].copy(),
+            history_head=bank.history_head[:n].copy(),
+            history_length=bank.history_length[:n].copy(),
+            camera_offset=bank.camera_offset.copy(),
+            frame_size=frame_size
+        )
+
 class UrbanFlowAnalyzer:
-    def __init__(self, detector_type: str = "mediapipe", detector_settings: dict = None):
+    def __init__(self, detector_type: str = "mediapipe", detector_settings: dict = None,
+                 motion_settings: dict = None, detector_workers: int = 0,
+                 detector_handle: Optional[DetectorHandle] = None, scheduler=None,
+                 stream_id: str = "default"):
         """
         Initialize analyzer with specified detector
         
         Args:
-            detector_type: 'mediapipe' or 'yolov8'
+            detector_type: 'mediapipe', 'yolov8' or 'onnx'
             detector_settings: dict of detector-specific settings
+            motion_settings: camera motion estimator settings (see CameraMotionEstimator.from_settings)
+            detector_workers: > 0 runs detection in that many worker processes
+                              (use submit_frame/collect_frame instead of analyze)
+            detector_handle: detector shared with other analyzers (worker pools are
+                             shared per stream_id channel); built here if None
+            scheduler: this stream's InferenceClient of a shared InferenceScheduler;
+                       analyze() detects through it (overrides detector_handle)
+            stream_id: name of the stream this analyzer belongs to
         """
         # Initialize detector
-        self.detector_type = detector_type
-        self.detector = self._create_detector(detector_type, detector_settings or {})
+        self.detector_workers = detector_workers
+        self.stream_id = stream_id
+        self.scheduler = scheduler
+        if scheduler is not None:
+            self.detector_handle = scheduler.handle
+        elif detector_handle is not None:
+            self.detector_handle = detector_handle
+        else:
+            self.detector_handle = DetectorHandle(self._create_detector, detector_type, detector_settings)
+        # Only the owner of the detector may close the ones it replaced
+        self._owns_inference = scheduler is None
         
         from tracker_advanced import AdvancedTracker
         self.tracker = AdvancedTracker(max_disappeared=40, max_distance=100)
         
         from camera_motion import CameraMotionEstimator
-        self.motion_estimator = CameraMotionEstimator()
+        self.motion_estimator = CameraMotionEstimator.from_settings(motion_settings or {})
         
         self.state = AnalyticState()
+        self.render_state = None
+        
+        # Source frame rate; speed estimates are scaled by the analyzed frame step
+        self.source_fps = 25.0
+        # Latency of the last analyze() call and of detector.detect within it (seconds)
+        self.last_process_latency = 0.0
+        self.last_detect_latency = 0.0
+        self.last_track_latency = 0.0
+        # Detector pool: motion/frame size of frames handed to workers, by seq
+        self._pending_frames = {}
+        # Camera motion of frames the scheduler dropped, applied with the next tracked frame
+        self._dropped_shift = (0, 0)
         self.roi_polygon = None 
+        self._roi_cache = None  # (key, roi_pts, mask), see _get_roi
+        self._frame_pool = FrameBufferPool()  # reused conversion buffers (analyze thread only)
         self.calibration_matrix = None # Homography matrix
         
         # Initialize Projector with Defaults or Calibration
-        calib = load_calibration()
-        self.projector = CameraProjector(
-            fov_vertical=calib.cam_fov or 50.0,
-            cam_height=calib.cam_height or 15.0,
-            pitch_deg=calib.cam_pitch or -30.0
-        )
+        self.show_grid = True
+        self._grid_cache_key = None
+        self._grid_polylines = []
+        self.apply_calibration(load_calibration())
+    
+    @property
+    def detector(self) -> DetectorBase:
+        """What analyze() detects with: the shared scheduler, or the handle's current detector"""
+        if self.scheduler is not None:
+            return self.scheduler
+        return self.detector_handle.detector
+
+    @property
+    def detector_type(self) -> str:
+        return self.detector_handle.detector_type
+
+    @property
+    def detector_status(self) -> dict:
+        return self.detector_handle.status
     
     def _create_detector(self, detector_type: str, settings: dict) -> DetectorBase:
-        """Create detector instance based on type"""
-        if detector_type == "mediapipe":
-            return MediaPipeDetector(
-                score_threshold=settings.get('score_threshold', 0.25),
-                max_results=settings.get('max_results', 20)
-            )
-        elif detector_type == "yolov8":
-            return YOLOv8Detector(
-                confidence=settings.get('confidence', 0.25),
-                iou_threshold=settings.get('iou_threshold', 0.45),
-                model_size=settings.get('model_size', 'n')
-            )
-        else:
-            raise ValueError(f"Unknown detector type: {detector_type}")
+        """Create detector instance based on type (a worker pool when detector_workers > 0)"""
+        return create_detector(detector_type, settings, workers=self.detector_workers)
+    
+    def set_detector(self, detector_type: str, settings: dict = None, wait: bool = False) -> str:
+        """
+        Switch to a different detector (or apply new detector settings).
+        
+        Settings the current detector can apply in place (thresholds) are applied
+        immediately. Anything that needs a new model is built and warmed up on a
+        background thread while the old detector keeps running, then swapped in
+        (see DetectorHandle). Returns "updated" or "loading".
+        
+        Args:
+            wait: block until the new detector is ready (scripts and tests)
+        """
+        return self.detector_handle.set_detector(detector_type, settings, wait)
     
-    def set_detector(self, detector_type: str, settings: dict = None):
-        """Switch to a different detector"""
-        print(f"Switching detector to: {detector_type}")
-        self.detector_type = detector_type
-        self.detector = self._create_detector(detector_type, settings or {})
+    def _close_retired_detectors(self):
+        """Close detectors replaced by a swap once no frame can still be using them"""
+        if self._owns_inference:
+            self.detector_handle.close_retired()
 
     def update_settings(self, settings: dict):
         """Update tracker and detector settings"""
@@ -76,6 +162,12 @@ class UrbanFlowAnalyzer:
             self.tracker.max_distance = settings['maxDistance']
         if 'maxDisappeared' in settings:
             self.tracker.max_disappeared = settings['maxDisappeared']
+        if settings.get('showGrid') is not None:
+            self.show_grid = settings['showGrid']
+        if settings.get('associationMethod'):
+            if settings['associationMethod'] not in ASSOCIATION_METHODS:
+                raise ValueError(f"Unknown association method: {settings['associationMethod']}")
+            self.tracker.association = settings['associationMethod']
         
         # Propagate to detector if applicable
         if hasattr(self.detector, 'update_settings'):
@@ -83,122 +175,330 @@ class UrbanFlowAnalyzer:
 
     def update_roi(self, points: List[dict]):
         self.roi_polygon = [(int(p['x']), int(p['y'])) for p in points]
+
+    def _get_roi(self, w: int, h: int):
+        """
+        ROI polygon in pixels and its rasterized mask, built once per
+        (roi_polygon, frame size) and reused. Returns None without a valid ROI.
+        """
+        polygon = self.roi_polygon
+        if not polygon or len(polygon) <= 2:
+            return None
+        
+        key = (tuple(polygon), w, h)
+        cache = self._roi_cache
+        if cache is None or cache[0] != key:
+            roi_pts = np.array([[(p[0] * w // 100, p[1] * h // 100)] for p in polygon], dtype=np.int32)
+            mask = np.zeros((h, w), dtype=np.uint8)
+            cv2.fillPoly(mask, [roi_pts], 255)
+            # Single tuple assignment so the render thread never sees a mismatched pair
+            cache = self._roi_cache = (key, roi_pts, mask)
+        return cache[1], cache[2]
+
+    def _roi_contains(self, points: np.ndarray, w: int, h: int) -> np.ndarray:
+        """Boolean mask of which (N, 2) pixel points fall inside the ROI (all True without one)"""
+        roi = self._get_roi(w, h)
+        if roi is None:
+            return np.ones(len(points), dtype=bool)
+        xs = np.clip(points[:, 0], 0, w - 1)
+        ys = np.clip(points[:, 1], 0, h - 1)
+        return roi[1][ys, xs] != 0
         
     def update_calibration(self, matrix):
         self.calibration_matrix = matrix
 
-    def process_frame(self, frame: np.ndarray) -> Tuple[np.ndarray, AnalyticState]:
-        h_orig, w_orig = frame.shape[:2]
+    def apply_calibration(self, calib):
+        """Rebuild the ground projector from CalibrationSettings and drop the cached grid"""
+        # Swap in a new projector so the inference thread never sees half-updated params
+        self.projector = CameraProjector(
+            fov_vertical=calib.cam_fov or 50.0,
+            cam_height=calib.cam_height or 15.0,
+            pitch_deg=calib.cam_pitch or -30.0
+        )
+        self._grid_cache_key = None
+        self._grid_polylines = []
+
+    def analyze(self, frame, seq: Optional[int] = None) -> Optional[AnalyticState]:
+        """
+        Run motion estimation, detection and tracking on a frame.
+        Publishes a RenderState snapshot that render() can draw on any later frame.
+        Returns None if a shared scheduler dropped the frame (nothing was tracked).
+        
+        Args:
+            frame: BGR frame or FrameContext
+            seq: source frame number (used to extrapolate tracks on skipped frames)
+        """
+        start = time.perf_counter()
+        # The previous frame is done, so detectors swapped out before it can go
+        self._close_retired_detectors()
+        # Gray/RGB conversions are computed once here and shared by all consumers
+        ctx = as_frame_context(frame, self._frame_pool)
+        self.detector_handle.warmup_shape = ctx.shape
         
         # 1. Estimate Camera Motion
-        camera_shift = self.motion_estimator.estimate_motion(frame)
+        camera_shift = self.motion_estimator.estimate_motion(ctx)
         
         # 2. Run Detection using current detector
-        detected_objects = self.detector.detect(frame)
+        detect_start = time.perf_counter()
+        detected_objects = self.detector.detect_context(ctx)
+        self.last_detect_latency = time.perf_counter() - detect_start
+        if detected_objects is None:
+            self._drop_frame(camera_shift)
+            return None
+        
+        # 3. Filter and track
+        self._track(detected_objects, camera_shift, seq, ctx.width, ctx.height)
+
+        self.last_process_latency = time.perf_counter() - start
+        return self.state
+
+    def analyze_batch(self, frames, seqs) -> Optional[AnalyticState]:
+        """
+        analyze() for consecutive frames with one batched detector call.
+        Motion and tracking still run frame by frame, in order; the latency
+        attributes are per frame (batch time / len(frames)). Returns None if
+        a shared scheduler dropped every frame.
+        """
+        start = time.perf_counter()
+        self._close_retired_detectors()
+        # Contexts are consumed one after another, so they can share the buffer pool
+        contexts = [as_frame_context(frame, self._frame_pool) for frame in frames]
+        self.detector_handle.warmup_shape = contexts[-1].shape
+        camera_shifts = [self.motion_estimator.estimate_motion(ctx) for ctx in contexts]
         
-        detections = [] # List of ((cx, cy), bbox)
+        detect_start = time.perf_counter()
+        batch_detections = self.detector.detect_batch(contexts)
+        self.last_detect_latency = (time.perf_counter() - detect_start) / len(frames)
         
-        mask = None
-        if self.roi_polygon and len(self.roi_polygon) > 2:
-            mask = np.zeros((h_orig, w_orig), dtype=np.uint8)
-            roi_pts = np.array([[(p[0] * w_orig // 100, p[1] * h_orig // 100)] for p in self.roi_polygon], dtype=np.int32)
-            cv2.fillPoly(mask, [roi_pts], 255)
+        tracked = False
+        for ctx, camera_shift, detected_objects, seq in zip(contexts, camera_shifts, batch_detections, seqs):
+            if detected_objects is None:
+                self._drop_frame(camera_shift)
+                continue
+            self._track(detected_objects, camera_shift, seq, ctx.width, ctx.height)
+            tracked = True
 
-        for detection in detected_objects:
-            x, y, w, h = detection.bbox
-            cx, cy = detection.center
-            
-            # ROI Filter
-            if mask is not None:
-                if mask[min(cy, h_orig-1), min(cx, w_orig-1)] == 0:
-                    continue
+        self.last_process_latency = (time.perf_counter() - start) / len(frames)
+        return self.state if tracked else None
 
-            # Format for tracker: ((cx, cy), (x, y, x+w, y+h))
-            detections.append(((cx, cy), (x, y, x+w, y+h)))
-            
-        # Update tracker with Motion Compensation
-        # Pass projector for speed estimation
-        tracked_objects = self.tracker.update(detections, camera_shift, self.projector, w_orig, h_orig, fps=25)
+    def _drop_frame(self, camera_shift):
+        """The scheduler dropped this frame: keep its camera motion for the next tracked frame"""
+        self._dropped_shift = (self._dropped_shift[0] + camera_shift[0],
+                               self._dropped_shift[1] + camera_shift[1])
+
+    def submit_frame(self, frame, seq: int) -> bool:
+        """
+        Detector pool, step 1: estimate camera motion (must run in frame order)
+        and hand the frame to a detector worker. Returns False if it was dropped.
+        """
+        start = time.perf_counter()
+        ctx = as_frame_context(frame, self._frame_pool)
+        self.detector_handle.warmup_shape = ctx.shape
+        camera_shift = self.motion_estimator.estimate_motion(ctx)
         
-        annotated_frame = frame.copy()
+        # Registered before submitting: a fast worker may answer before submit() returns
+        self._pending_frames[seq] = (camera_shift, ctx.width, ctx.height, time.perf_counter() - start)
+        detector = self.detector
+        submitted = detector.submit(ctx.bgr, seq, channel=self.stream_id)
+        if not submitted and detector is not self.detector:
+            # The pool was swapped out and closed under us; use the new one
+            submitted = self.detector.submit(ctx.bgr, seq, channel=self.stream_id)
+        if not submitted:
+            self._pending_frames.pop(seq, None)
+        return submitted
+
+    def collect_frame(self, timeout: float = 0.1) -> Optional[AnalyticState]:
+        """
+        Detector pool, step 2: track the oldest submitted frame once its detections
+        are back. Returns None if none arrived within timeout.
+        """
+        # After a swap, frames still in flight on the old pool are older than
+        # anything on the new one, so they are collected first
+        self._close_retired_detectors()
+        # (other streams sharing the pool may still be draining it after this one)
+        detector = next((retired for retired in list(self.detector_handle.retired)
+                         if retired.pending(self.stream_id)), self.detector)
         
-        # Visualize Camera Motion (Optional Debug)
-        # if camera_shift != (0,0):
-        #     cv2.arrowedLine(annotated_frame, (w_orig//2, h_orig//2), 
-        #                     (int(w_orig//2 + camera_shift[0]), int(h_orig//2 + camera_shift[1])), (0, 0, 255), 2)
+        result = detector.next_result(timeout, channel=self.stream_id)
+        if result is None:
+            return None
+        seq, detected_objects, detect_latency = result
+        pending = self._pending_frames.pop(seq, None)
+        if pending is None:
+            return None
+        camera_shift, w, h, prepare_latency = pending
         
-        # Draw ROI overlay
-        if self.roi_polygon and len(self.roi_polygon) > 2:
-            roi_pts = np.array([[(p[0] * w_orig // 100, p[1] * h_orig // 100)] for p in self.roi_polygon], dtype=np.int32)
-            cv2.polylines(annotated_frame, [roi_pts], True, (0, 255, 0), 2)
+        start = time.perf_counter()
+        self._track(detected_objects, camera_shift, seq, w, h)
+        self.last_track_latency = time.perf_counter() - start
+        
+        # Workers detect concurrently, so a frame only costs 1/workers of a detection
+        self.last_detect_latency = detect_latency
+        self.last_process_latency = (prepare_latency + self.last_track_latency +
+                                     detect_latency / detector.workers)
+        return self.state
+
+    def _track(self, detected_objects, camera_shift, seq: Optional[int], w_orig: int, h_orig: int):
+        """ROI filter, tracker update and RenderState snapshot for one analyzed frame"""
+        if self._dropped_shift != (0, 0):
+            # The tracker has not seen the background move during dropped frames
+            camera_shift = (camera_shift[0] + self._dropped_shift[0],
+                            camera_shift[1] + self._dropped_shift[1])
+            self._dropped_shift = (0, 0)
+        # Detections stay in arrays from the detector to the tracker
+        detections = as_detection_batch(detected_objects)
+        
+        # ROI Filter: one vectorized lookup of every detection center in the cached mask
+        if len(detections):
+            detections = detections.select(self._roi_contains(detections.centers, w_orig, h_orig))
+            
+        # Source frames since the last analyzed frame (varies with adaptive skipping)
+        if seq is None:
+            seq = (self.render_state.seq + 1) if self.render_state else 0
+        frame_step = max(1, seq - self.render_state.seq) if self.render_state else 1
+        
+        # Update tracker with Motion Compensation
+        # Pass projector for speed estimation; tracker steps happen every frame_step source frames
+        tracked_objects = self.tracker.update(detections, camera_shift, self.projector, w_orig, h_orig,
+                                              fps=self.source_fps / frame_step)
         
         # Filter logic: Count IN vs OUT based on ROI?
         # For now, just count tracked objects
         self.state.currently_tracked = len(tracked_objects)
+        
+        # Snapshot tracker state for the render step (may run on another thread)
+        self.render_state = RenderState.from_bank(self.tracker.bank, seq, frame_step, (w_orig, h_orig))
 
+    def render(self, frame: np.ndarray, render_state: Optional["RenderState"] = None,
+               seq: Optional[int] = None, canvas: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Draw overlays (ROI, tracks, grid, mode) on the frame.
+        
+        Args:
+            frame: BGR frame to annotate
+            render_state: tracker snapshot to draw, defaults to the latest one
+            seq: frame number of `frame`; when it is newer than the snapshot, tracks
+                 are moved along their Kalman velocity so boxes stay on the targets
+            canvas: where to draw. `frame` itself draws in place (only when no other
+                    stage reads the frame), another array of the same shape is
+                    overwritten with the frame first, None allocates a copy.
+        """
+        h_orig, w_orig = frame.shape[:2]
+        if render_state is None:
+            render_state = self.render_state
+        
+        if canvas is None:
+            annotated_frame = frame.copy()
+        elif canvas is frame:
+            annotated_frame = frame
+        else:
+            np.copyto(canvas, frame)
+            annotated_frame = canvas
+        
+        # Frames elapsed since the snapshot, capped so stale tracks don't fly off
+        steps = 0
+        if render_state is not None and seq is not None:
+            steps = min(max(seq - render_state.seq, 0), 2 * render_state.frame_step)
+        
+        # Draw ROI overlay
+        roi = self._get_roi(w_orig, h_orig)
+        if roi is not None:
+            cv2.polylines(annotated_frame, [roi[0]], True, (0, 255, 0), 2)
         
         # Draw Objects
-        for obj_id, obj in tracked_objects.items():
-            cx, cy = int(obj.centroid[0]), int(obj.centroid[1])
+        if render_state is not None and len(render_state.ids):
+            # Constant-velocity prediction; velocity is per analyzed frame
+            offsets = render_state.velocities * (steps / render_state.frame_step)
+            centers = (render_state.centroids + offsets).astype(np.int32)
+            boxes = (render_state.bboxes + np.tile(offsets.astype(np.int32), 2)).astype(np.int32)
+            trails = unroll_history(render_state.history, render_state.history_head,
+                                    render_state.camera_offset)
+            history_size = trails.shape[1]
             
-            # Draw trail
-            if len(obj.history) > 1:
-                pts = np.array(obj.history, np.int32)
-                pts = pts.reshape((-1, 1, 2))
-                cv2.polylines(annotated_frame, [pts], False, (0, 255, 255), 2)
-            
-            # Draw BBox
-            if obj.bbox:
-                bx1, by1, bx2, by2 = obj.bbox
-                cv2.rectangle(annotated_frame, (bx1, by1), (bx2, by2), (0, 255, 0), 2)
+            for i, obj_id in enumerate(render_state.ids):
+                cx, cy = int(centers[i, 0]), int(centers[i, 1])
                 
-            # Speed Calculation
-            real_speed_kmh = getattr(obj, 'current_speed', 0.0)
-            
-            # Draw ID
-            cv2.putText(annotated_frame, f"ID: {obj_id}", (cx - 10, cy - 25),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-                        
-            # Draw Speed
-            speed_text = f"{real_speed_kmh:.1f} km/h"
-            cv2.putText(annotated_frame, speed_text, (cx - 20, cy - 10),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
-                        
-            cv2.circle(annotated_frame, (cx, cy), 4, (0, 255, 0), -1)
+                # Draw trail
+                length = render_state.history_length[i]
+                if length > 1:
+                    pts = trails[i, history_size - length:].reshape((-1, 1, 2))
+                    cv2.polylines(annotated_frame, [pts], False, (0, 255, 255), 2)
+                
+                # Draw BBox
+                bx1, by1, bx2, by2 = boxes[i]
+                cv2.rectangle(annotated_frame, (int(bx1), int(by1)), (int(bx2), int(by2)), (0, 255, 0), 2)
+                
+                # Draw ID
+                cv2.putText(annotated_frame, f"ID: {obj_id}", (cx - 10, cy - 25),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
+                            
+                # Draw Speed
+                speed_text = f"{render_state.speeds[i]:.1f} km/h"
+                cv2.putText(annotated_frame, speed_text, (cx - 20, cy - 10),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+                            
+                cv2.circle(annotated_frame, (cx, cy), 4, (0, 255, 0), -1)
 
         # Draw Calibration Grid Helper (for ground plane verification)
-        self._draw_ground_grid(annotated_frame)
+        if self.show_grid:
+            self._draw_ground_grid(annotated_frame)
         
         # Draw Model Status Overlay
         cv2.putText(annotated_frame, f"MODE: {self.detector_type.upper()}", (20, 40),
                     cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 255), 2)
 
-        return annotated_frame, self.state
+        return annotated_frame
+
+    def process_frame(self, frame: np.ndarray) -> Tuple[np.ndarray, AnalyticState]:
+        """Analyze and annotate a single frame"""
+        # analyze() returns None for a dropped frame; the last state still holds
+        self.analyze(frame)
+        return self.render(frame), self.state
 
     def _draw_ground_grid(self, frame):
         """Draws a perspective-mapped grid on the floor for calibration verification"""
         h, w = frame.shape[:2]
         color = (0, 80, 0) # Subtle Dark Green
         
+        # The projected grid only depends on frame size and calibration
+        projector = self.projector
+        key = (w, h, projector.fov_v, projector.h, projector.pitch, projector.yaw)
+        if key != self._grid_cache_key:
+            self._grid_polylines = self._project_ground_grid(projector, w, h)
+            self._grid_cache_key = key
+        
+        if self._grid_polylines:
+            cv2.polylines(frame, self._grid_polylines, False, color, 1)
+
+    @staticmethod
+    def _project_ground_grid(projector, w, h):
+        """Project the 5 m ground grid once; returns the visible runs as int32 polylines"""
         # Grid range (meters)
         min_x, max_x = -20, 20
         min_z, max_z = 0, 50
         step = 5 # 5 meter steps
         
-        # Draw lines along Z (forward)
-        for x in range(min_x, max_x + 1, step):
-            prev_p = None
-            for z in range(min_z, max_z + 1, 1):
-                p = self.projector.ground_to_pixel(x, z, w, h)
-                if p and prev_p:
-                    cv2.line(frame, prev_p, p, color, 1)
-                prev_p = p
-        
-        # Draw lines along X (sideways)
-        for z in range(min_z, max_z + 1, step):
-            prev_p = None
-            for x in range(min_x, max_x + 1, 1):
-                p = self.projector.ground_to_pixel(x, z, w, h)
-                if p and prev_p:
-                    cv2.line(frame, prev_p, p, color, 1)
-                prev_p = p
+        # Project every grid vertex in one call: rows are lines along Z, then lines along X
+        xs = np.arange(min_x, max_x + 1, step)
+        zs = np.arange(min_z, max_z + 1, 1)
+        z_lines = np.stack(np.meshgrid(xs, zs, indexing="ij"), axis=-1)  # (len(xs), len(zs), 2)
+        zs_step = np.arange(min_z, max_z + 1, step)
+        xs_fine = np.arange(min_x, max_x + 1, 1)
+        x_lines = np.stack(np.meshgrid(xs_fine, zs_step, indexing="xy"), axis=-1)  # (len(zs_step), len(xs_fine), 2)
+        
+        n_z = z_lines.shape[0] * z_lines.shape[1]
+        pixels, valid = projector.ground_to_pixels(
+            np.concatenate([z_lines.reshape(-1, 2), x_lines.reshape(-1, 2)]), w, h)
+        
+        # Split each grid line into runs of consecutive visible vertices
+        polylines = []
+        for lines, line_pixels, line_valid in ((z_lines, pixels[:n_z], valid[:n_z]),
+                                               (x_lines, pixels[n_z:], valid[n_z:])):
+            line_pixels = line_pixels.reshape(lines.shape[0], lines.shape[1], 2)
+            line_valid = line_valid.reshape(lines.shape[0], lines.shape[1])
+            for line_pts, visible in zip(line_pixels, line_valid):
+                edges = np.diff(np.concatenate([[0], visible.astype(np.int8), [0]]))
+                for run_start, run_end in zip(np.nonzero(edges == 1)[0], np.nonzero(edges == -1)[0]):
+                    if run_end - run_start > 1:
+                        polylines.append(line_pts[run_start:run_end].reshape(-1, 1, 2).copy())
+        return polylines
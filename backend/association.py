@@ -0,0 +1,170 @@
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+def greedy_assignment(cost, max_cost):
+    """
+    Greedy row-min matching (the trackers' original strategy).
+    Rows are visited in order of their best cost; each takes its argmin
+    column if that column is still free and the cost is within max_cost.
+
+    Returns:
+        (rows, cols) integer arrays of matched pairs
+    """
+    cost = np.asarray(cost)
+    if cost.size == 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+
+    rows = cost.min(axis=1).argsort()
+    cols = cost.argmin(axis=1)[rows]
+
+    used_rows = set()
+    used_cols = set()
+    matches = []
+    for (row, col) in zip(rows, cols):
+        if row in used_rows or col in used_cols:
+            continue
+        if cost[row, col] > max_cost:
+            continue
+        used_rows.add(row)
+        used_cols.add(col)
+        matches.append((row, col))
+
+    if not matches:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    matched = np.array(matches, dtype=np.intp)
+    return matched[:, 0], matched[:, 1]
+
+def greedy_assignment_sparse(rows, cols, costs, max_cost):
+    """
+    greedy_assignment on candidate pairs only: (rows[i], cols[i]) costs costs[i],
+    every pair not listed is out of reach. Gives the same matches as the dense
+    version when all pairs within max_cost are listed.
+    """
+    empty = (np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp))
+    keep = costs <= max_cost
+    rows, cols, costs = rows[keep], cols[keep], costs[keep]
+    if len(rows) == 0:
+        return empty
+
+    # Best column of each row (lowest cost, then lowest column like argmin)
+    order = np.lexsort((cols, costs, rows))
+    rows, cols, costs = rows[order], cols[order], costs[order]
+    first = np.ones(len(rows), dtype=bool)
+    first[1:] = rows[1:] != rows[:-1]
+    best_rows, best_cols, best_costs = rows[first], cols[first], costs[first]
+
+    by_cost = best_costs.argsort(kind="stable")
+    used_cols = set()
+    matches = []
+    for row, col in zip(best_rows[by_cost], best_cols[by_cost]):
+        if col in used_cols:
+            continue
+        used_cols.add(col)
+        matches.append((row, col))
+
+    matched = np.array(matches, dtype=np.intp)
+    return matched[:, 0], matched[:, 1]
+
+def hungarian_assignment(cost, max_cost):
+    """
+    Optimal (minimum total cost) matching restricted to pairs within max_cost.
+
+    The gated pairs form a sparse bipartite graph. Each connected component
+    is solved on its own with linear_sum_assignment, so a crowd of 1000
+    people becomes many tiny problems instead of one 1000x1000 solve.
+    Isolated one-to-one pairs are matched directly without calling the solver.
+
+    Returns:
+        (rows, cols) integer arrays of matched pairs
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    if cost.size == 0:
+        return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+    edge_rows, edge_cols = np.nonzero(cost <= max_cost)
+    return hungarian_assignment_sparse(edge_rows, edge_cols, cost[edge_rows, edge_cols],
+                                       cost.shape, max_cost)
+
+def hungarian_assignment_sparse(rows, cols, costs, shape, max_cost):
+    """
+    hungarian_assignment on candidate pairs only: (rows[i], cols[i]) costs costs[i]
+    in a `shape` cost matrix, every pair not listed is out of reach.
+    """
+    empty = (np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp))
+    keep = costs <= max_cost
+    edge_rows, edge_cols = rows[keep].astype(np.intp), cols[keep].astype(np.intp)
+    edge_costs = np.asarray(costs[keep], dtype=np.float64)
+    if len(edge_rows) == 0:
+        return empty
+
+    n_rows, n_cols = shape
+
+    # Bipartite graph: nodes [0, n_rows) are tracks, [n_rows, n_rows + n_cols) detections
+    n_nodes = n_rows + n_cols
+    graph = coo_matrix((np.ones(len(edge_rows), dtype=np.int8), (edge_rows, edge_cols + n_rows)),
+                       shape=(n_nodes, n_nodes))
+    _, labels = connected_components(graph, directed=False)
+
+    # Only components that own at least one gated edge matter
+    edge_labels = labels[edge_rows]
+    row_labels = labels[:n_rows]
+    col_labels = labels[n_rows:]
+    rows_per_label = np.bincount(row_labels, minlength=n_nodes)
+    cols_per_label = np.bincount(col_labels, minlength=n_nodes)
+
+    # Fast path: a component with exactly one track and one detection is a forced match
+    simple = (rows_per_label[edge_labels] == 1) & (cols_per_label[edge_labels] == 1)
+    out_rows = [edge_rows[simple]]
+    out_cols = [edge_cols[simple]]
+
+    # Everything else goes through the solver, one component at a time
+    row_order = np.argsort(row_labels, kind="stable")
+    col_order = np.argsort(col_labels, kind="stable")
+    edge_order = np.argsort(edge_labels, kind="stable")
+    row_starts = np.searchsorted(row_labels[row_order], np.arange(n_nodes + 1))
+    col_starts = np.searchsorted(col_labels[col_order], np.arange(n_nodes + 1))
+    edge_starts = np.searchsorted(edge_labels[edge_order], np.arange(n_nodes + 1))
+    # Position of each track / detection inside its component's sub-matrix
+    local_row = np.empty(n_rows, dtype=np.intp)
+    local_col = np.empty(n_cols, dtype=np.intp)
+
+    blocked = max_cost * 10 + 1e6  # never chosen over a gated pair
+    for label in np.unique(edge_labels[~simple]):
+        comp_rows = row_order[row_starts[label]:row_starts[label + 1]]
+        comp_cols = col_order[col_starts[label]:col_starts[label + 1]]
+        comp_edges = edge_order[edge_starts[label]:edge_starts[label + 1]]
+        local_row[comp_rows] = np.arange(len(comp_rows))
+        local_col[comp_cols] = np.arange(len(comp_cols))
+
+        sub = np.full((len(comp_rows), len(comp_cols)), blocked)
+        sub[local_row[edge_rows[comp_edges]], local_col[edge_cols[comp_edges]]] = edge_costs[comp_edges]
+        r, c = linear_sum_assignment(sub)
+
+        keep = sub[r, c] <= max_cost
+        out_rows.append(comp_rows[r[keep]])
+        out_cols.append(comp_cols[c[keep]])
+
+    return np.concatenate(out_rows).astype(np.intp), np.concatenate(out_cols).astype(np.intp)
+
+ASSOCIATION_METHODS = {
+    "greedy": greedy_assignment,
+    "hungarian": hungarian_assignment,
+}
+
+SPARSE_ASSOCIATION_METHODS = {
+    "greedy": lambda rows, cols, costs, shape, max_cost: greedy_assignment_sparse(rows, cols, costs, max_cost),
+    "hungarian": hungarian_assignment_sparse,
+}
+
+def associate(cost, max_cost, method="greedy"):
+    """Match rows to columns of a cost matrix using the named backend"""
+    if method not in ASSOCIATION_METHODS:
+        raise ValueError(f"Unknown association method: {method}")
+    return ASSOCIATION_METHODS[method](cost, max_cost)
+
+def associate_sparse(rows, cols, costs, shape, max_cost, method="greedy"):
+    """associate() on candidate pairs (rows[i], cols[i], costs[i]) of a `shape` cost matrix"""
+    if method not in SPARSE_ASSOCIATION_METHODS:
+        raise ValueError(f"Unknown association method: {method}")
+    return SPARSE_ASSOCIATION_METHODS[method](rows, cols, costs, shape, max_cost)
@@ -0,0 +1,53 @@
+import time
+import numpy as np
+from scipy.spatial import distance as dist
+from association import greedy_assignment, hungarian_assignment
+
+def synthetic_crowd(n, rng, density=2500.0, step=6.0, noise=4.0, miss_rate=0.05):
+    """
+    Tracks on a plaza sized so there are ~`density` px^2 per person, and
+    detections one frame later (random walk + jitter, some missed detections).
+    Returns the (tracks, detections) centroids and the true detection->track index.
+    """
+    side = np.sqrt(n * density)
+    tracks = rng.uniform(0, side, (n, 2))
+    moved = tracks + rng.normal(0, step, (n, 2)) + rng.normal(0, noise, (n, 2))
+
+    keep = rng.random(n) > miss_rate
+    truth = np.nonzero(keep)[0]
+    detections = moved[keep]
+
+    order = rng.permutation(len(detections))
+    return tracks, detections[order], truth[order]
+
+def accuracy(rows, cols, truth):
+    if len(rows) == 0:
+        return 0.0
+    return float(np.mean(truth[cols] == rows))
+
+def run_benchmark(sizes=(10, 100, 250, 500, 1000), max_distance=25.0, repeat=5):
+    rng = np.random.default_rng(0)
+
+    print(f"{'N':>6} {'greedy ms':>10} {'greedy acc':>11} {'hungarian ms':>13} {'hungarian acc':>14}")
+    for n in sizes:
+        t_greedy = t_hungarian = 0.0
+        acc_greedy = acc_hungarian = 0.0
+        for _ in range(repeat):
+            tracks, detections, truth = synthetic_crowd(n, rng)
+            D = dist.cdist(tracks, detections)
+
+            start = time.perf_counter()
+            rows, cols = greedy_assignment(D, max_distance)
+            t_greedy += time.perf_counter() - start
+            acc_greedy += accuracy(rows, cols, truth)
+
+            start = time.perf_counter()
+            rows, cols = hungarian_assignment(D, max_distance)
+            t_hungarian += time.perf_counter() - start
+            acc_hungarian += accuracy(rows, cols, truth)
+
+        print(f"{n:>6} {t_greedy / repeat * 1000:>10.2f} {acc_greedy / repeat:>11.3f} "
+              f"{t_hungarian / repeat * 1000:>13.2f} {acc_hungarian / repeat:>14.3f}")
+
+if __name__ == "__main__":
+    run_benchmark()
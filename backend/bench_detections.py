@@ -0,0 +1,55 @@
+import time
+import numpy as np
+from detector_base import Detection, DetectionBatch
+
+def list_path(detections, mask_image):
+    """Old path: Detection objects -> centers array -> tuples -> tracker arrays"""
+    h, w = mask_image.shape
+    centers = np.array([d.center for d in detections], dtype=np.int32).reshape(-1, 2)
+    inside = mask_image[np.clip(centers[:, 1], 0, h - 1), np.clip(centers[:, 0], 0, w - 1)] != 0
+    tuples = [((d.center[0], d.center[1]),
+               (d.bbox[0], d.bbox[1], d.bbox[0] + d.bbox[2], d.bbox[1] + d.bbox[3]))
+              for d, keep in zip(detections, inside) if keep]
+    centroids = np.array([t[0] for t in tuples], dtype=np.float32)
+    bboxes = np.array([t[1] for t in tuples], dtype=np.float32)
+    return centroids, bboxes
+
+def batch_path(batch, mask_image):
+    """DetectionBatch: arrays from detector to tracker"""
+    h, w = mask_image.shape
+    centers = batch.centers
+    inside = mask_image[np.clip(centers[:, 1], 0, h - 1), np.clip(centers[:, 0], 0, w - 1)] != 0
+    batch = batch.select(inside)
+    return batch.centers.astype(np.float32), batch.xyxy
+
+def run_benchmark(sizes=(10, 100, 500), repeat=200):
+    rng = np.random.default_rng(0)
+    mask_image = np.zeros((1080, 1920), np.uint8)
+    mask_image[300:] = 255
+
+    print(f"{'boxes':>6} {'list us':>9} {'batch us':>9} {'speedup':>8}")
+    for n in sizes:
+        xy = rng.integers(0, 1800, (n, 2))
+        wh = rng.integers(10, 120, (n, 2))
+        boxes = np.hstack([xy, wh])
+        scores = rng.random(n)
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            # Building the objects is part of the old detector output cost
+            detections = [Detection(bbox=tuple(int(v) for v in b), category='person', score=float(s),
+                                    center=(int(b[0] + b[2] // 2), int(b[1] + b[3] // 2)))
+                          for b, s in zip(boxes, scores)]
+            old = list_path(detections, mask_image)
+        t_list = (time.perf_counter() - start) / repeat * 1e6
+
+        start = time.perf_counter()
+        for _ in range(repeat):
+            new = batch_path(DetectionBatch(boxes, scores), mask_image)
+        t_batch = (time.perf_counter() - start) / repeat * 1e6
+
+        assert np.array_equal(old[0], new[0]) and np.array_equal(old[1], new[1])
+        print(f"{n:>6} {t_list:>9.1f} {t_batch:>9.1f} {t_list / t_batch:>7.1f}x")
+
+if __name__ == "__main__":
+    run_benchmark()
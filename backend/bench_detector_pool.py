@@ -0,0 +1,74 @@
+import sys
+import threading
+import time
+import cv2
+import numpy as np
+from detector_pool import DetectorPool, create_detector
+
+def load_frames(source, count, size=(1920, 1080)):
+    """Frames from a video file, or random noise when no file is given"""
+    if source:
+        cap = cv2.VideoCapture(source)
+        frames = []
+        while len(frames) < count:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            frames.append(frame)
+        cap.release()
+        if frames:
+            return frames
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 255, (size[1], size[0], 3), np.uint8) for _ in range(count)]
+
+def bench_inline(detector_type, frames):
+    detector = create_detector(detector_type, {})
+    detector.detect(frames[0])  # warm up
+    start = time.perf_counter()
+    for frame in frames:
+        detector.detect(frame)
+    return len(frames) / (time.perf_counter() - start)
+
+def bench_pool(detector_type, frames, workers):
+    pool = DetectorPool(detector_type, {}, workers=workers)
+    try:
+        # Warm up every worker (model loading happens in the background)
+        for frame in frames[:workers]:
+            pool.submit(frame, -1)
+        for _ in range(workers):
+            pool.next_result()
+
+        received = []
+        def collect():
+            while len(received) < len(frames):
+                result = pool.next_result(timeout=1.0)
+                if result is not None:
+                    received.append(result[0])
+
+        start = time.perf_counter()
+        collector = threading.Thread(target=collect)
+        collector.start()
+        for seq, frame in enumerate(frames):
+            pool.submit(frame, seq)
+        collector.join()
+        elapsed = time.perf_counter() - start
+
+        assert received == list(range(len(frames))), "results out of order"
+        return len(frames) / elapsed
+    finally:
+        pool.close()
+
+def run_benchmark(detector_type="yolov8", source=None, frames=100, worker_counts=(1, 2, 4, 8)):
+    frames = load_frames(source, frames)
+    print(f"{detector_type}, {len(frames)} frames of {frames[0].shape[1]}x{frames[0].shape[0]}")
+    inline = bench_inline(detector_type, frames)
+    print(f"{'workers':>8} {'fps':>8} {'speedup':>8}")
+    print(f"{'inline':>8} {inline:>8.1f} {1.0:>7.2f}x")
+    for workers in worker_counts:
+        fps = bench_pool(detector_type, frames, workers)
+        print(f"{workers:>8} {fps:>8.1f} {fps / inline:>7.2f}x")
+
+if __name__ == "__main__":
+    # python bench_detector_pool.py [mediapipe|yolov8] [video_file]
+    run_benchmark(sys.argv[1] if len(sys.argv) > 1 else "yolov8",
+                  sys.argv[2] if len(sys.argv) > 2 else None)
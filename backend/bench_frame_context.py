@@ -0,0 +1,77 @@
+import time
+import tracemalloc
+import cv2
+import numpy as np
+from camera_motion import CameraMotionEstimator
+from frame_context import FrameBufferPool, FrameContext
+
+def legacy_conversions(frame, motion_scale):
+    """What each consumer did on its own before: gray for motion, RGB for detection, copy for drawing"""
+    h, w = frame.shape[:2]
+    small = cv2.resize(frame, (int(w * motion_scale), int(h * motion_scale)), interpolation=cv2.INTER_LINEAR)
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    annotated = frame.copy()
+    return gray, rgb, annotated
+
+def shared_conversions(frame, motion_scale, pool, canvas):
+    """Same outputs through one FrameContext and pooled buffers"""
+    ctx = FrameContext(frame, pool)
+    gray = ctx.gray(motion_scale)
+    rgb = ctx.rgb()
+    np.copyto(canvas, frame)
+    return gray, rgb, canvas
+
+def allocated_mb(convert, frames_in, frames=20):
+    """Mean MB newly allocated per call (tracemalloc peak above what was already held)"""
+    tracemalloc.start()
+    total = 0
+    for i in range(frames):
+        held = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        outputs = convert(frames_in[i % len(frames_in)])
+        total += tracemalloc.get_traced_memory()[1] - held
+        del outputs
+    tracemalloc.stop()
+    return total / frames / 1e6
+
+def run_benchmark(resolutions=((1920, 1080), (3840, 2160)), frames=100, motion_scale=0.25):
+    rng = np.random.default_rng(0)
+    print(f"{'size':>10} {'legacy ms':>10} {'shared ms':>10} {'speedup':>8} {'legacy MB/frame':>16} {'shared MB/frame':>16}")
+    for w, h in resolutions:
+        frames_in = [rng.integers(0, 255, (h, w, 3), np.uint8) for _ in range(4)]
+        pool = FrameBufferPool()
+        canvas = np.empty_like(frames_in[0])
+
+        # Warm up both paths (first shared call allocates the pool buffers)
+        legacy_conversions(frames_in[0], motion_scale)
+        shared_conversions(frames_in[0], motion_scale, pool, canvas)
+
+        start = time.perf_counter()
+        for i in range(frames):
+            outputs = legacy_conversions(frames_in[i % 4], motion_scale)
+        legacy = (time.perf_counter() - start) / frames * 1000
+
+        start = time.perf_counter()
+        for i in range(frames):
+            shared_conversions(frames_in[i % 4], motion_scale, pool, canvas)
+        shared = (time.perf_counter() - start) / frames * 1000
+
+        # Measured outside the timed loops: tracemalloc slows every allocation
+        legacy_mb = allocated_mb(lambda frame: legacy_conversions(frame, motion_scale), frames_in)
+        shared_mb = allocated_mb(lambda frame: shared_conversions(frame, motion_scale, pool, canvas), frames_in)
+        size = f"{w}x{h}"
+        print(f"{size:>10} {legacy:>10.2f} {shared:>10.2f} {legacy / shared:>7.2f}x {legacy_mb:>16.2f} {shared_mb:>16.4f}")
+
+    # Sanity check: the estimator gives the same shift from a context as from the raw frame
+    frame = rng.integers(0, 255, (1080, 1920, 3), np.uint8)
+    moved = np.roll(frame, 8, axis=1)
+    raw = CameraMotionEstimator(fast=True)
+    shared = CameraMotionEstimator(fast=True)
+    pool = FrameBufferPool()
+    raw.estimate_motion(frame)
+    shared.estimate_motion(FrameContext(frame, pool))
+    print("motion raw:", raw.estimate_motion(moved), "context:", shared.estimate_motion(FrameContext(moved, pool)))
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,45 @@
+import time
+import numpy as np
+from tracker_advanced import AdvancedTracker, iou_matrix, giou_matrix
+
+def random_boxes(n, rng, width=1920, height=1080):
+    x1 = rng.uniform(0, width - 80, n)
+    y1 = rng.uniform(0, height - 160, n)
+    w = rng.uniform(20, 80, n)
+    h = rng.uniform(40, 160, n)
+    return np.stack([x1, y1, x1 + w, y1 + h], axis=1).astype(np.float32)
+
+def scalar_iou(tracker, boxes_a, boxes_b):
+    """The original per-pair Python loop"""
+    D = np.zeros((len(boxes_a), len(boxes_b)), dtype=np.float32)
+    for i in range(len(boxes_a)):
+        for j in range(len(boxes_b)):
+            D[i, j] = 1.0 - tracker._calculate_iou(boxes_a[i], boxes_b[j])
+    return D
+
+def time_it(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+def run_benchmark(sizes=(10, 100, 500)):
+    rng = np.random.default_rng(0)
+    tracker = AdvancedTracker()
+
+    print(f"{'N=M':>6} {'scalar ms':>12} {'iou ms':>10} {'giou ms':>10} {'speedup':>9}")
+    for n in sizes:
+        a = random_boxes(n, rng)
+        b = random_boxes(n, rng)
+
+        # Both paths must agree before we compare their speed
+        assert np.allclose(scalar_iou(tracker, a[:20], b[:20]), 1.0 - iou_matrix(a[:20], b[:20]), atol=1e-5)
+
+        scalar_repeat = max(1, 2000 // (n * n) + 1)
+        t_scalar = time_it(lambda: scalar_iou(tracker, a, b), scalar_repeat)
+        t_iou = time_it(lambda: iou_matrix(a, b), 20)
+        t_giou = time_it(lambda: giou_matrix(a, b), 20)
+        print(f"{n:>6} {t_scalar:>12.3f} {t_iou:>10.3f} {t_giou:>10.3f} {t_scalar / t_iou:>8.1f}x")
+
+if __name__ == "__main__":
+    run_benchmark()
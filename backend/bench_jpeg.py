@@ -0,0 +1,45 @@
+import sys
+import time
+import cv2
+from bench_overlay import load_frames
+from jpeg_encoder import JpegEncoder, Rendition, RenditionEncoder
+
+def bench(frames, encode):
+    encode(frames[0])  # warm up
+    start = time.perf_counter()
+    for frame in frames:
+        encode(frame)
+    return (time.perf_counter() - start) / len(frames) * 1000
+
+def watched(encoder: RenditionEncoder, names):
+    """Pretend one client watches each named rendition"""
+    for rendition in encoder.renditions:
+        rendition.hub.clients = 1 if rendition.name in names else 0
+    return encoder
+
+def run_benchmark(source=None, size=(1920, 1080), frames=60):
+    frames_in = load_frames(source, frames, size)
+    backends = ["opencv"]
+    if JpegEncoder("auto").backend == "turbojpeg":
+        backends.append("turbojpeg")
+    else:
+        print("PyTurboJPEG not installed, OpenCV only")
+
+    # Baseline: what the encode stage did before (full size, OpenCV default quality 95)
+    baseline = bench(frames_in, lambda frame: cv2.imencode('.jpg', frame))
+    print(f"{size[0]}x{size[1]} source, baseline cv2.imencode: {baseline:.2f} ms/frame")
+
+    cases = [("full", ["full"]), ("preview", ["preview"]), ("thumbnail", ["thumbnail"]),
+             ("preview+thumbnail", ["preview", "thumbnail"]), ("all three", ["full", "preview", "thumbnail"]),
+             ("no clients", [])]
+    print(f"{'backend':>10} {'watched renditions':>20} {'ms/frame':>9} {'vs baseline':>12} {'KB/frame':>9}")
+    for backend in backends:
+        for label, names in cases:
+            encoder = watched(RenditionEncoder([Rendition("full", None, 80), Rendition("preview", 960, 70),
+                                                Rendition("thumbnail", 320, 60)], JpegEncoder(backend)), names)
+            ms = bench(frames_in, encoder.publish)
+            size_kb = sum(len(r.hub.latest_chunk or b"") for r in encoder.renditions if r.name in names) / 1024
+            print(f"{backend:>10} {label:>20} {ms:>9.2f} {baseline / ms if ms else float('inf'):>11.1f}x {size_kb:>9.1f}")
+
+if __name__ == "__main__":
+    run_benchmark(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,69 @@
+import json
+import sys
+import time
+import cv2
+import numpy as np
+from camera_motion import CameraMotionEstimator
+from frame_context import FrameBufferPool, FrameContext
+
+def panning_scene(size=(1920, 1080), frames=120, pan=(3, 1), walkers=40, seed=0):
+    """
+    Frames of a camera panning over a textured street at `pan` px/frame, with
+    `walkers` people-sized blobs moving on their own. Returns (frames, true scene shift).
+    """
+    rng = np.random.default_rng(seed)
+    w, h = size
+    world_w, world_h = w + abs(pan[0]) * frames + 1, h + abs(pan[1]) * frames + 1
+    world = np.zeros((world_h, world_w, 3), np.uint8)
+    world[:] = np.linspace(60, 200, world_h, dtype=np.uint8)[:, None, None]
+    for _ in range(world_w * world_h // 8000):
+        x, y = int(rng.integers(0, world_w)), int(rng.integers(0, world_h))
+        cv2.rectangle(world, (x, y), (x + int(rng.integers(8, 120)), y + int(rng.integers(8, 120))),
+                      tuple(int(c) for c in rng.integers(0, 255, 3)), -1)
+    world = cv2.GaussianBlur(world, (3, 3), 0)
+
+    starts = rng.uniform((0, 0), (w, h), (walkers, 2))
+    velocities = rng.uniform(-6, 6, (walkers, 2))
+    colors = rng.integers(0, 255, (walkers, 3))
+    out = []
+    for i in range(frames):
+        x0, y0 = i * pan[0] - min(0, pan[0]) * frames, i * pan[1] - min(0, pan[1]) * frames
+        frame = world[y0:y0 + h, x0:x0 + w].copy()
+        for (x, y), color in zip(starts + velocities * i, colors):
+            cv2.rectangle(frame, (int(x), int(y)), (int(x) + 30, int(y) + 80), tuple(int(c) for c in color), -1)
+        out.append(frame)
+    return out, (-pan[0], -pan[1])
+
+def bench(estimator, frames):
+    """ms per estimate_motion call (on a FrameContext, as in the analyzer) and the mean estimate"""
+    pool = FrameBufferPool()
+    estimator.estimate_motion(FrameContext(frames[0], pool))
+    shifts = []
+    start = time.perf_counter()
+    for frame in frames[1:]:
+        shifts.append(estimator.estimate_motion(FrameContext(frame, pool)))
+    ms = (time.perf_counter() - start) / (len(frames) - 1) * 1000
+    return ms, np.mean(shifts, axis=0)
+
+def run_benchmark(config_path="roi_config.json", size=(1920, 1080)):
+    try:
+        with open(config_path) as f:
+            settings = json.load(f).get("motion_settings", {})
+    except Exception as e:
+        print(f"Error loading config: {e}")
+        settings = {"mode": "fast"}
+    frames, truth = panning_scene(size)
+    print(f"{size[0]}x{size[1]} pan, true scene shift {truth} px/frame")
+
+    cases = [
+        ("accurate", CameraMotionEstimator()),
+        ("fast, class defaults", CameraMotionEstimator(fast=True)),
+        ("fast, roi_config.json", CameraMotionEstimator.from_settings(settings)),
+    ]
+    print(f"{'estimator':>24} {'ms/frame':>9} {'mean dx':>8} {'mean dy':>8}")
+    for label, estimator in cases:
+        ms, (dx, dy) = bench(estimator, frames)
+        print(f"{label:>24} {ms:>9.2f} {dx:>8.2f} {dy:>8.2f}")
+
+if __name__ == "__main__":
+    run_benchmark(sys.argv[1] if len(sys.argv) > 1 else "roi_config.json")
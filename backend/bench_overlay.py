@@ -0,0 +1,94 @@
+import sys
+import time
+import cv2
+import numpy as np
+from analyzer import UrbanFlowAnalyzer
+from detector_base import DetectorBase, DetectionBatch
+from detector_handle import DetectorHandle
+from track_frames import pack_track_frame
+
+class NullDetector(DetectorBase):
+    """The benchmark feeds detections straight to the tracker"""
+    def detect(self, frame):
+        return DetectionBatch.empty()
+    def update_settings(self, settings):
+        pass
+    def get_settings(self):
+        return {}
+
+def load_frames(source, count, size):
+    """Frames from a video file, or a synthetic street-like scene (noise would make JPEG unrealistically slow)"""
+    if source:
+        cap = cv2.VideoCapture(source)
+        frames = []
+        while len(frames) < count:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            frames.append(cv2.resize(frame, size))
+        cap.release()
+        if frames:
+            return frames
+    rng = np.random.default_rng(0)
+    w, h = size
+    base = np.zeros((h, w, 3), np.uint8)
+    base[:] = np.linspace(60, 200, h, dtype=np.uint8)[:, None, None]
+    for _ in range(60):
+        x, y = rng.integers(0, w), rng.integers(0, h)
+        cv2.rectangle(base, (int(x), int(y)), (int(x + rng.integers(20, 200)), int(y + rng.integers(20, 200))),
+                      tuple(int(c) for c in rng.integers(0, 255, 3)), -1)
+    base = cv2.GaussianBlur(base, (5, 5), 0)
+    return [np.roll(base, 4 * i, axis=1) for i in range(count)]
+
+def make_analyzer(tracks, size, steps=40):
+    """Analyzer whose tracker holds `tracks` moving people with full trails"""
+    handle = DetectorHandle(lambda detector_type, settings: NullDetector(), "none")
+    analyzer = UrbanFlowAnalyzer("none", detector_handle=handle)
+    analyzer.roi_polygon = [(0, 30), (100, 30), (100, 100), (0, 100)]
+    w, h = size
+    rng = np.random.default_rng(1)
+    start = rng.uniform((50, 250), (w - 150, h - 150), (tracks, 2))
+    velocity = rng.uniform(-3, 3, (tracks, 2))
+    for step in range(steps):
+        centers = start + velocity * step
+        boxes = np.hstack([centers - (20, 40), np.tile([40, 80], (tracks, 1))])
+        analyzer._track(DetectionBatch(boxes, np.full(tracks, 0.9)), (0, 0), step, w, h)
+    return analyzer
+
+def bench_encode(frames, analyzer, mode, skip_frames):
+    """Per-frame cost of the encode stage (and of packing track frames for client mode)"""
+    canvas = np.empty_like(frames[0])
+    seq = analyzer.render_state.seq
+    start = time.perf_counter()
+    for i, frame in enumerate(frames):
+        analyzed = i % (skip_frames + 1) == 0
+        if mode == "server":
+            frame = frame.copy()  # the capture thread hands over a fresh frame each time
+            target = canvas if analyzed else frame
+            image = analyzer.render(frame, seq=seq + i % (skip_frames + 1), canvas=target)
+        else:
+            image = frame
+            if analyzed:
+                # Annotations leave as a track frame once per analyzed frame
+                pack_track_frame(analyzer.render_state, analyzer.projector)
+        cv2.imencode('.jpg', image)
+    return (time.perf_counter() - start) / len(frames) * 1000
+
+def run_benchmark(source=None, sizes=((1280, 720), (1920, 1080)), track_counts=(20, 100),
+                  frames=100, skip_frames=2):
+    print(f"{'size':>10} {'tracks':>7} {'grid':>5} {'server ms':>10} {'client ms':>10} {'saved':>7}")
+    for size in sizes:
+        frames_in = load_frames(source, frames, size)
+        for tracks in track_counts:
+            analyzer = make_analyzer(tracks, size)
+            for grid in (True, False):
+                analyzer.show_grid = grid
+                bench_encode(frames_in[:5], analyzer, "server", skip_frames)  # warm up caches
+                server = bench_encode(frames_in, analyzer, "server", skip_frames)
+                client = bench_encode(frames_in, analyzer, "client", skip_frames)
+                label = f"{size[0]}x{size[1]}"
+                print(f"{label:>10} {tracks:>7} {str(grid):>5} {server:>10.2f} {client:>10.2f} "
+                      f"{(1 - client / server) * 100:>6.1f}%")
+
+if __name__ == "__main__":
+    run_benchmark(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,40 @@
+import time
+import numpy as np
+from tracker_advanced import AdvancedTracker
+from camera_geometry import CameraProjector
+
+def crowd_detections(base, velocity, t, rng):
+    points = base + velocity * t + rng.normal(0, 1, base.shape)
+    return [((float(x), float(y)), (x - 15, y - 40, x + 15, y + 40)) for x, y in points]
+
+def run_benchmark(sizes=(10, 100, 300, 500), frames=50, association="greedy", density=None):
+    """
+    density: px^2 per person; the scene grows with the crowd so only the track
+    count changes (default: everyone in one 1080p-wide square, so denser crowds)
+    """
+    rng = np.random.default_rng(0)
+    projector = CameraProjector(fov_vertical=50.0, cam_height=15.0, pitch_deg=-30.0)
+
+    print(f"{'tracks':>7} {'update ms':>10} {'us/track':>9}" + (f"  ({density:.0f} px^2/person)" if density else ""))
+    for n in sizes:
+        tracker = AdvancedTracker(association=association)
+        side = np.sqrt(n * density) if density else 1820
+        base = rng.uniform(50, 50 + side, (n, 2))
+        velocity = rng.normal(0, 2, (n, 2))
+
+        # Warm up so every person already has a track
+        tracker.update(crowd_detections(base, velocity, 0, rng), (0, 0), projector, 1920, 1080)
+
+        elapsed = 0.0
+        for t in range(1, frames + 1):
+            detections = crowd_detections(base, velocity, t, rng)
+            start = time.perf_counter()
+            tracker.update(detections, (0.5, -0.3), projector, 1920, 1080, fps=25)
+            elapsed += time.perf_counter() - start
+
+        per_frame = elapsed / frames * 1000
+        print(f"{n:>7} {per_frame:>10.2f} {per_frame * 1000 / n:>9.1f}")
+
+if __name__ == "__main__":
+    run_benchmark()
+    run_benchmark(sizes=(100, 300, 500, 1000, 2000), density=6600)
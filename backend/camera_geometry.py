@@ -14,9 +14,28 @@ class CameraProjector:
         self.yaw = np.radians(yaw_deg)
         
         # Precompute rotation matrix (assuming roll is 0)
-        # We want to transform World -> Camera
         # World: Y-up, X-right, Z-forward (or standard 3D convention)
-        pass
+        # Pitch (Rotation around X)
+        self.Rx = np.array([
+            [1, 0, 0],
+            [0, np.cos(self.pitch), -np.sin(self.pitch)],
+            [0, np.sin(self.pitch), np.cos(self.pitch)]
+        ])
+        
+        # Yaw (Rotation around Y)
+        self.Ry = np.array([
+            [np.cos(self.yaw), 0, np.sin(self.yaw)],
+            [0, 1, 0],
+            [-np.sin(self.yaw), 0, np.cos(self.yaw)]
+        ])
+        
+        # Camera -> World: World_Ray = Ry * Rx * Cam_Ray; World -> Camera is the transpose
+        self.R_cam_to_world = self.Ry @ self.Rx
+        self.R_world_to_cam = self.R_cam_to_world.T
+        
+        self.tan_half_fov_h = np.tan(self.fov_h / 2)
+        self.tan_half_fov_v = np.tan(self.fov_v / 2)
+        self.cam_pos = np.array([0, self.h, 0])
 
     def pixel_to_ground(self, u, v, width, height):
         """
@@ -34,29 +53,14 @@ class CameraProjector:
         
         # 2. Ray in Camera Space
         # tan(fov/2) is the scale factor
-        cam_x = x_ndc * np.tan(self.fov_h / 2)
-        cam_y = y_ndc * np.tan(self.fov_v / 2)
+        cam_x = x_ndc * self.tan_half_fov_h
+        cam_y = y_ndc * self.tan_half_fov_v
         cam_z = -1.0 # Forward in camera space (OpenGL convention is -Z forward)
         
         ray_cam = np.array([cam_x, cam_y, cam_z])
         
-        # 3. Rotate Ray to World Space
-        # Pitch (Rotation around X)
-        Rx = np.array([
-            [1, 0, 0],
-            [0, np.cos(self.pitch), -np.sin(self.pitch)],
-            [0, np.sin(self.pitch), np.cos(self.pitch)]
-        ])
-        
-        # Yaw (Rotation around Y)
-        Ry = np.array([
-            [np.cos(self.yaw), 0, np.sin(self.yaw)],
-            [0, 1, 0],
-            [-np.sin(self.yaw), 0, np.cos(self.yaw)]
-        ])
-        
-        # Combined rotation: World_Ray = Ry * Rx * Cam_Ray
-        ray_world = Ry @ (Rx @ ray_cam)
+        # 3. Rotate Ray to World Space (cached World_Ray = Ry * Rx * Cam_Ray)
+        ray_world = self.R_cam_to_world @ ray_cam
         
         # 4. Intersect with Ground Plane (Y = 0)
         # Ray Origin: Camera Position (0, h, 0) - wait, camera assumes origin is at (0,h,0) relative to ground point?
@@ -73,7 +77,7 @@ class CameraProjector:
         if t < 0: # Intersection is behind camera or sky
             return None
             
-        intersect_point = np.array([0, self.h, 0]) + t * ray_world
+        intersect_point = self.cam_pos + t * ray_world
         
         return intersect_point[0], intersect_point[2] # Return X, Z on ground
 
@@ -88,22 +92,10 @@ class CameraProjector:
         # 2. Transform to Camera Space
         # Camera is at (0, h, 0). 
         # P_cam_rel = P_world - Cam_Pos
-        P_rel = P_world - np.array([0, self.h, 0])
-        
-        # Invert rotation: Cam_P = Rx_inv * Ry_inv * P_rel
-        # Rx_inv = transpose(Rx), Ry_inv = transpose(Ry)
-        Rx = np.array([
-            [1, 0, 0],
-            [0, np.cos(self.pitch), -np.sin(self.pitch)],
-            [0, np.sin(self.pitch), np.cos(self.pitch)]
-        ])
-        Ry = np.array([
-            [np.cos(self.yaw), 0, np.sin(self.yaw)],
-            [0, 1, 0],
-            [-np.sin(self.yaw), 0, np.cos(self.yaw)]
-        ])
+        P_rel = P_world - self.cam_pos
         
-        P_cam = Rx.T @ (Ry.T @ P_rel)
+        # Invert rotation: Cam_P = Rx_inv * Ry_inv * P_rel (cached transpose)
+        P_cam = self.R_world_to_cam @ P_rel
         
         # 3. Project to Image Plane
         # OpenGL convention: forward is -Z
@@ -111,11 +103,61 @@ class CameraProjector:
             return None
             
         # x_img = cam_x / (-cam_z * tan(fov_h/2))
-        x_ndc = P_cam[0] / (-P_cam[2] * np.tan(self.fov_h / 2))
-        y_ndc = P_cam[1] / (-P_cam[2] * np.tan(self.fov_v / 2))
+        x_ndc = P_cam[0] / (-P_cam[2] * self.tan_half_fov_h)
+        y_ndc = P_cam[1] / (-P_cam[2] * self.tan_half_fov_v)
         
         # 4. Convert NDR to Pixels
         u = (x_ndc + 1.0) * width / 2.0
         v = (1.0 - y_ndc) * height / 2.0
         
         return int(u), int(v)
+
+    def pixels_to_ground(self, points, width, height):
+        """
+        Batch version of pixel_to_ground.
+        points: (N, 2) array of (u, v) pixels
+        Returns ((N, 2) ground (x, z), (N,) bool validity mask); invalid rows are 0.
+        """
+        pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        
+        rays_cam = np.empty((len(pts), 3))
+        rays_cam[:, 0] = ((2.0 * pts[:, 0] / width) - 1.0) * self.tan_half_fov_h
+        rays_cam[:, 1] = (1.0 - (2.0 * pts[:, 1] / height)) * self.tan_half_fov_v
+        rays_cam[:, 2] = -1.0
+        rays_world = rays_cam @ self.R_cam_to_world.T
+        
+        ray_y = rays_world[:, 1]
+        valid = np.abs(ray_y) >= 1e-6
+        t = np.zeros(len(pts))
+        t[valid] = -self.h / ray_y[valid]
+        valid &= t >= 0
+        
+        ground = np.zeros((len(pts), 2))
+        ground[valid, 0] = t[valid] * rays_world[valid, 0]
+        ground[valid, 1] = t[valid] * rays_world[valid, 2]
+        return ground, valid
+
+    def ground_to_pixels(self, points, width, height):
+        """
+        Batch version of ground_to_pixel.
+        points: (N, 2) array of ground (x, z)
+        Returns ((N, 2) int32 pixels (u, v), (N,) bool validity mask); invalid rows are 0.
+        """
+        pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        
+        P_rel = np.empty((len(pts), 3))
+        P_rel[:, 0] = pts[:, 0]
+        P_rel[:, 1] = -self.h
+        P_rel[:, 2] = pts[:, 1]
+        P_cam = P_rel @ self.R_world_to_cam.T
+        
+        valid = P_cam[:, 2] < 0
+        depth = np.where(valid, -P_cam[:, 2], 1.0)
+        u = (P_cam[:, 0] / (depth * self.tan_half_fov_h) + 1.0) * width / 2.0
+        v = (1.0 - P_cam[:, 1] / (depth * self.tan_half_fov_v)) * height / 2.0
+        
+        pixels = np.zeros((len(pts), 2), dtype=np.int32)
+        # Truncate toward zero like int() in ground_to_pixel; clip so far-off points can't overflow
+        pixels[valid, 0] = np.clip(u[valid], -2**30, 2**30).astype(np.int32)
+        pixels[valid, 1] = np.clip(v[valid], -2**30, 2**30).astype(np.int32)
+        return pixels, valid
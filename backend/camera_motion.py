@@ -1,37 +1,119 @@
 import cv2
 import numpy as np
+from frame_context import FrameContext
+
+# Defaults per mode for the settings left as None: (min_features, max_level, win_size, max_corners).
+# Fast mode is tuned to stay around 2 ms/frame at 1080p on one core (see bench_motion.py).
+MODE_DEFAULTS = {
+    "accurate": (100, 2, 15, 200),
+    "fast": (75, 1, 11, 150),
+}
 
 class CameraMotionEstimator:
-    def __init__(self, min_features=100):
+    def __init__(self, min_features=None, fast=False, scale=0.25, max_level=None,
+                 win_size=None, max_corners=None, stride=1, static_camera=False,
+                 max_error=12.0, max_deviation=1.0):
+        """
+        Args:
+            min_features: in fast mode, re-detect corners only when fewer survive
+            fast: work on a downscaled gray image and reuse tracked corners across frames
+            scale: downscale factor for fast mode (0.25 -> 480x270 at 1080p)
+            max_level: Lucas-Kanade pyramid levels
+            win_size: Lucas-Kanade search window (pixels, at the working scale)
+            max_corners: corners detected by goodFeaturesToTrack
+            stride: estimate on every Nth call only; motion from skipped calls is
+                    picked up by the next estimate (it compares against the last estimated frame)
+            static_camera: camera is known not to move, always return (0, 0)
+            max_error: corners whose Lucas-Kanade error is above this are ignored
+            max_deviation: in fast mode, only corners that moved within this many pixels
+                           (at the working scale) of the median shift are reused, so
+                           corners on pedestrians are dropped
+        """
+        defaults = MODE_DEFAULTS["fast" if fast else "accurate"]
+        min_features = defaults[0] if min_features is None else min_features
+        max_level = defaults[1] if max_level is None else max_level
+        win_size = defaults[2] if win_size is None else win_size
+        max_corners = defaults[3] if max_corners is None else max_corners
+
         self.prev_gray = None
+        self.prev_points = None
         self.min_features = min_features
+        self.fast = fast
+        self.scale = scale if fast else 1.0
+        self.max_error = max_error
+        self.max_deviation = max_deviation
+        self.stride = max(1, int(stride))
+        self.static_camera = static_camera
+        self._calls = 0
         # Feature params for Shi-Tomasi corner detection
-        self.feature_params = dict(maxCorners=200,
+        self.feature_params = dict(maxCorners=max_corners,
                                    qualityLevel=0.01,
-                                   minDistance=30,
+                                   minDistance=max(5, int(30 * self.scale)),
                                    blockSize=3)
         # Parameters for Lucas-Kanade optical flow
-        self.lk_params = dict(winSize=(15, 15),
-                              maxLevel=2,
+        self.lk_params = dict(winSize=(win_size, win_size),
+                              maxLevel=max_level,
                               criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
 
+    @classmethod
+    def from_settings(cls, settings: dict):
+        """Build from the `motion_settings` block of roi_config.json"""
+        return cls(
+            min_features=settings.get("min_features"),
+            fast=settings.get("mode", "accurate") == "fast",
+            scale=settings.get("scale", 0.25),
+            max_level=settings.get("max_level"),
+            win_size=settings.get("win_size"),
+            max_corners=settings.get("max_corners"),
+            stride=settings.get("stride", 1),
+            static_camera=settings.get("static_camera", False),
+            max_error=settings.get("max_error", 12.0),
+            max_deviation=settings.get("max_deviation", 1.0)
+        )
+
+    def _to_gray(self, frame):
+        if self.scale != 1.0:
+            h, w = frame.shape[:2]
+            size = (max(1, int(w * self.scale)), max(1, int(h * self.scale)))
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_LINEAR)
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
     def estimate_motion(self, curr_frame):
         """
         Estimates global camera motion (dx, dy) between previous and current frame.
         Returns (0, 0) if no previous frame or motion could not be determined.
+        
+        curr_frame: BGR array or FrameContext (its pooled gray buffer is reused)
         """
-        curr_gray = cv2.cvtColor(curr_frame, cv2.COLOR_BGR2GRAY)
+        if self.static_camera:
+            return (0, 0)
+
+        self._calls += 1
+        if self.prev_gray is not None and self._calls % self.stride != 0:
+            return (0, 0)
+
+        if isinstance(curr_frame, FrameContext):
+            curr_gray = curr_frame.gray(self.scale)
+            if self.stride > 1:
+                # Kept across several frames: don't let the pool recycle it
+                curr_gray = curr_gray.copy()
+        else:
+            curr_gray = self._to_gray(curr_frame)
 
         if self.prev_gray is None:
             self.prev_gray = curr_gray
             return (0, 0)
 
-        # 1. Detect features in previous frame
-        p0 = cv2.goodFeaturesToTrack(self.prev_gray, mask=None, **self.feature_params)
+        # 1. Features in previous frame: reuse the surviving tracked corners in fast mode
+        if self.fast and self.prev_points is not None and len(self.prev_points) >= self.min_features:
+            p0 = self.prev_points
+        else:
+            p0 = cv2.goodFeaturesToTrack(self.prev_gray, mask=None, **self.feature_params)
 
         if p0 is None or len(p0) < 10:
             # Not enough features, reset
             self.prev_gray = curr_gray
+            self.prev_points = None
             return (0, 0)
 
         # 2. Calculate Optical Flow
@@ -40,27 +122,43 @@ class CameraMotionEstimator:
         # 3. Select good points
         if p1 is None:
              self.prev_gray = curr_gray
+             self.prev_points = None
              return (0, 0)
 
-        good_new = p1[st == 1]
-        good_old = p0[st == 1]
-        
+        # Tracked corners that are still inside the frame and matched well
+        h, w = curr_gray.shape[:2]
+        x, y = p1[:, 0, 0], p1[:, 0, 1]
+        good = ((st.ravel() == 1) & (err.ravel() <= self.max_error) &
+                (x >= 0) & (x < w) & (y >= 0) & (y < h))
+        good_new = p1[good].reshape(-1, 2)
+        good_old = p0[good].reshape(-1, 2)
+
+        self.prev_gray = curr_gray
+        self.prev_points = None
+
         if len(good_new) < 10:
-            self.prev_gray = curr_gray
             return (0, 0)
 
         # 4. Calculate movement (shift) for each point
         movement = good_new - good_old
         dx_vals = movement[:, 0]
         dy_vals = movement[:, 1]
-        
+
         # 5. Use Median to filter out outliers (moving objects like players)
         # The background usually occupies the majority of the view, so median represents background motion
-        median_dx = np.median(dx_vals)
-        median_dy = np.median(dy_vals)
+        # Scale back up to full-resolution pixels
+        shift_dx = np.median(dx_vals)
+        shift_dy = np.median(dy_vals)
+        median_dx = shift_dx / self.scale
+        median_dy = shift_dy / self.scale
+
+        if self.fast:
+            # Background corners seed the next frame (re-detected once too few remain);
+            # corners that moved on their own are on people and would bias the median
+            background = ((np.abs(dx_vals - shift_dx) <= self.max_deviation) &
+                          (np.abs(dy_vals - shift_dy) <= self.max_deviation))
+            self.prev_points = good_new[background].reshape(-1, 1, 2)
 
-        self.prev_gray = curr_gray
-        
         # We return the shift of the SCENE relative to the camera.
         # If camera pans RIGHT, the scene shifts LEFT (negative dx).
         return (median_dx, median_dy)
@@ -1,18 +1,104 @@
 from abc import ABC, abstractmethod
+from collections.abc import Sequence
 from dataclasses import dataclass
 from typing import List, Tuple
+import numpy as np
+from frame_context import FrameContext
 
 @dataclass
 class Detection:
     """Standardized detection result"""
+    __slots__ = ('bbox', 'category', 'score', 'center')
     bbox: Tuple[int, int, int, int]  # x, y, w, h
     category: str
     score: float
     center: Tuple[int, int]
 
+class DetectionBatch(Sequence):
+    """
+    Detections of one frame stored as contiguous arrays.
+    
+    Detectors return it, the ROI filter selects rows from it and the tracker
+    reads its arrays directly, so no per-detection objects are created on the
+    way. Indexing or iterating yields Detection objects, built only when asked
+    for, so it can still be passed wherever a List[Detection] was expected.
+    """
+    
+    # COCO class ids, as used by the detectors
+    CLASS_NAMES = {0: 'person'}
+    
+    def __init__(self, boxes: np.ndarray, scores: np.ndarray, class_ids: np.ndarray = None):
+        """
+        Args:
+            boxes: (n, 4) x, y, w, h in pixels
+            scores: (n,) confidences
+            class_ids: (n,) COCO class ids, default all person (0)
+        """
+        self.boxes = np.asarray(boxes, dtype=np.int32).reshape(-1, 4)
+        self.scores = np.asarray(scores, dtype=np.float32).reshape(-1)
+        if class_ids is None:
+            self.class_ids = np.zeros(len(self.boxes), dtype=np.int32)
+        else:
+            self.class_ids = np.asarray(class_ids, dtype=np.int32).reshape(-1)
+        self.centers = self.boxes[:, :2] + self.boxes[:, 2:] // 2
+    
+    @classmethod
+    def from_xyxy(cls, xyxy: np.ndarray, scores: np.ndarray, class_ids: np.ndarray = None) -> "DetectionBatch":
+        """Build from (n, 4) float corner boxes, truncated to pixels like int() would"""
+        xyxy = np.asarray(xyxy, dtype=np.float32).reshape(-1, 4)
+        boxes = np.empty((len(xyxy), 4), dtype=np.int32)
+        boxes[:, :2] = xyxy[:, :2]
+        boxes[:, 2:] = xyxy[:, 2:] - xyxy[:, :2]
+        return cls(boxes, scores, class_ids)
+    
+    @classmethod
+    def from_detections(cls, detections) -> "DetectionBatch":
+        """Pack a list of Detection objects"""
+        names = {name: class_id for class_id, name in cls.CLASS_NAMES.items()}
+        return cls(np.array([d.bbox for d in detections], dtype=np.int32),
+                   np.array([d.score for d in detections], dtype=np.float32),
+                   np.array([names.get(d.category, -1) for d in detections], dtype=np.int32))
+    
+    @classmethod
+    def empty(cls) -> "DetectionBatch":
+        return cls(np.zeros((0, 4), np.int32), np.zeros(0, np.float32))
+    
+    @property
+    def xyxy(self) -> np.ndarray:
+        """(n, 4) float32 x1, y1, x2, y2 boxes (tracker format)"""
+        xyxy = self.boxes.astype(np.float32)
+        xyxy[:, 2:] += xyxy[:, :2]
+        return xyxy
+    
+    def select(self, mask) -> "DetectionBatch":
+        """Rows where mask (boolean or index array) selects"""
+        return DetectionBatch(self.boxes[mask], self.scores[mask], self.class_ids[mask])
+    
+    def __len__(self):
+        return len(self.boxes)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.select(index)
+        x, y, w, h = (int(v) for v in self.boxes[index])
+        cx, cy = (int(v) for v in self.centers[index])
+        category = self.CLASS_NAMES.get(int(self.class_ids[index]), 'unknown')
+        return Detection(bbox=(x, y, w, h), category=category,
+                         score=float(self.scores[index]), center=(cx, cy))
+
+def as_detection_batch(detections) -> DetectionBatch:
+    """DetectionBatch for detector output (lists of Detection from older detectors are packed)"""
+    if isinstance(detections, DetectionBatch):
+        return detections
+    return DetectionBatch.from_detections(detections)
+
 class DetectorBase(ABC):
     """Abstract base class for object detectors"""
     
+    # Settings that can only change by building a new detector (model file, runtime
+    # options); everything else is applied in place by update_settings
+    RELOAD_SETTINGS = ()
+    
     @abstractmethod
     def detect(self, frame) -> List[Detection]:
         """
@@ -22,10 +108,34 @@ class DetectorBase(ABC):
             frame: numpy array (BGR format)
             
         Returns:
-            List of Detection objects
+            DetectionBatch (or a list of Detection objects)
         """
         pass
     
+    def detect_context(self, ctx) -> List[Detection]:
+        """
+        Detect objects in a FrameContext.
+        
+        Detectors that need another color space or size override this to
+        reuse the context's shared conversions; the default uses the BGR frame.
+        """
+        return self.detect(ctx.bgr)
+    
+    def detect_batch(self, frames) -> List[List[Detection]]:
+        """
+        Detect objects in several frames at once.
+        
+        Args:
+            frames: list of BGR frames or FrameContexts
+            
+        Returns:
+            One list of Detection objects per frame, in the same order.
+            The default runs the frames one by one; detectors whose runtime
+            can batch (e.g. YOLOv8) override this.
+        """
+        return [self.detect_context(frame) if isinstance(frame, FrameContext) else self.detect(frame)
+                for frame in frames]
+    
     @abstractmethod
     def update_settings(self, settings: dict):
         """Update detector-specific settings"""
@@ -35,3 +145,12 @@ class DetectorBase(ABC):
     def get_settings(self) -> dict:
         """Get current detector settings"""
         pass
+    
+    def requires_reload(self, settings: dict) -> bool:
+        """True if applying `settings` needs a new detector instance"""
+        current = self.get_settings()
+        return any(key in settings and settings[key] != current.get(key) for key in self.RELOAD_SETTINGS)
+    
+    def close(self):
+        """Release resources held by the detector (worker processes, sessions)"""
+        pass
@@ -0,0 +1,123 @@
+import threading
+from typing import Callable
+import numpy as np
+from detector_base import DetectorBase
+from detector_pool import DETECTOR_TYPES, DetectorPool
+
+class DetectorHandle:
+    """
+    The active detector of an analyzer (or of a shared InferenceScheduler)
+    plus background switching.
+
+    Settings the current detector can apply in place (thresholds) are applied
+    immediately. Anything that needs a new model is built and warmed up on a
+    loader thread while the old detector keeps running, then swapped in with
+    a single assignment. Replaced detectors are kept in `retired` until the
+    thread running inference calls close_retired().
+    """
+
+    def __init__(self, factory: Callable[[str, dict], DetectorBase], detector_type: str, settings: dict = None):
+        """
+        Args:
+            factory: builds a detector from (detector_type, settings)
+            detector_type: initial detector type
+            settings: initial detector settings
+        """
+        self.factory = factory
+        self.detector_type = detector_type
+        self.detector = factory(detector_type, settings or {})
+        self.status = {"state": "ready", "detector_type": detector_type, "error": None}
+        # Frame size used for the warm-up inference (updated by the analyzer)
+        self.warmup_shape = (720, 1280, 3)
+        self.retired = []
+        # Seconds new pool workers get to build their detectors before the switch fails
+        self.load_timeout = 120.0
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    def set_detector(self, detector_type: str, settings: dict = None, wait: bool = False) -> str:
+        """
+        Switch to a different detector (or apply new detector settings).
+        Returns "updated" (applied in place) or "loading" (swap pending).
+
+        Args:
+            wait: block until the new detector is ready (scripts and tests)
+        """
+        settings = settings or {}
+        if detector_type not in DETECTOR_TYPES:
+            raise ValueError(f"Unknown detector type: {detector_type}")
+
+        with self._lock:
+            # Every call supersedes a swap still loading, including in-place updates
+            self._generation += 1
+            generation = self._generation
+            in_place = detector_type == self.detector_type and not self.detector.requires_reload(settings)
+            state = "ready" if in_place else "loading"
+            self.status = {"state": state, "detector_type": detector_type, "error": None}
+        if in_place:
+            self.detector.update_settings(settings)
+            return "updated"
+
+        print(f"Switching detector to: {detector_type}")
+
+        loader = threading.Thread(target=self._load, args=(detector_type, settings, generation),
+                                  name="detector-loader", daemon=True)
+        loader.start()
+        if wait:
+            loader.join()
+        return "loading"
+
+    def _load(self, detector_type: str, settings: dict, generation: int):
+        """Loader thread: build and warm up a detector, then swap it in"""
+        detector = None
+        try:
+            detector = self.factory(detector_type, settings)
+            if isinstance(detector, DetectorPool):
+                # Raises if the workers cannot build their detectors (e.g. a missing model file)
+                detector.wait_ready(self.load_timeout)
+            # First inference allocates buffers / compiles kernels; do it off the stream.
+            # A pool gets one warm-up frame per worker.
+            dummy = np.zeros(self.warmup_shape, dtype=np.uint8)
+            detector.detect_batch([dummy] * getattr(detector, 'workers', 1))
+        except Exception as e:
+            print(f"Error loading detector {detector_type}: {e}")
+            if detector is not None:
+                detector.close()
+            with self._lock:
+                if generation == self._generation:
+                    self.status = {"state": "error", "detector_type": detector_type, "error": str(e)}
+            return
+
+        with self._lock:
+            if generation != self._generation:
+                # A newer switch was requested while this one was loading
+                detector.close()
+                return
+            old_detector = self.detector
+            # Atomic swap: inference picks up the new detector on its next frame
+            self.detector = detector
+            self.detector_type = detector_type
+            self.retired.append(old_detector)
+            self.status = {"state": "ready", "detector_type": detector_type, "error": None}
+        print(f"Detector switched to: {detector_type}")
+
+    def close_retired(self):
+        """
+        Close detectors replaced by a swap. Only call this from a thread that runs
+        inference, between frames, so no frame can still be using them.
+        Pools are kept until every stream has collected its frames from them.
+        """
+        with self._lock:
+            while self.retired:
+                detector = self.retired[0]
+                if isinstance(detector, DetectorPool) and detector.pending():
+                    # Frames submitted before the swap are still in flight
+                    return
+                self.retired.pop(0)
+                detector.close()
+
+    def close(self):
+        for detector in self.retired:
+            detector.close()
+        self.retired = []
+        self.detector.close()
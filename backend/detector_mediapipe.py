@@ -2,43 +2,61 @@ import cv2
 import mediapipe as mp
 import numpy as np
 from typing import List
-from detector_base import DetectorBase, Detection
+from detector_base import DetectorBase, DetectionBatch
+from frame_context import FrameContext
 import os
 
 class MediaPipeDetector(DetectorBase):
     """MediaPipe object detector implementation"""
     
+    # Changing these needs a new ObjectDetector; the score threshold is applied in Python
+    RELOAD_SETTINGS = ('max_results',)
+    
+    # Score floor baked into the ObjectDetector. Results are the top max_results by
+    # score, so filtering them by a higher score_threshold afterwards gives the same
+    # detections as building the detector with that threshold.
+    MIN_SCORE_THRESHOLD = 0.1
+    
     def __init__(self, model_path: str = "efficientdet_lite0.tflite", 
                  score_threshold: float = 0.25, max_results: int = 20):
         if not os.path.exists(model_path):
             print(f"Warning: Model {model_path} not found.")
         
+        self.model_path = model_path
+        self.score_threshold = score_threshold
+        self.max_results = max_results
+        self.detector = self._create_object_detector()
+    
+    def _create_object_detector(self):
         # MediaPipe Tasks API
         BaseOptions = mp.tasks.BaseOptions
         ObjectDetector = mp.tasks.vision.ObjectDetector
         ObjectDetectorOptions = mp.tasks.vision.ObjectDetectorOptions
         VisionRunningMode = mp.tasks.vision.RunningMode
         
-        self.score_threshold = score_threshold
-        self.max_results = max_results
-        
+        # Scores below this never come out of the built detector
+        self.score_floor = min(self.score_threshold, self.MIN_SCORE_THRESHOLD)
         options = ObjectDetectorOptions(
-            base_options=BaseOptions(model_asset_path=model_path),
-            max_results=max_results,
-            score_threshold=score_threshold,
+            base_options=BaseOptions(model_asset_path=self.model_path),
+            max_results=self.max_results,
+            score_threshold=self.score_floor,
             running_mode=VisionRunningMode.IMAGE
         )
-        self.detector = ObjectDetector.create_from_options(options)
+        return ObjectDetector.create_from_options(options)
     
-    def detect(self, frame: np.ndarray) -> List[Detection]:
+    def detect(self, frame: np.ndarray) -> DetectionBatch:
         """Detect objects using MediaPipe"""
-        # Convert to RGB
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        return self.detect_context(FrameContext(frame))
+    
+    def detect_context(self, ctx: FrameContext) -> DetectionBatch:
+        """Detect objects using the context's shared RGB conversion"""
+        rgb_frame = ctx.rgb()
         mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb_frame)
         
         detection_result = self.detector.detect(mp_image)
         
-        detections = []
+        boxes = []
+        scores = []
         for detection in detection_result.detections:
             category = detection.categories[0]
             
@@ -49,38 +67,29 @@ class MediaPipeDetector(DetectorBase):
                 continue
             
             bbox = detection.bounding_box
-            x, y, w, h = bbox.origin_x, bbox.origin_y, bbox.width, bbox.height
-            cx, cy = x + w // 2, y + h // 2
-            
-            detections.append(Detection(
-                bbox=(x, y, w, h),
-                category='person',
-                score=category.score,
-                center=(cx, cy)
-            ))
+            boxes.append((bbox.origin_x, bbox.origin_y, bbox.width, bbox.height))
+            scores.append(category.score)
         
-        return detections
+        # Centers are computed for all boxes at once by DetectionBatch
+        return DetectionBatch(np.array(boxes, dtype=np.int32), np.array(scores, dtype=np.float32))
+    
+    def requires_reload(self, settings: dict) -> bool:
+        """A new max_results, or a score_threshold below the floor the detector was built with"""
+        if settings.get('score_threshold', self.score_floor) < self.score_floor:
+            return True
+        return super().requires_reload(settings)
     
     def update_settings(self, settings: dict):
-        """Update MediaPipe settings"""
+        """Update MediaPipe settings (the model is only rebuilt when max_results changes
+        or score_threshold drops below its score floor)"""
+        rebuild = self.requires_reload(settings)
         if 'score_threshold' in settings:
             self.score_threshold = settings['score_threshold']
         if 'max_results' in settings:
             self.max_results = settings['max_results']
-        
-        # Recreate detector with new settings
-        BaseOptions = mp.tasks.BaseOptions
-        ObjectDetector = mp.tasks.vision.ObjectDetector
-        ObjectDetectorOptions = mp.tasks.vision.ObjectDetectorOptions
-        VisionRunningMode = mp.tasks.vision.RunningMode
-        
-        options = ObjectDetectorOptions(
-            base_options=BaseOptions(model_asset_path="efficientdet_lite0.tflite"),
-            max_results=self.max_results,
-            score_threshold=self.score_threshold,
-            running_mode=VisionRunningMode.IMAGE
-        )
-        self.detector = ObjectDetector.create_from_options(options)
+        if rebuild:
+            # Recreate detector with new settings, swapped in once it is built
+            self.detector = self._create_object_detector()
     
     def get_settings(self) -> dict:
         """Get current settings"""
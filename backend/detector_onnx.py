@@ -0,0 +1,218 @@
+import os
+import cv2
+import numpy as np
+from typing import List
+from detector_base import DetectorBase, DetectionBatch
+from frame_context import FrameContext
+
+def letterbox(frame: np.ndarray, size: int, out: np.ndarray = None):
+    """
+    Resize keeping the aspect ratio and pad to a size x size square (YOLOv8 preprocessing).
+
+    Returns:
+        (padded BGR image, scale, (pad_x, pad_y)) to map boxes back to the frame
+    """
+    h, w = frame.shape[:2]
+    scale = min(size / w, size / h)
+    new_w, new_h = int(round(w * scale)), int(round(h * scale))
+    pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+
+    if out is None:
+        out = np.empty((size, size, 3), dtype=np.uint8)
+    out[...] = 114  # Ultralytics pad color
+    out[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    return out, scale, (pad_x, pad_y)
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float, max_det: int = 300) -> np.ndarray:
+    """
+    Greedy non-maximum suppression.
+
+    Args:
+        boxes: (n, 4) x1, y1, x2, y2
+        scores: (n,)
+    Returns:
+        indices of the kept boxes, best score first
+    """
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x2 - x1) * (y2 - y1)
+    order = np.argsort(-scores, kind="stable")
+
+    keep = []
+    while order.size and len(keep) < max_det:
+        best = order[0]
+        keep.append(best)
+        rest = order[1:]
+        # IoU of the best box against all remaining ones at once
+        inter = (np.clip(np.minimum(x2[best], x2[rest]) - np.maximum(x1[best], x1[rest]), 0, None) *
+                 np.clip(np.minimum(y2[best], y2[rest]) - np.maximum(y1[best], y1[rest]), 0, None))
+        iou = inter / (areas[best] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+class ONNXDetector(DetectorBase):
+    """YOLOv8 exported to ONNX and run with onnxruntime (CPU or OpenVINO)"""
+
+    RELOAD_SETTINGS = ('model_size', 'intra_op_threads', 'inter_op_threads', 'provider')
+
+    def __init__(self, confidence: float = 0.25, iou_threshold: float = 0.45,
+                 model_size: str = 'n', intra_op_threads: int = 0, inter_op_threads: int = 1,
+                 provider: str = "auto", model_dir: str = "."):
+        """
+        Args:
+            confidence: minimum person score
+            iou_threshold: NMS IoU threshold
+            model_size: YOLOv8 size (n, s, m, l, x)
+            intra_op_threads: threads inside one operator (0 = onnxruntime default, all cores).
+                              Lower it when running several detector workers.
+            inter_op_threads: threads across operators (the graph is sequential, 1 is best)
+            provider: "auto" (OpenVINO if installed, else CPU), "openvino" or "cpu"
+            model_dir: where yolov8{size}.onnx is cached
+        """
+        try:
+            import onnxruntime
+            self.ort = onnxruntime
+        except ImportError:
+            raise ImportError(
+                "onnxruntime not installed. Install with: pip install onnxruntime"
+            )
+
+        self.confidence = confidence
+        self.iou_threshold = iou_threshold
+        self.model_size = model_size
+        self.intra_op_threads = intra_op_threads
+        self.inter_op_threads = inter_op_threads
+        self.provider = provider
+        self.model_dir = model_dir
+
+        # COCO class names - person is class 0
+        self.person_class_id = 0
+        self._load_session()
+
+    def _model_path(self) -> str:
+        """Cached yolov8{size}.onnx, exported from the Ultralytics weights on first use"""
+        path = os.path.join(self.model_dir, f'yolov8{self.model_size}.onnx')
+        if os.path.exists(path):
+            return path
+
+        try:
+            from ultralytics import YOLO
+        except ImportError:
+            raise ImportError(
+                f"{path} not found and Ultralytics is not installed to export it. "
+                "Install with: pip install ultralytics"
+            )
+        print(f"Exporting yolov8{self.model_size}.pt to ONNX (one-time)...")
+        exported = YOLO(f'yolov8{self.model_size}.pt').export(format='onnx', imgsz=640, dynamic=False)
+        if os.path.abspath(exported) != os.path.abspath(path):
+            os.replace(exported, path)
+        return path
+
+    def _providers(self) -> List[str]:
+        available = self.ort.get_available_providers()
+        if self.provider in ("auto", "openvino") and "OpenVINOExecutionProvider" in available:
+            return ["OpenVINOExecutionProvider", "CPUExecutionProvider"]
+        if self.provider == "openvino":
+            print("Warning: OpenVINO execution provider not available, using CPU")
+        return ["CPUExecutionProvider"]
+
+    def _load_session(self):
+        path = self._model_path()
+
+        options = self.ort.SessionOptions()
+        options.graph_optimization_level = self.ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = self.ort.ExecutionMode.ORT_SEQUENTIAL
+        options.intra_op_num_threads = self.intra_op_threads
+        options.inter_op_num_threads = self.inter_op_threads
+
+        print(f"Loading ONNX model: {path}")
+        self.session = self.ort.InferenceSession(path, sess_options=options, providers=self._providers())
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        # Static exports are (1, 3, 640, 640); dynamic ones have named axes
+        batch, _, height, _ = model_input.shape
+        self.input_size = height if isinstance(height, int) else 640
+        self.dynamic_batch = not isinstance(batch, int)
+        self._letterbox_buffer = np.empty((self.input_size, self.input_size, 3), dtype=np.uint8)
+
+    def _preprocess(self, frame: np.ndarray, out: np.ndarray):
+        """Letterbox one BGR frame into out[:] as normalized RGB CHW; returns (scale, pad)"""
+        padded, scale, pad = letterbox(frame, self.input_size, self._letterbox_buffer)
+        # BGR HWC uint8 -> RGB CHW float32 in [0, 1]
+        np.multiply(padded[:, :, ::-1].transpose(2, 0, 1), 1.0 / 255.0, out=out, casting="unsafe")
+        return scale, pad
+
+    def _postprocess(self, prediction: np.ndarray, scale: float, pad, frame_shape) -> DetectionBatch:
+        """
+        prediction: (4 + classes, anchors) rows cx, cy, w, h, class scores
+        """
+        scores = prediction[4 + self.person_class_id]
+        candidates = scores > self.confidence
+        if not candidates.any():
+            return DetectionBatch.empty()
+
+        scores = scores[candidates]
+        cx, cy, w, h = prediction[:4, candidates]
+        xyxy = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+        keep = nms(xyxy, scores, self.iou_threshold)
+        xyxy, scores = xyxy[keep], scores[keep]
+
+        # Undo the letterbox and clip to the frame
+        xyxy[:, [0, 2]] = (xyxy[:, [0, 2]] - pad[0]) / scale
+        xyxy[:, [1, 3]] = (xyxy[:, [1, 3]] - pad[1]) / scale
+        xyxy[:, [0, 2]] = np.clip(xyxy[:, [0, 2]], 0, frame_shape[1])
+        xyxy[:, [1, 3]] = np.clip(xyxy[:, [1, 3]], 0, frame_shape[0])
+        return DetectionBatch.from_xyxy(xyxy, scores)
+
+    def detect(self, frame: np.ndarray) -> DetectionBatch:
+        """Detect objects using the ONNX model"""
+        return self.detect_batch([frame])[0]
+
+    def detect_batch(self, frames) -> List[DetectionBatch]:
+        """Detect objects in several frames (one session run if the model has a dynamic batch axis)"""
+        frames = [f.bgr if isinstance(f, FrameContext) else f for f in frames]
+        if not frames:
+            return []
+
+        step = len(frames) if self.dynamic_batch else 1
+        results = []
+        for start in range(0, len(frames), step):
+            chunk = frames[start:start + step]
+            blob = np.empty((len(chunk), 3, self.input_size, self.input_size), dtype=np.float32)
+            transforms = [self._preprocess(frame, blob[i]) for i, frame in enumerate(chunk)]
+
+            output = self.session.run(None, {self.input_name: blob})[0]
+            for prediction, (scale, pad), frame in zip(output, transforms, chunk):
+                results.append(self._postprocess(prediction, scale, pad, frame.shape))
+        return results
+
+    def update_settings(self, settings: dict):
+        """Update ONNX detector settings"""
+        reload_model = False
+
+        if 'confidence' in settings:
+            self.confidence = settings['confidence']
+        if 'iou_threshold' in settings:
+            self.iou_threshold = settings['iou_threshold']
+        if 'model_size' in settings and settings['model_size'] != self.model_size:
+            self.model_size = settings['model_size']
+            reload_model = True
+        for key in ('intra_op_threads', 'inter_op_threads', 'provider'):
+            if key in settings and settings[key] != getattr(self, key):
+                setattr(self, key, settings[key])
+                reload_model = True
+
+        # Rebuild the session if the model or its threading changed
+        if reload_model:
+            self._load_session()
+
+    def get_settings(self) -> dict:
+        """Get current settings"""
+        return {
+            'confidence': self.confidence,
+            'iou_threshold': self.iou_threshold,
+            'model_size': self.model_size,
+            'intra_op_threads': self.intra_op_threads,
+            'inter_op_threads': self.inter_op_threads,
+            'provider': self.provider
+        }
@@ -0,0 +1,400 @@
+import atexit
+import multiprocessing as mp
+import queue
+import threading
+import time
+from collections import deque
+from multiprocessing import shared_memory
+from typing import List, Optional
+
+import numpy as np
+from detector_base import DetectorBase, Detection
+from frame_context import FrameContext
+
+DETECTOR_TYPES = ("mediapipe", "yolov8", "onnx")
+
+def detector_class(detector_type: str) -> type:
+    """Detector class implementing a type (imports its module)"""
+    if detector_type == "mediapipe":
+        from detector_mediapipe import MediaPipeDetector
+        return MediaPipeDetector
+    elif detector_type == "yolov8":
+        from detector_yolov8 import YOLOv8Detector
+        return YOLOv8Detector
+    elif detector_type == "onnx":
+        from detector_onnx import ONNXDetector
+        return ONNXDetector
+    raise ValueError(f"Unknown detector type: {detector_type}")
+
+def create_detector(detector_type: str, settings: dict, workers: int = 0) -> DetectorBase:
+    """
+    Create detector instance based on type (also runs inside pool workers).
+    workers > 0 returns a DetectorPool hosting the detector in that many processes.
+    """
+    if detector_type not in DETECTOR_TYPES:
+        raise ValueError(f"Unknown detector type: {detector_type}")
+    if workers > 0:
+        return DetectorPool(detector_type, settings, workers=workers)
+    
+    cls = detector_class(detector_type)
+    if detector_type == "mediapipe":
+        return cls(
+            score_threshold=settings.get('score_threshold', 0.25),
+            max_results=settings.get('max_results', 20)
+        )
+    elif detector_type == "yolov8":
+        return cls(
+            confidence=settings.get('confidence', 0.25),
+            iou_threshold=settings.get('iou_threshold', 0.45),
+            model_size=settings.get('model_size', 'n')
+        )
+    elif detector_type == "onnx":
+        return cls(
+            confidence=settings.get('confidence', 0.25),
+            iou_threshold=settings.get('iou_threshold', 0.45),
+            model_size=settings.get('model_size', 'n'),
+            intra_op_threads=settings.get('intra_op_threads', 0),
+            inter_op_threads=settings.get('inter_op_threads', 1),
+            provider=settings.get('provider', 'auto')
+        )
+
+def _worker_main(index, detector_type, settings, tasks, results):
+    """
+    Detector worker process.
+
+    Tasks: ("detect", ticket, slot, shm_name, shape, dtype), ("settings", dict) or None to exit.
+    Results: ("detect", ticket, slot, detections, error), ("settings", index, dict, reload_keys)
+    or ("error", index, message) if the detector cannot be built.
+    """
+    try:
+        detector = create_detector(detector_type, settings)
+    except Exception as e:
+        results.put(("error", index, f"detector worker {index} failed to start: {e}"))
+        return
+    results.put(("settings", index, detector.get_settings(), detector.RELOAD_SETTINGS))
+
+    attached = {}  # slot -> SharedMemory; re-attached when the parent reallocates a slot
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+
+        if task[0] == "settings":
+            detector.update_settings(task[1])
+            results.put(("settings", index, detector.get_settings(), detector.RELOAD_SETTINGS))
+            continue
+
+        _, ticket, slot, name, shape, dtype = task
+        shm = attached.get(slot)
+        if shm is None or shm.name != name:
+            if shm is not None:
+                shm.close()
+            shm = attached[slot] = shared_memory.SharedMemory(name=name)
+
+        # Zero-copy view of the frame written by the parent
+        frame = np.ndarray(shape, dtype, buffer=shm.buf)
+        try:
+            detections, error = detector.detect(frame), None
+        except Exception as e:
+            detections, error = [], str(e)
+        del frame
+        results.put(("detect", ticket, slot, detections, error))
+
+    for shm in attached.values():
+        shm.close()
+
+class DetectorPool(DetectorBase):
+    """
+    Detector instances hosted in worker processes.
+
+    Frames are copied into shared-memory slots and only small task tuples
+    go through the queues, so frames are never pickled. Each worker runs its
+    own detector (and its own GIL), so pre/post-processing of several frames
+    runs on several cores while the server process keeps serving requests.
+
+    submit() hands a frame to the least busy worker and next_result() returns
+    results in submission order, tagged with the caller's frame sequence number.
+    Several streams can share one pool: each submits on its own channel and
+    gets its own results back in its own order.
+    detect() is a blocking round trip for code that expects a plain detector.
+
+    A worker that fails to start or dies gets no more frames; its frames in
+    flight come back with no detections. A result that takes longer than
+    result_timeout is given up on the same way, so one stuck frame never
+    blocks the frames queued behind it.
+    """
+
+    def __init__(self, detector_type: str, settings: dict = None, workers: int = 2,
+                 slots: Optional[int] = None, submit_timeout: float = 5.0, result_timeout: float = 10.0):
+        """
+        Args:
+            detector_type: one of DETECTOR_TYPES
+            settings: detector settings passed to every worker
+            workers: number of worker processes
+            slots: shared-memory frame slots (frames in flight), default 2 per worker
+            submit_timeout: seconds submit() waits for a free slot before giving up
+            result_timeout: seconds a submitted frame may take before its result is given up
+        """
+        self.detector_type = detector_type
+        self.workers = max(1, int(workers))
+        self.slots = slots or 2 * self.workers
+        self.submit_timeout = submit_timeout
+        self.result_timeout = result_timeout
+        self._settings = dict(settings or {})
+        try:
+            # Known before the workers report in, so the first settings change
+            # that needs a new model is never applied in place
+            self.RELOAD_SETTINGS = tuple(detector_class(detector_type).RELOAD_SETTINGS)
+        except ImportError:
+            pass  # the workers will report the failure
+
+        # spawn: workers must not inherit the server's threads or its camera/model handles
+        context = mp.get_context("spawn")
+        self._results = context.Queue()
+        self._tasks = [context.Queue() for _ in range(self.workers)]
+        self._processes = [
+            context.Process(target=_worker_main, name=f"detector-{i}", daemon=True,
+                            args=(i, detector_type, self._settings, self._tasks[i], self._results))
+            for i in range(self.workers)
+        ]
+        for process in self._processes:
+            process.start()
+
+        self._segments = [None] * self.slots  # SharedMemory per slot, grown on demand
+        self._free_slots = queue.Queue()
+        for slot in range(self.slots):
+            self._free_slots.put(slot)
+        self._in_flight = [0] * self.workers
+        self._alive = [True] * self.workers  # False once a worker failed to start or died
+        self._ready = [False] * self.workers  # True once a worker has built its detector
+        self.error = None  # last worker failure
+
+        self._cond = threading.Condition()
+        self._next_ticket = 0
+        self._order = {}  # channel -> deque of submit() tickets, oldest first
+        self._tickets = {}  # ticket -> (seq, submitted_at, worker, slot), until the worker answers
+        self._done = {}  # ticket -> (seq, detections, latency)
+        self._abandoned = set()  # tickets nobody waits for any more; their results are dropped
+
+        self.running = True
+        self._receiver = threading.Thread(target=self._receive_loop, name="detector-pool", daemon=True)
+        self._receiver.start()
+        atexit.register(self.close)
+        print(f"Started {self.workers} {detector_type} detector worker(s)")
+
+    def _segment_for(self, slot: int, nbytes: int):
+        """Shared memory for a slot, reallocated when the frame size grows"""
+        shm = self._segments[slot]
+        if shm is None or shm.size < nbytes:
+            if shm is not None:
+                # Workers keep their mapping until they attach the new name
+                shm.close()
+                shm.unlink()
+            shm = self._segments[slot] = shared_memory.SharedMemory(create=True, size=nbytes)
+        return shm
+
+    def _dispatch(self, frame: np.ndarray, seq, channel=None, ordered: bool = False):
+        """Copy a frame into a free slot and queue it on the least busy worker; returns a ticket or None"""
+        if not self.running or not any(self._alive):
+            return None
+        try:
+            slot = self._free_slots.get(timeout=self.submit_timeout)
+        except queue.Empty:
+            print("Detector pool: no free slot, dropping frame")
+            return None
+
+        shm = self._segment_for(slot, frame.nbytes)
+        np.copyto(np.ndarray(frame.shape, frame.dtype, buffer=shm.buf), frame)
+
+        with self._cond:
+            alive = [worker for worker in range(self.workers) if self._alive[worker]]
+            if not alive:
+                self._free_slots.put(slot)
+                return None
+            worker = min(alive, key=self._in_flight.__getitem__)
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            self._tickets[ticket] = (seq, time.perf_counter(), worker, slot)
+            if ordered:
+                self._order.setdefault(channel, deque()).append(ticket)
+            self._in_flight[worker] += 1
+        self._tasks[worker].put(("detect", ticket, slot, shm.name, frame.shape, frame.dtype.str))
+        return ticket
+
+    def _finish(self, ticket, detections):
+        """Record a ticket's result and free its slot (caller holds _cond)"""
+        seq, submitted_at, worker, slot = self._tickets.pop(ticket)
+        self._in_flight[worker] -= 1
+        self._free_slots.put(slot)
+        if ticket in self._abandoned:
+            self._abandoned.discard(ticket)
+        else:
+            self._done[ticket] = (seq, detections, time.perf_counter() - submitted_at)
+        self._cond.notify_all()
+
+    def _mark_dead(self, worker: int, reason: str):
+        """Stop dispatching to a worker and fail its frames in flight"""
+        with self._cond:
+            if not self._alive[worker]:
+                return
+            self._alive[worker] = False
+            self.error = reason
+            for ticket in [t for t, entry in self._tickets.items() if entry[2] == worker]:
+                self._finish(ticket, [])
+            self._cond.notify_all()
+        print(f"Detector pool: {reason}")
+
+    def _check_workers(self):
+        for worker, process in enumerate(self._processes):
+            if self._alive[worker] and not process.is_alive():
+                self._mark_dead(worker, f"detector worker {worker} exited (code {process.exitcode})")
+
+    def _receive_loop(self):
+        last_check = time.perf_counter()
+        while self.running:
+            if time.perf_counter() - last_check > 0.5:
+                last_check = time.perf_counter()
+                self._check_workers()
+            try:
+                message = self._results.get(timeout=0.2)
+            except (queue.Empty, OSError, EOFError):
+                continue
+
+            kind = message[0]
+            if kind == "settings":
+                _, worker, settings, reload_keys = message
+                self._settings.update(settings)
+                self.RELOAD_SETTINGS = tuple(reload_keys)
+                with self._cond:
+                    self._ready[worker] = True
+                    self._cond.notify_all()
+            elif kind == "error":
+                self._mark_dead(message[1], message[2])
+            elif kind == "detect":
+                _, ticket, slot, detections, error = message
+                if error:
+                    print(f"Detector worker error: {error}")
+                with self._cond:
+                    # Unknown tickets belong to a worker already marked dead
+                    if ticket in self._tickets:
+                        self._finish(ticket, detections)
+
+    def wait_ready(self, timeout: float = 120.0):
+        """
+        Block until every worker has built its detector (or failed to).
+        Raises RuntimeError if none of them is up within timeout.
+        """
+        deadline = time.perf_counter() + timeout
+        with self._cond:
+            while any(alive and not ready for alive, ready in zip(self._alive, self._ready)):
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0 or not self.running:
+                    break
+                self._cond.wait(min(remaining, 0.5))
+            if not any(alive and ready for alive, ready in zip(self._alive, self._ready)):
+                raise RuntimeError(self.error or f"no {self.detector_type} detector worker started in {timeout:.0f}s")
+
+    def _give_up(self, ticket):
+        """Result of a ticket that took longer than result_timeout (caller holds _cond)"""
+        seq, submitted_at = self._tickets[ticket][:2]
+        self._abandoned.add(ticket)
+        print(f"Detector pool: no result after {self.result_timeout:.0f}s, skipping frame {seq}")
+        return seq, [], time.perf_counter() - submitted_at
+
+    def _expired(self, ticket) -> bool:
+        entry = self._tickets.get(ticket)
+        return entry is not None and time.perf_counter() - entry[1] > self.result_timeout
+
+    def submit(self, frame: np.ndarray, seq: int, channel=None) -> bool:
+        """Queue a BGR frame for detection; blocks while every slot is busy"""
+        return self._dispatch(frame, seq, channel, ordered=True) is not None
+
+    def next_result(self, timeout: Optional[float] = None, channel=None):
+        """
+        Oldest submitted frame's result on `channel` as (seq, detections, latency_seconds),
+        or None if it is not ready within timeout. Results never overtake each other.
+        """
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        with self._cond:
+            order = self._order.setdefault(channel, deque())
+            while not (order and order[0] in self._done):
+                if order and self._expired(order[0]):
+                    return self._give_up(order.popleft())
+                remaining = None if deadline is None else deadline - time.perf_counter()
+                if not self.running or (remaining is not None and remaining <= 0):
+                    return None
+                self._cond.wait(0.5 if remaining is None else min(remaining, 0.5))
+            return self._done.pop(order.popleft())
+
+    def pending(self, channel=None) -> int:
+        """Frames submitted but not yet returned by next_result() (all channels if None)"""
+        if channel is None:
+            return sum(len(order) for order in list(self._order.values()))
+        return len(self._order.get(channel, ()))
+
+    def discard_channel(self, channel):
+        """Drop a channel's frames in flight and results (its stream stopped collecting them)"""
+        with self._cond:
+            for ticket in self._order.pop(channel, ()):
+                if self._done.pop(ticket, None) is None and ticket in self._tickets:
+                    self._abandoned.add(ticket)
+
+    def _wait(self, ticket) -> List[Detection]:
+        with self._cond:
+            while ticket not in self._done:
+                if self._expired(ticket):
+                    return self._give_up(ticket)[1]
+                if not self.running:
+                    return []
+                self._cond.wait(0.5)
+            return self._done.pop(ticket)[1]
+
+    def detect(self, frame) -> List[Detection]:
+        """Blocking detection of a single frame (does not disturb submit() ordering)"""
+        ticket = self._dispatch(frame, None)
+        return [] if ticket is None else self._wait(ticket)
+
+    def detect_batch(self, frames) -> List[List[Detection]]:
+        """Spread a batch over the workers and wait for all of it"""
+        frames = [f.bgr if isinstance(f, FrameContext) else f for f in frames]
+        tickets = [self._dispatch(frame, None) for frame in frames]
+        return [[] if ticket is None else self._wait(ticket) for ticket in tickets]
+
+    def update_settings(self, settings: dict):
+        """Forward settings to every worker"""
+        for tasks in self._tasks:
+            tasks.put(("settings", settings))
+
+    def get_settings(self) -> dict:
+        """Settings last reported by the workers"""
+        return dict(self._settings)
+
+    def get_stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "alive": sum(self._alive),
+            "slots": self.slots,
+            "in_flight": list(self._in_flight),
+            "pending": self.pending(),
+        }
+
+    def close(self):
+        """Stop the workers and release the shared memory"""
+        if not self.running:
+            return
+        self.running = False
+        with self._cond:
+            self._cond.notify_all()
+        for tasks in self._tasks:
+            tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=2.0)
+            if process.is_alive():
+                process.terminate()
+        self._receiver.join(timeout=1.0)
+        for shm in self._segments:
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+        self._segments = [None] * self.slots
+        atexit.unregister(self.close)
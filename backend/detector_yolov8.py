@@ -1,11 +1,14 @@
 import cv2
 import numpy as np
 from typing import List
-from detector_base import DetectorBase, Detection
+from detector_base import DetectorBase, DetectionBatch
+from frame_context import FrameContext
 
 class YOLOv8Detector(DetectorBase):
     """YOLOv8 object detector implementation using Ultralytics"""
     
+    RELOAD_SETTINGS = ('model_size',)
+    
     def __init__(self, confidence: float = 0.25, iou_threshold: float = 0.45, 
                  model_size: str = 'n'):
         try:
@@ -28,48 +31,42 @@ class YOLOv8Detector(DetectorBase):
         # COCO class names - person is class 0
         self.person_class_id = 0
     
-    def detect(self, frame: np.ndarray) -> List[Detection]:
+    def detect(self, frame: np.ndarray) -> DetectionBatch:
         """Detect objects using YOLOv8"""
-        # Run inference
+        return self.detect_batch([frame])[0]
+    
+    def detect_batch(self, frames) -> List[DetectionBatch]:
+        """Detect objects in several frames with one batched model call"""
+        frames = [f.bgr if isinstance(f, FrameContext) else f for f in frames]
+        if not frames:
+            return []
+        
+        # Run inference (Ultralytics letterboxes and stacks a list into one batch).
+        # classes= filters before NMS, so non-person boxes never reach it.
         results = self.model(
-            frame, 
+            frames, 
             conf=self.confidence,
             iou=self.iou_threshold,
+            classes=[self.person_class_id],
             verbose=False
         )
         
-        detections = []
+        # One Results object per input frame, in order
+        return [self._to_detections(result) for result in results]
+    
+    def _to_detections(self, result) -> DetectionBatch:
+        """Convert one Ultralytics Results object with a single device-to-host copy"""
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
+            return DetectionBatch.empty()
+        
+        # Rows of boxes.data: x1, y1, x2, y2, [track id,] conf, cls
+        data = boxes.data.cpu().numpy()
         
-        # Process results
-        for result in results:
-            boxes = result.boxes
-            for box in boxes:
-                # Get class id
-                cls_id = int(box.cls[0])
-                
-                # Filter for person only (class 0 in COCO)
-                if cls_id != self.person_class_id:
-                    continue
-                
-                # Get bounding box coordinates (xyxy format)
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                x, y = int(x1), int(y1)
-                w, h = int(x2 - x1), int(y2 - y1)
-                
-                # Get confidence score
-                score = float(box.conf[0])
-                
-                # Calculate center
-                cx, cy = x + w // 2, y + h // 2
-                
-                detections.append(Detection(
-                    bbox=(x, y, w, h),
-                    category='person',
-                    score=score,
-                    center=(cx, cy)
-                ))
+        # Filter for person only (class 0 in COCO); classes= already did, this is a guard
+        data = data[data[:, -1] == self.person_class_id]
         
-        return detections
+        return DetectionBatch.from_xyxy(data[:, :4], data[:, -2], data[:, -1])
     
     def update_settings(self, settings: dict):
         """Update YOLOv8 settings"""
@@ -0,0 +1,85 @@
+import cv2
+import numpy as np
+
+class FrameBufferPool:
+    """
+    Preallocated destination buffers reused across frames.
+
+    Each (name, shape, dtype) owns a small ring of `depth` arrays, so a buffer
+    handed out stays valid for the next depth - 1 requests of the same name
+    (the motion estimator keeps the previous gray frame, hence depth=2).
+    A pool must only be used from one thread.
+    """
+
+    def __init__(self, depth: int = 2):
+        self.depth = depth
+        self._rings = {}  # name -> (shape, dtype, buffers, index)
+
+    def get(self, name: str, shape, dtype=np.uint8) -> np.ndarray:
+        shape = tuple(shape)
+        dtype = np.dtype(dtype)
+        ring = self._rings.get(name)
+        if ring is None or ring[0] != shape or ring[1] != dtype:
+            # New or resized stream: drop the old buffers for this name
+            ring = (shape, dtype, [np.empty(shape, dtype) for _ in range(self.depth)], -1)
+        index = (ring[3] + 1) % self.depth
+        self._rings[name] = (ring[0], ring[1], ring[2], index)
+        return ring[2][index]
+
+class FrameContext:
+    """
+    One decoded frame plus lazily computed variants of it.
+
+    Consumers (motion estimator, detectors, renderer) ask for the color space
+    and resolution they need; each variant is computed at most once per frame
+    and written into pooled buffers instead of freshly allocated arrays.
+    """
+
+    def __init__(self, bgr: np.ndarray, pool: FrameBufferPool = None, seq: int = None):
+        self.bgr = bgr
+        self.pool = pool if pool is not None else FrameBufferPool()
+        self.seq = seq
+        self.height, self.width = bgr.shape[:2]
+        self._cache = {}
+
+    @property
+    def shape(self):
+        return self.bgr.shape
+
+    def scaled_size(self, scale: float):
+        """(width, height) of the frame at `scale`"""
+        if scale == 1.0:
+            return self.width, self.height
+        return max(1, int(self.width * scale)), max(1, int(self.height * scale))
+
+    def resized(self, width: int, height: int) -> np.ndarray:
+        """BGR frame at (width, height)"""
+        if (width, height) == (self.width, self.height):
+            return self.bgr
+        key = ("bgr", width, height)
+        if key not in self._cache:
+            dst = self.pool.get(f"bgr_{width}x{height}", (height, width, 3))
+            self._cache[key] = cv2.resize(self.bgr, (width, height), dst=dst, interpolation=cv2.INTER_LINEAR)
+        return self._cache[key]
+
+    def gray(self, scale: float = 1.0) -> np.ndarray:
+        """Grayscale frame, optionally downscaled (resized before converting)"""
+        width, height = self.scaled_size(scale)
+        key = ("gray", width, height)
+        if key not in self._cache:
+            dst = self.pool.get(f"gray_{width}x{height}", (height, width))
+            self._cache[key] = cv2.cvtColor(self.resized(width, height), cv2.COLOR_BGR2GRAY, dst=dst)
+        return self._cache[key]
+
+    def rgb(self) -> np.ndarray:
+        """Full-resolution RGB frame"""
+        if "rgb" not in self._cache:
+            dst = self.pool.get("rgb", self.bgr.shape)
+            self._cache["rgb"] = cv2.cvtColor(self.bgr, cv2.COLOR_BGR2RGB, dst=dst)
+        return self._cache["rgb"]
+
+def as_frame_context(frame, pool: FrameBufferPool = None) -> FrameContext:
+    """Wrap a raw BGR array (pass FrameContext objects through)"""
+    if isinstance(frame, FrameContext):
+        return frame
+    return FrameContext(frame, pool)
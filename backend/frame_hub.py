@@ -0,0 +1,98 @@
+import asyncio
+import threading
+import time
+from typing import Optional
+
+class FrameHub:
+    """
+    Encode-once fan-out of the latest JPEG to every MJPEG client.
+
+    The capture thread publishes each encoded frame once; the multipart chunk is
+    built a single time and shared by all clients. Clients sleep until a new
+    frame is signalled (via loop.call_soon_threadsafe) and remember the sequence
+    number they last sent, so they never resend a frame. A slow client simply
+    picks up the newest frame when it is ready again instead of queueing.
+    publish_raw() fans out other latest-value payloads the same way (binary
+    track frames).
+    """
+
+    def __init__(self):
+        self.loop = None
+        self.seq = 0
+        self.latest_chunk = None
+        self.clients = 0
+        self._lock = threading.Lock()
+        self._event = None
+
+    def publish(self, jpeg: bytes, seq: Optional[int] = None, timestamp: Optional[float] = None):
+        """
+        Store a new encoded frame and wake waiting clients (thread-safe).
+        seq/timestamp go into X-Frame-Seq/X-Timestamp part headers so clients
+        can line the frame up with its track frames.
+        """
+        headers = b'Content-Type: image/jpeg\r\n'
+        if seq is not None:
+            headers += b'X-Frame-Seq: %d\r\n' % seq
+        if timestamp is not None:
+            headers += b'X-Timestamp: %.3f\r\n' % timestamp
+        self.publish_raw(b'--frame\r\n' + headers + b'\r\n' + jpeg + b'\r\n')
+
+    def publish_raw(self, chunk: bytes):
+        """Store a payload that subscribers get as-is (e.g. binary track frames)"""
+        with self._lock:
+            self.seq += 1
+            self.latest_chunk = chunk
+
+        loop = self.loop
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(self._notify)
+            except RuntimeError:
+                # Event loop already closed (shutdown)
+                self.loop = None
+
+    def _notify(self):
+        # Runs on the event loop: release everyone waiting on the current event
+        if self._event is not None:
+            self._event.set()
+            self._event = None
+
+    def _wait_event(self) -> asyncio.Event:
+        if self._event is None:
+            self._event = asyncio.Event()
+        return self._event
+
+    async def subscribe(self, max_fps: Optional[float] = None):
+        """
+        Async generator yielding multipart chunks for one client.
+
+        Args:
+            max_fps: optional per-client cap; frames arriving faster are skipped
+        """
+        if self.loop is None:
+            self.loop = asyncio.get_running_loop()
+        min_interval = 1.0 / max_fps if max_fps and max_fps > 0 else 0.0
+
+        last_seq = 0
+        last_sent = 0.0
+        self.clients += 1
+        try:
+            while True:
+                with self._lock:
+                    seq, chunk = self.seq, self.latest_chunk
+
+                if chunk is None or seq == last_seq:
+                    await self._wait_event().wait()
+                    continue
+
+                if min_interval:
+                    delay = last_sent + min_interval - time.monotonic()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                        continue  # re-read so we send the newest frame
+
+                last_seq = seq
+                last_sent = time.monotonic()
+                yield chunk
+        finally:
+            self.clients -= 1
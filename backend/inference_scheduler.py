@@ -0,0 +1,346 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+from detector_base import DetectorBase, Detection
+from detector_handle import DetectorHandle
+from pipeline import StageStats
+
+# Detector seconds (per unit of priority) a stream may run ahead of the
+# slowest active stream before its frames wait for the others
+FAIR_QUANTUM = 0.02
+# A stream that submitted within this many seconds still counts as active
+ACTIVE_WINDOW = 1.0
+
+class _StreamQueue:
+    """Pending requests and fair-share accounting of one registered stream"""
+
+    def __init__(self, stream_id: str, target_fps: float, priority: float, virtual_time: float):
+        self.stream_id = stream_id
+        self.requests = deque()  # (frame, future, submitted_at, pixels), oldest first
+        self.virtual_time = virtual_time
+        self.avg_cost = 0.0  # detector seconds per frame of this stream
+        self.stats = StageStats()  # submit -> result latency, achieved fps
+        self.submitted = 0
+        self.last_submit = 0.0
+        self.dropped_budget = 0
+        self.dropped_stale = 0
+        self.set_budget(target_fps, priority)
+
+    def set_budget(self, target_fps: float, priority: float):
+        self.target_fps = max(0.0, target_fps or 0.0)
+        self.priority = max(priority or 1.0, 1e-3)
+        # Token bucket for target_fps; 2 tokens absorb capture jitter
+        self.tokens = 2.0
+        self.last_refill = time.perf_counter()
+
+    def admit(self, now: float) -> bool:
+        """Spend a token if the stream is within its FPS budget (always True without one)"""
+        if not self.target_fps:
+            return True
+        self.tokens = min(2.0, self.tokens + (now - self.last_refill) * self.target_fps)
+        self.last_refill = now
+        if self.tokens < 1.0:
+            return False
+        self.tokens -= 1.0
+        return True
+
+    def to_dict(self) -> dict:
+        stats = self.stats.to_dict()
+        stats.update({
+            "target_fps": self.target_fps,
+            "priority": self.priority,
+            "submitted": self.submitted,
+            "dropped_budget": self.dropped_budget,
+            "dropped_stale": self.dropped_stale,
+            "queue_depth": len(self.requests),
+            "avg_cost_ms": round(self.avg_cost * 1000, 2),
+        })
+        return stats
+
+
+class InferenceClient(DetectorBase):
+    """
+    One stream's view of the shared InferenceScheduler. Behaves like a detector,
+    except that detect*() return None for frames the scheduler dropped.
+    """
+
+    def __init__(self, scheduler: "InferenceScheduler", stream_id: str):
+        self.scheduler = scheduler
+        self.stream_id = stream_id
+
+    @property
+    def handle(self) -> DetectorHandle:
+        return self.scheduler.handle
+
+    def detect(self, frame) -> Optional[List[Detection]]:
+        return self.scheduler.submit(self.stream_id, frame).result()
+
+    def detect_context(self, ctx) -> Optional[List[Detection]]:
+        return self.scheduler.submit(self.stream_id, ctx).result()
+
+    def detect_batch(self, frames) -> List[Optional[List[Detection]]]:
+        futures = [self.scheduler.submit(self.stream_id, frame) for frame in frames]
+        return [future.result() for future in futures]
+
+    def set_budget(self, target_fps: float = None, priority: float = None):
+        self.scheduler.set_budget(self.stream_id, target_fps, priority)
+
+    def update_settings(self, settings: dict):
+        self.scheduler.update_settings(settings)
+
+    def get_settings(self) -> dict:
+        return self.scheduler.get_settings()
+
+    def requires_reload(self, settings: dict) -> bool:
+        return self.scheduler.requires_reload(settings)
+
+    def get_stats(self) -> dict:
+        """This stream's scheduling stats plus the shared detector's"""
+        stats = self.scheduler.get_stats()
+        return {"stream": stats["streams"].get(self.stream_id, {}), "shared": stats["shared"]}
+
+    def close(self):
+        self.scheduler.unregister(self.stream_id)
+
+
+class InferenceScheduler(DetectorBase):
+    """
+    One detector shared by several stream pipelines, with fair sharing.
+
+    Each stream registers for an InferenceClient and detects through it as if
+    it owned the detector; the call is queued per stream and blocks until the
+    scheduler thread has run it. The scheduler thread picks frames by weighted
+    fair queuing: the stream that has used the least detector time per unit of
+    priority goes next, so a stream sending big or frequent frames cannot
+    starve the others. Up to max_batch picked frames (waiting at most max_wait
+    after the first one) run in a single detect_batch call.
+
+    Under overload frames are dropped rather than queued: frames over a
+    stream's target_fps budget are refused at submit, a stream holds at most
+    max_batch waiting frames (the oldest is dropped) and a frame older than
+    max_age is dropped before dispatch once a newer frame of the same stream
+    is waiting. A stream's only frame is never dropped for age: it may just be
+    waiting for its fair turn. Dropped frames resolve to None.
+    """
+
+    def __init__(self, handle: DetectorHandle, max_batch: int = 4, max_wait: float = 0.01,
+                 max_age: float = 0.25):
+        """
+        Args:
+            handle: the shared detector (switched through handle.set_detector)
+            max_batch: most frames per detector call
+            max_wait: seconds a batch waits for more frames after the first one
+            max_age: frames that waited longer than this (seconds) are dropped for a newer one
+        """
+        self.handle = handle
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait
+        self.max_age = max_age
+        self.stats = StageStats()
+        self.avg_batch_size = 0.0
+        self._streams: Dict[str, _StreamQueue] = {}
+        self._cond = threading.Condition()
+        self.running = True
+        self._thread = threading.Thread(target=self._run, name="inference-scheduler", daemon=True)
+        self._thread.start()
+
+    @property
+    def detector_type(self) -> str:
+        return self.handle.detector_type
+
+    def register(self, stream_id: str, target_fps: float = 0.0, priority: float = 1.0) -> InferenceClient:
+        """
+        Add a stream and return the client its analyzer detects through.
+
+        Args:
+            target_fps: most analyzed frames per second (0 = no budget)
+            priority: share weight; a priority 2 stream gets twice the detector time of a priority 1 one
+        """
+        with self._cond:
+            if stream_id in self._streams:
+                raise ValueError(f"Stream already registered: {stream_id}")
+            # Start level with the others so a new stream does not get a burst of catch-up turns
+            virtual_time = min((s.virtual_time for s in self._streams.values()), default=0.0)
+            self._streams[stream_id] = _StreamQueue(stream_id, target_fps, priority, virtual_time)
+        return InferenceClient(self, stream_id)
+
+    def unregister(self, stream_id: str):
+        """Remove a stream; its waiting frames resolve to None"""
+        with self._cond:
+            stream = self._streams.pop(stream_id, None)
+        if stream is not None:
+            for _, future, _, _ in stream.requests:
+                future.set_result(None)
+
+    def set_budget(self, stream_id: str, target_fps: float = None, priority: float = None):
+        """Change a stream's target_fps and/or priority (None keeps the current value)"""
+        with self._cond:
+            stream = self._streams[stream_id]
+            stream.set_budget(stream.target_fps if target_fps is None else target_fps,
+                              stream.priority if priority is None else priority)
+
+    def submit(self, stream_id: str, frame) -> Future:
+        """Queue a frame of a stream; the future resolves to its detections or None if dropped"""
+        future = Future()
+        now = time.perf_counter()
+        with self._cond:
+            stream = self._streams.get(stream_id)
+            if not self.running or stream is None:
+                future.set_result(None)
+                return future
+            stream.submitted += 1
+            if now - stream.last_submit > ACTIVE_WINDOW:
+                # Back from idle: no credit for the time it did not use
+                stream.virtual_time = max(stream.virtual_time, self._active_floor(now))
+            stream.last_submit = now
+            if not stream.admit(now):
+                stream.dropped_budget += 1
+                future.set_result(None)
+                return future
+            if len(stream.requests) >= self.max_batch:
+                # Never build a backlog: a newer frame replaces the oldest waiting one
+                stream.requests.popleft()[1].set_result(None)
+                stream.dropped_stale += 1
+            shape = frame.shape
+            stream.requests.append((frame, future, now, shape[0] * shape[1]))
+            self._cond.notify()
+        return future
+
+    def _drop_stale(self, now: float):
+        """Drop frames that waited longer than max_age and have a newer one behind them (caller holds _cond)"""
+        for stream in self._streams.values():
+            while len(stream.requests) > 1 and now - stream.requests[0][2] > self.max_age:
+                stream.requests.popleft()[1].set_result(None)
+                stream.dropped_stale += 1
+
+    def _active_floor(self, now: float) -> float:
+        """Lowest virtual time of the streams that are waiting or submitted recently"""
+        return min((s.virtual_time for s in self._streams.values()
+                    if s.requests or now - s.last_submit <= ACTIVE_WINDOW), default=0.0)
+
+    def _pick(self, now: float, force: bool = False) -> Optional[tuple]:
+        """
+        Next frame by weighted fair queuing (caller holds _cond): the oldest frame of
+        the waiting stream with the lowest virtual time. A stream more than
+        FAIR_QUANTUM ahead of the slowest active stream is not picked unless
+        `force`: streams block on their frames, so the others may just be about
+        to submit. The stream is charged its expected cost right away so one
+        batch is spread over the streams.
+        """
+        waiting = [s for s in self._streams.values() if s.requests]
+        if not waiting:
+            return None
+        stream = min(waiting, key=lambda s: s.virtual_time)
+        if not force and stream.virtual_time - self._active_floor(now) > FAIR_QUANTUM:
+            return None
+        stream.virtual_time += stream.avg_cost / stream.priority
+        return (stream,) + stream.requests.popleft()
+
+    def _collect(self):
+        """Wait for frames and pick up to max_batch of them"""
+        with self._cond:
+            batch = []
+            deadline = None
+            while len(batch) < self.max_batch and self.running:
+                now = time.perf_counter()
+                self._drop_stale(now)
+                # Rather than idle the detector, serve a stream that is ahead once
+                # the others had max_wait to come back
+                force = not batch and deadline is not None and now >= deadline
+                item = self._pick(now, force)
+                if item is not None:
+                    batch.append(item)
+                    if deadline is None:
+                        deadline = now + self.max_wait
+                    continue
+                if deadline is None:
+                    if not any(s.requests for s in self._streams.values()):
+                        self._cond.wait(0.1)
+                        break
+                    deadline = now + self.max_wait
+                remaining = deadline - now
+                if remaining <= 0 and batch:
+                    break
+                self._cond.wait(max(remaining, 0))
+            return batch
+
+    def _run(self):
+        while self.running:
+            batch = self._collect()
+            if not batch:
+                continue
+
+            # Between batches nothing uses a swapped-out detector any more
+            self.handle.close_retired()
+            detector = self.handle.detector
+
+            start = time.perf_counter()
+            try:
+                results = detector.detect_batch([frame for _, frame, _, _, _ in batch])
+            except Exception as e:
+                print(f"Inference scheduler error: {e}")
+                results = [[] for _ in batch]
+            done = time.perf_counter()
+            latency = done - start
+
+            # Charge each stream its share of the batch time (by pixels: bigger frames cost more)
+            total_pixels = sum(item[4] for item in batch) or 1
+            with self._cond:
+                for stream, _, _, submitted_at, pixels in batch:
+                    cost = latency * pixels / total_pixels
+                    expected = stream.avg_cost
+                    stream.avg_cost = cost if not expected else expected + 0.2 * (cost - expected)
+                    stream.virtual_time += (cost - expected) / stream.priority
+                    stream.stats.record(done - submitted_at)
+            for (_, _, future, _, _), detections in zip(batch, results):
+                future.set_result(detections)
+
+            self.stats.record(latency / len(batch), count=len(batch))
+            if self.avg_batch_size:
+                self.avg_batch_size += self.stats.smoothing * (len(batch) - self.avg_batch_size)
+            else:
+                self.avg_batch_size = float(len(batch))
+
+    def detect(self, frame) -> List[Detection]:
+        """Unscheduled detection (warm-up, scripts); streams go through their client"""
+        return self.handle.detector.detect(frame)
+
+    def detect_batch(self, frames) -> List[List[Detection]]:
+        return self.handle.detector.detect_batch(frames)
+
+    def update_settings(self, settings: dict):
+        self.handle.detector.update_settings(settings)
+
+    def get_settings(self) -> dict:
+        return self.handle.detector.get_settings()
+
+    def requires_reload(self, settings: dict) -> bool:
+        return self.handle.detector.requires_reload(settings)
+
+    def get_stats(self) -> dict:
+        """Shared detector throughput plus achieved fps and drop counts per stream"""
+        shared = self.stats.to_dict()
+        with self._cond:
+            streams = {stream_id: stream.to_dict() for stream_id, stream in self._streams.items()}
+        shared.update({
+            "queue_depth": sum(s["queue_depth"] for s in streams.values()),
+            "max_batch": self.max_batch,
+            "max_wait_ms": round(self.max_wait * 1000, 1),
+            "max_age_ms": round(self.max_age * 1000, 1),
+            "avg_batch_size": round(self.avg_batch_size, 2),
+        })
+        return {"shared": shared, "streams": streams}
+
+    def close(self):
+        """Stop the scheduler thread, drop waiting frames and close the detector"""
+        if not self.running:
+            return
+        with self._cond:
+            self.running = False
+            self._cond.notify_all()
+        self._thread.join(timeout=2.0)
+        for stream_id in list(self._streams):
+            self.unregister(stream_id)
+        self.handle.close()
@@ -0,0 +1,119 @@
+import cv2
+import numpy as np
+from typing import Dict, List, Optional
+from frame_hub import FrameHub
+from frame_context import FrameBufferPool
+
+ENCODER_BACKENDS = ("auto", "turbojpeg", "opencv")
+
+# /video_feed renditions when the config has none: the full frame at quality 80
+DEFAULT_RENDITIONS = {"full": {"quality": 80}}
+
+class JpegEncoder:
+    """
+    JPEG encoding with libjpeg-turbo (PyTurboJPEG) when available, else OpenCV.
+
+    Args:
+        backend: "auto" (TurboJPEG if installed), "turbojpeg" or "opencv"
+    """
+
+    def __init__(self, backend: str = "auto"):
+        if backend not in ENCODER_BACKENDS:
+            raise ValueError(f"Unknown JPEG encoder backend: {backend}")
+        self.turbo = None
+        if backend in ("auto", "turbojpeg"):
+            try:
+                from turbojpeg import TurboJPEG
+                self.turbo = TurboJPEG()
+            except Exception as e:
+                # ImportError, or the libturbojpeg shared library is missing
+                if backend == "turbojpeg":
+                    print(f"Warning: TurboJPEG not available ({e}), using OpenCV")
+        self.backend = "turbojpeg" if self.turbo is not None else "opencv"
+
+    def encode(self, image: np.ndarray, quality: int = 80) -> Optional[bytes]:
+        """BGR image -> JPEG bytes (None if encoding failed)"""
+        if self.turbo is not None:
+            return self.turbo.encode(image, quality=quality)
+        ret, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        return buffer.tobytes() if ret else None
+
+
+class Rendition:
+    """One /video_feed variant: output width (None = source size), JPEG quality and its clients"""
+
+    def __init__(self, name: str, width: Optional[int] = None, quality: int = 80):
+        self.name = name
+        self.width = width
+        self.quality = quality
+        self.hub = FrameHub()
+
+    def output_size(self, width: int, height: int):
+        """(w, h) for a source frame, keeping the aspect ratio and never upscaling"""
+        if not self.width or self.width >= width:
+            return width, height
+        return self.width, max(1, round(height * self.width / width))
+
+
+class RenditionEncoder:
+    """
+    Encodes each frame once per rendition that has clients.
+
+    Renditions nobody watches cost nothing. Smaller ones are resized from the
+    next larger rendition (not from the source frame) into reused buffers.
+    """
+
+    def __init__(self, renditions: List[Rendition], encoder: JpegEncoder):
+        self.renditions = sorted(renditions, key=lambda r: -(r.width or 1 << 30))
+        self.encoder = encoder
+        self._pool = FrameBufferPool(depth=1)  # encode stage only
+
+    @classmethod
+    def from_config(cls, config: dict) -> "RenditionEncoder":
+        """
+        From roi_config.json:
+            "video_renditions": {"full": {"quality": 80}, "preview": {"width": 960, "quality": 70}, ...}
+            "jpeg_encoder": "auto" | "turbojpeg" | "opencv"
+        """
+        renditions = [Rendition(name, settings.get("width"), settings.get("quality", 80))
+                      for name, settings in config.get("video_renditions", DEFAULT_RENDITIONS).items()]
+        return cls(renditions, JpegEncoder(config.get("jpeg_encoder", "auto")))
+
+    def get(self, name: str) -> Rendition:
+        """Rendition by name; KeyError if there is none"""
+        for rendition in self.renditions:
+            if rendition.name == name:
+                return rendition
+        raise KeyError(name)
+
+    @property
+    def default(self) -> Rendition:
+        """"full" if configured, else the largest rendition"""
+        try:
+            return self.get("full")
+        except KeyError:
+            return self.renditions[0]
+
+    @property
+    def clients(self) -> int:
+        return sum(rendition.hub.clients for rendition in self.renditions)
+
+    def get_stats(self) -> Dict[str, dict]:
+        return {r.name: {"width": r.width, "quality": r.quality, "clients": r.hub.clients}
+                for r in self.renditions}
+
+    def publish(self, image: np.ndarray, seq: Optional[int] = None, timestamp: Optional[float] = None):
+        """Encode `image` for every watched rendition and publish it to its clients"""
+        source = image
+        for rendition in self.renditions:
+            if not rendition.hub.clients:
+                continue
+            w, h = rendition.output_size(image.shape[1], image.shape[0])
+            if (w, h) != (source.shape[1], source.shape[0]):
+                # Downscale from the previous (larger) rendition, into a reused buffer
+                resized = self._pool.get(rendition.name, (h, w, 3))
+                cv2.resize(source, (w, h), dst=resized, interpolation=cv2.INTER_AREA)
+                source = resized
+            jpeg = self.encoder.encode(source, rendition.quality)
+            if jpeg is not None:
+                rendition.hub.publish(jpeg, seq, timestamp)
@@ -1,7 +1,7 @@
-from fastapi import FastAPI, WebSocket
+from fastapi import FastAPI, WebSocket, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from streamer import get_video_stream, streamer_instance
-import asyncio
+from stream_manager import stream_manager
+from typing import List, Optional
 
 app = FastAPI(title="Motion Image Learner", version="0.1.0")
 
@@ -13,31 +13,58 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# The un-prefixed endpoints act on the default stream
+streamer_instance = stream_manager.get("default")
+
 @app.on_event("startup")
 async def startup_event():
-    # Start the singleton streamer background thread
-    streamer_instance.start_stream()
-    # Start stats broadcaster
-    asyncio.create_task(stats_broadcaster())
+    # Start every stream's background threads; stats are pushed as frames finish
+    stream_manager.start_all()
+
+@app.on_event("shutdown")
+def shutdown_event():
+    stream_manager.stop_all()
 
-async def stats_broadcaster():
-    while True:
-        await streamer_instance.broadcast_stats()
-        await asyncio.sleep(0.1) # 10 FPS stats update
+def get_stream(stream_id: str):
+    """Streamer of a stream id, 404 if there is none"""
+    try:
+        return stream_manager.get(stream_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown stream: {stream_id}")
 
 @app.get("/")
 def read_root():
     return {"message": "Motion Image Learner Backend is Running"}
 
+def video_response(streamer, max_fps: Optional[float], rendition: Optional[str]):
+    try:
+        return streamer.get_video_stream(max_fps, rendition)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown rendition: {rendition}")
+
 @app.get("/video_feed")
-def video_feed():
-    return get_video_stream()
+def video_feed(max_fps: Optional[float] = None, rendition: Optional[str] = None):
+    # rendition: one of video_renditions (e.g. full, preview, thumbnail)
+    return video_response(streamer_instance, max_fps, rendition)
+
+@app.get("/pipeline")
+def get_pipeline_stats():
+    return streamer_instance.get_pipeline_stats()
+
+def parse_channels(channels: Optional[str]):
+    """?channels=stats,tracks -> ["stats", "tracks"] (None keeps the default)"""
+    return channels.split(",") if channels else None
 
 @app.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
-    await streamer_instance.add_websocket(websocket)
+async def websocket_endpoint(websocket: WebSocket, channels: Optional[str] = None):
+    await streamer_instance.add_websocket(websocket, parse_channels(channels))
+
+@app.websocket("/tracks")
+async def tracks_websocket_endpoint(websocket: WebSocket, max_fps: Optional[float] = None):
+    # Binary track frames (format in track_frames.py)
+    await streamer_instance.add_track_websocket(websocket, max_fps)
 
-from calibration import load_calibration, save_calibration, CalibrationSettings
+from calibration import CalibrationSettings
 from pydantic import BaseModel
 
 class StreamSettings(BaseModel):
@@ -50,12 +77,29 @@ def update_stream_url(settings: StreamSettings):
 
 @app.get("/calibration")
 def get_calibration():
-    return load_calibration()
+    return streamer_instance.calibration
 
 @app.post("/calibration")
 def update_calibration(settings: CalibrationSettings):
-    save_calibration(settings)
-    return {"status": "saved", "settings": settings}
+    return update_stream_calibration("default", settings)
+
+class RoiSettings(BaseModel):
+    points: List[dict]  # [{"x": ..., "y": ...}] in percent of the frame
+
+@app.post("/roi")
+def update_roi(settings: RoiSettings):
+    return update_stream_roi("default", settings)
+
+class OverlaySettings(BaseModel):
+    mode: str  # "server" (drawn into the video) or "client" (raw video + /tracks)
+
+@app.get("/overlay")
+def get_overlay_mode():
+    return {"mode": streamer_instance.overlay_mode}
+
+@app.post("/overlay")
+def update_overlay_mode(settings: OverlaySettings):
+    return update_stream_overlay_mode("default", settings)
 
 class SeekSettings(BaseModel):
     seconds: int
@@ -69,11 +113,12 @@ class TrackerSettings(BaseModel):
     maxDistance: int
     maxDisappeared: int
     scoreThreshold: float
+    associationMethod: Optional[str] = None  # "greedy" or "hungarian"
+    showGrid: Optional[bool] = None
 
 @app.post("/settings")
 def update_settings(settings: TrackerSettings):
-    streamer_instance.analyzer.update_settings(settings.dict())
-    return {"status": "updated", "settings": settings}
+    return update_stream_settings("default", settings)
 
 class ModelSettings(BaseModel):
     detector_type: str
@@ -81,17 +126,25 @@ class ModelSettings(BaseModel):
 
 @app.get("/model")
 def get_model():
+    # One detector is shared by every stream
+    handle = stream_manager.detector_handle
     return {
-        "detector_type": streamer_instance.analyzer.detector_type,
-        "settings": streamer_instance.analyzer.detector.get_settings()
+        "detector_type": handle.detector_type,
+        "settings": handle.detector.get_settings(),
+        # "loading" while a new detector is built in the background
+        "status": handle.status
     }
 
 @app.post("/model")
 def update_model(model_settings: ModelSettings):
-    streamer_instance.analyzer.set_detector(
-        model_settings.detector_type,
-        model_settings.settings
-    )
+    # Returns right away; a new model is loaded in the background and swapped in when ready
+    try:
+        status = stream_manager.set_detector(
+            model_settings.detector_type,
+            model_settings.settings
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
     # Save to config
     try:
@@ -106,9 +159,118 @@ def update_model(model_settings: ModelSettings):
         print(f"Error saving model config: {e}")
     
     return {
-        "status": "updated",
+        "status": status,
         "detector_type": model_settings.detector_type,
         "settings": model_settings.settings
     }
 
+# --- Per-stream endpoints ---
+
+class NewStream(BaseModel):
+    id: str
+    url: str
+
+@app.get("/streams")
+def list_streams():
+    return stream_manager.list_streams()
+
+@app.post("/streams")
+def add_stream(new_stream: NewStream):
+    try:
+        stream_manager.add_stream(new_stream.id, new_stream.url, start=True, save=True)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "added", "id": new_stream.id, "url": new_stream.url}
 
+@app.delete("/streams/{stream_id}")
+def remove_stream(stream_id: str):
+    get_stream(stream_id)
+    try:
+        stream_manager.remove_stream(stream_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "removed", "id": stream_id}
+
+@app.get("/streams/{stream_id}/video_feed")
+def stream_video_feed(stream_id: str, max_fps: Optional[float] = None, rendition: Optional[str] = None):
+    return video_response(get_stream(stream_id), max_fps, rendition)
+
+@app.get("/streams/{stream_id}/pipeline")
+def get_stream_pipeline_stats(stream_id: str):
+    return get_stream(stream_id).get_pipeline_stats()
+
+@app.websocket("/streams/{stream_id}/ws")
+async def stream_websocket_endpoint(websocket: WebSocket, stream_id: str, channels: Optional[str] = None):
+    if stream_id not in stream_manager.streams:
+        await websocket.close(code=1008)
+        return
+    await stream_manager.get(stream_id).add_websocket(websocket, parse_channels(channels))
+
+@app.websocket("/streams/{stream_id}/tracks")
+async def stream_tracks_websocket_endpoint(websocket: WebSocket, stream_id: str, max_fps: Optional[float] = None):
+    if stream_id not in stream_manager.streams:
+        await websocket.close(code=1008)
+        return
+    await stream_manager.get(stream_id).add_track_websocket(websocket, max_fps)
+
+@app.post("/streams/{stream_id}/stream-url")
+def update_stream_source(stream_id: str, settings: StreamSettings):
+    get_stream(stream_id).update_stream_url(settings.url)
+    return {"status": "updated", "id": stream_id, "url": settings.url}
+
+@app.post("/streams/{stream_id}/overlay")
+def update_stream_overlay_mode(stream_id: str, settings: OverlaySettings):
+    try:
+        get_stream(stream_id).set_overlay_mode(settings.mode)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "updated", "id": stream_id, "mode": settings.mode}
+
+@app.get("/streams/{stream_id}/calibration")
+def get_stream_calibration(stream_id: str):
+    return get_stream(stream_id).calibration
+
+@app.post("/streams/{stream_id}/calibration")
+def update_stream_calibration(stream_id: str, settings: CalibrationSettings):
+    # Each camera has its own height, tilt and FOV
+    get_stream(stream_id)
+    stream_manager.set_calibration(stream_id, settings)
+    return {"status": "saved", "id": stream_id, "settings": settings}
+
+@app.post("/streams/{stream_id}/roi")
+def update_stream_roi(stream_id: str, settings: RoiSettings):
+    get_stream(stream_id).set_roi(settings.points)
+    return {"status": "saved", "id": stream_id, "points": settings.points}
+
+@app.post("/streams/{stream_id}/seek")
+def seek_stream(stream_id: str, settings: SeekSettings):
+    get_stream(stream_id).seek(settings.seconds)
+    return {"status": "seeked", "id": stream_id, "seconds": settings.seconds}
+
+@app.post("/streams/{stream_id}/settings")
+def update_stream_settings(stream_id: str, settings: TrackerSettings):
+    try:
+        get_stream(stream_id).analyzer.update_settings(settings.dict())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "updated", "settings": settings}
+
+class InferenceBudget(BaseModel):
+    target_fps: Optional[float] = None  # analyzed frames per second, 0 = unlimited
+    priority: Optional[float] = None  # share of the detector relative to other streams
+
+@app.get("/scheduler")
+def get_scheduler_stats():
+    # Achieved fps and drop counts per stream, for sizing hardware per site
+    if stream_manager.scheduler is None:
+        return {}
+    return stream_manager.scheduler.get_stats()
+
+@app.post("/streams/{stream_id}/budget")
+def update_stream_budget(stream_id: str, budget: InferenceBudget):
+    get_stream(stream_id)
+    try:
+        stream_manager.set_budget(stream_id, budget.target_fps, budget.priority, save=True)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "updated", "id": stream_id, "inference": stream_manager.get_inference_stats(stream_id)}
@@ -0,0 +1,208 @@
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+
+@dataclass
+class FramePacket:
+    """A frame travelling through the streaming pipeline"""
+    seq: int
+    frame: Any
+    captured_at: float
+    analyze: bool = False  # also sent to the inference stage (don't draw on it in place)
+    annotated: Any = None
+
+
+class DropOldestQueue:
+    """Bounded FIFO that discards the oldest item instead of blocking the producer"""
+
+    def __init__(self, maxsize: int = 2):
+        self.maxsize = max(1, maxsize)
+        self._items = deque()
+        self._cond = threading.Condition()
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout: Optional[float] = None):
+        """Pop the oldest item, or return None if nothing arrived within timeout"""
+        with self._cond:
+            if not self._items:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            return self._items.popleft()
+
+    def clear(self):
+        with self._cond:
+            self._items.clear()
+
+    def qsize(self) -> int:
+        return len(self._items)
+
+
+class StageStats:
+    """Rolling latency / throughput counters for one pipeline stage"""
+
+    def __init__(self, smoothing: float = 0.1):
+        self.smoothing = smoothing
+        self.processed = 0
+        self.last_latency = 0.0
+        self.avg_latency = 0.0
+        self.fps = 0.0
+        self._last_done = None
+
+    def record(self, latency: float, count: int = 1):
+        """Record `count` items finished together in `latency` seconds (per-item latency)"""
+        now = time.perf_counter()
+        self.processed += count
+        self.last_latency = latency
+        if self.processed == 1:
+            self.avg_latency = latency
+        else:
+            self.avg_latency += self.smoothing * (latency - self.avg_latency)
+
+        if self._last_done is not None:
+            dt = now - self._last_done
+            if dt > 0:
+                self.fps += self.smoothing * (count / dt - self.fps)
+        self._last_done = now
+
+    def to_dict(self) -> dict:
+        return {
+            "processed": self.processed,
+            "latency_ms": round(self.last_latency * 1000, 2),
+            "avg_latency_ms": round(self.avg_latency * 1000, 2),
+            "fps": round(self.fps, 1),
+        }
+
+
+class PipelineStage:
+    """
+    Worker thread that pulls items from a bounded drop-oldest queue,
+    runs `handler` on them and forwards non-None results downstream.
+    """
+
+    def __init__(self, name: str, handler: Callable, maxsize: int = 2,
+                 output: Optional["PipelineStage"] = None):
+        self.name = name
+        self.handler = handler
+        self.output = output
+        self.queue = DropOldestQueue(maxsize)
+        self.stats = StageStats()
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name=f"stage-{self.name}", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout: float = 2.0):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=timeout)
+            self.thread = None
+        self.queue.clear()
+
+    def submit(self, item):
+        self.queue.put(item)
+
+    def _run(self):
+        while self.running:
+            item = self.queue.get(timeout=0.1)
+            if item is None:
+                continue
+
+            start = time.perf_counter()
+            try:
+                result = self.handler(item)
+            except Exception as e:
+                print(f"Pipeline stage '{self.name}' error: {e}")
+                continue
+            self.stats.record(time.perf_counter() - start)
+
+            if result is not None and self.output is not None:
+                self.output.submit(result)
+
+    def get_stats(self) -> dict:
+        stats = self.stats.to_dict()
+        stats.update({
+            "queue_depth": self.queue.qsize(),
+            "queue_capacity": self.queue.maxsize,
+            "dropped": self.queue.dropped,
+        })
+        return stats
+
+
+class MicroBatchStage(PipelineStage):
+    """
+    PipelineStage that hands `handler` a list of up to `max_batch` items.
+
+    A batch is closed when it is full or `max_wait` seconds after its first
+    item arrived, whichever comes first, so batching never adds more than
+    max_wait of latency when frames arrive slowly.
+    """
+
+    def __init__(self, name: str, handler: Callable, max_batch: int = 4, max_wait: float = 0.02,
+                 maxsize: int = 2, output: Optional[PipelineStage] = None):
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait
+        # The queue must be able to hold a full batch
+        super().__init__(name, handler, maxsize=max(maxsize, self.max_batch), output=output)
+        self.avg_batch_size = 0.0
+
+    def _collect(self):
+        first = self.queue.get(timeout=0.1)
+        if first is None:
+            return []
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch and self.running:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            item = self.queue.get(timeout=remaining)
+            if item is not None:
+                batch.append(item)
+        return batch
+
+    def _run(self):
+        while self.running:
+            batch = self._collect()
+            if not batch:
+                continue
+
+            start = time.perf_counter()
+            try:
+                result = self.handler(batch)
+            except Exception as e:
+                print(f"Pipeline stage '{self.name}' error: {e}")
+                continue
+            self.stats.record((time.perf_counter() - start) / len(batch), count=len(batch))
+            if self.avg_batch_size:
+                self.avg_batch_size += self.stats.smoothing * (len(batch) - self.avg_batch_size)
+            else:
+                self.avg_batch_size = float(len(batch))
+
+            if result is not None and self.output is not None:
+                self.output.submit(result)
+
+    def get_stats(self) -> dict:
+        stats = super().get_stats()
+        stats.update({
+            "max_batch": self.max_batch,
+            "max_wait_ms": round(self.max_wait * 1000, 1),
+            "avg_batch_size": round(self.avg_batch_size, 2),
+        })
+        return stats
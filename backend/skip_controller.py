@@ -0,0 +1,86 @@
+import math
+
+class AdaptiveSkipController:
+    """
+    Picks how many source frames to skip between analyzed frames from the
+    measured analysis latency.
+
+    The inference thread may be busy at most `cpu_budget` of the time, so the
+    achievable processing rate is cpu_budget / latency. The processing rate is
+    min(target_fps, achievable) and the skip ratio follows from the source FPS.
+    The ratio moves one step per adjustment so a single slow frame doesn't
+    make it oscillate.
+    """
+
+    def __init__(self, target_fps: float = 5.0, cpu_budget: float = 0.8,
+                 min_skip: int = 0, max_skip: int = 10, initial_skip: int = 2,
+                 smoothing: float = 0.2, cooldown: int = 5):
+        self.target_fps = target_fps
+        self.cpu_budget = cpu_budget
+        self.min_skip = min_skip
+        self.max_skip = max_skip
+        self.smoothing = smoothing
+        self.cooldown = cooldown
+
+        self.skip_frames = min(max(initial_skip, min_skip), max_skip)
+        self.avg_latency = None
+        self.avg_detect_latency = None
+        self._frames_since_change = 0
+
+    @classmethod
+    def from_config(cls, config: dict, initial_skip: int = 2):
+        settings = config.get("adaptive_skip", {})
+        return cls(
+            target_fps=settings.get("target_fps", 5.0),
+            cpu_budget=settings.get("cpu_budget", 0.8),
+            min_skip=settings.get("min_skip", 0),
+            max_skip=settings.get("max_skip", 10),
+            initial_skip=initial_skip
+        )
+
+    def _smooth(self, avg, value):
+        if avg is None:
+            return value
+        return avg + self.smoothing * (value - avg)
+
+    def desired_skip(self, source_fps: float) -> int:
+        """Skip ratio that fits the current latency estimate"""
+        if not self.avg_latency or source_fps <= 0:
+            return self.skip_frames
+
+        achievable_fps = self.cpu_budget / self.avg_latency
+        processing_fps = achievable_fps
+        if self.target_fps and self.target_fps > 0:
+            processing_fps = min(self.target_fps, achievable_fps)
+
+        skip = math.ceil(source_fps / processing_fps) - 1
+        return min(max(skip, self.min_skip), self.max_skip)
+
+    def update(self, process_latency: float, detect_latency: float, source_fps: float) -> int:
+        """
+        Record one analyzed frame and return the (possibly adjusted) skip ratio.
+
+        Args:
+            process_latency: seconds spent in UrbanFlowAnalyzer.analyze
+            detect_latency: seconds spent in detector.detect
+            source_fps: decode rate of the source
+        """
+        self.avg_latency = self._smooth(self.avg_latency, process_latency)
+        self.avg_detect_latency = self._smooth(self.avg_detect_latency, detect_latency)
+
+        self._frames_since_change += 1
+        if self._frames_since_change < self.cooldown:
+            return self.skip_frames
+
+        desired = self.desired_skip(source_fps)
+        if desired != self.skip_frames:
+            self.skip_frames += 1 if desired > self.skip_frames else -1
+            self._frames_since_change = 0
+        return self.skip_frames
+
+    def get_stats(self) -> dict:
+        return {
+            "skip_frames": self.skip_frames,
+            "avg_process_ms": round((self.avg_latency or 0.0) * 1000, 2),
+            "avg_detect_ms": round((self.avg_detect_latency or 0.0) * 1000, 2),
+        }
@@ -0,0 +1,156 @@
+import asyncio
+import json
+import threading
+from typing import Iterable, Optional
+
+CHANNELS = ("stats", "tracks")
+_MISSING = object()
+
+class _Client:
+    """One WebSocket: its channels and a bounded send queue"""
+
+    def __init__(self, websocket, channels, queue_size: int):
+        self.websocket = websocket
+        self.channels = set(channels)
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.stats_version = 0  # last stats version this client has applied
+        self.resync = True  # next stats message must be the full snapshot
+
+    def offer(self, item):
+        """Queue a (channel, version, message); drops the oldest message when full"""
+        if self.queue.full():
+            channel = self.queue.get_nowait()[0]
+            self.dropped += 1
+            if channel == "stats":
+                # A lost delta can't be patched up by later ones
+                self.resync = True
+        self.queue.put_nowait(item)
+
+
+class StatsHub:
+    """
+    Event-driven fan-out of analytics to the stats WebSockets.
+
+    publish_stats() is called by the thread that finished a frame. Only keys
+    whose value changed are sent (a delta, tagged with a version), and nothing
+    is sent if nothing changed. Each message is serialized once and queued to
+    every subscribed client on the event loop (via loop.call_soon_threadsafe).
+    Every client has its own bounded queue and sender task, so a slow client
+    only ever loses its own oldest messages; after losing a delta it gets the
+    full snapshot instead.
+
+    Channels:
+        stats: counters and pipeline figures, {"channel", "version", "full", "data"}
+        tracks: per-track ids, positions, boxes and speeds of each analyzed frame,
+                only built while a client subscribes to it
+    """
+
+    def __init__(self, queue_size: int = 8):
+        self.loop = None
+        self.queue_size = queue_size
+        self.clients = set()
+        self._lock = threading.Lock()
+        self._stats = {}
+        self._version = 0
+        self._snapshot = (0, None)  # (version, serialized full stats)
+
+    def wants(self, channel: str) -> bool:
+        """True if any client is subscribed to channel (skip building its payload otherwise)"""
+        return any(channel in client.channels for client in list(self.clients))
+
+    def publish_stats(self, stats: dict):
+        """Send the keys of stats that changed since the last call (thread-safe)"""
+        with self._lock:
+            delta = {key: value for key, value in stats.items() if self._stats.get(key, _MISSING) != value}
+            if not delta:
+                return
+            self._stats.update(delta)
+            self._version += 1
+            if self.clients:
+                # Dispatched under the lock so deltas reach the loop in version order
+                message = json.dumps({"channel": "stats", "version": self._version, "full": False, "data": delta})
+                self._dispatch("stats", self._version, message)
+
+    def publish_tracks(self, seq: int, tracks: dict):
+        """Send one analyzed frame's tracks to the "tracks" subscribers (thread-safe)"""
+        if self.wants("tracks"):
+            self._dispatch("tracks", seq, json.dumps({"channel": "tracks", "seq": seq, "data": tracks}))
+
+    def _dispatch(self, channel: str, version, message: str):
+        loop = self.loop
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(self._fanout, channel, version, message)
+            except RuntimeError:
+                # Event loop already closed (shutdown)
+                self.loop = None
+
+    def _fanout(self, channel: str, version, message: str):
+        # Runs on the event loop: never awaits, so no client can hold up the others
+        for client in list(self.clients):
+            if channel in client.channels:
+                client.offer((channel, version, message))
+
+    def _snapshot_message(self):
+        """Full stats as (version, message), serialized once per version"""
+        with self._lock:
+            version, message = self._snapshot
+            if version != self._version:
+                version = self._version
+                message = json.dumps({"channel": "stats", "version": version, "full": True, "data": self._stats})
+                self._snapshot = (version, message)
+        return version, message
+
+    async def _send_loop(self, client: _Client):
+        while True:
+            channel, version, message = await client.queue.get()
+            if channel == "stats":
+                if client.resync:
+                    client.resync = False
+                    version, message = self._snapshot_message()
+                # Deltas already covered by a snapshot are skipped
+                if version <= client.stats_version:
+                    continue
+                client.stats_version = version
+            await client.websocket.send_text(message)
+
+    async def serve(self, websocket, channels: Optional[Iterable[str]] = None):
+        """
+        Run one stats WebSocket until it disconnects.
+
+        Args:
+            channels: initial subscriptions (default: stats). The client can send
+                      {"subscribe": [...]} or {"unsubscribe": [...]} later.
+        """
+        await websocket.accept()
+        if self.loop is None:
+            self.loop = asyncio.get_running_loop()
+        channels = [c for c in (channels or ["stats"]) if c in CHANNELS]
+        client = _Client(websocket, channels, self.queue_size)
+        self.clients.add(client)
+        if "stats" in client.channels:
+            client.offer(("stats", 0, None))  # initial snapshot
+        sender = asyncio.create_task(self._send_loop(client))
+        try:
+            while not sender.done():
+                text = await websocket.receive_text()
+                try:
+                    request = json.loads(text)
+                except ValueError:
+                    continue  # keep-alive or other plain text
+                if not isinstance(request, dict):
+                    continue
+                for channel in request.get("subscribe", []):
+                    if channel in CHANNELS and channel not in client.channels:
+                        client.channels.add(channel)
+                        if channel == "stats":
+                            client.resync = True
+                            client.offer(("stats", 0, None))
+                for channel in request.get("unsubscribe", []):
+                    client.channels.discard(channel)
+        except Exception:
+            pass
+        finally:
+            self.clients.discard(client)
+            sender.cancel()
@@ -0,0 +1,200 @@
+import json
+import re
+import threading
+from functools import partial
+from typing import Dict, List
+from detector_handle import DetectorHandle
+from detector_pool import DetectorPool, create_detector
+from inference_scheduler import InferenceScheduler
+from streamer import Streamer
+
+CONFIG_PATH = "roi_config.json"
+STREAM_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+class StreamManager:
+    """
+    Owns every camera pipeline of the backend, by stream id.
+
+    All streams share one detector, so the model weights are loaded once per
+    process however many feeds run: with detector_workers == 0 the streams
+    detect through a common InferenceScheduler that batches their frames
+    together and shares it fairly (per-stream inference_budget: target_fps,
+    priority), with detector_workers > 0 they share one DetectorPool, each on
+    its own result channel. Capture, motion, tracking and encoding stay per
+    stream.
+
+    "default" is the top-level config (and the legacy un-prefixed endpoints);
+    other streams live in config["streams"][id] and override top-level keys.
+    """
+
+    def __init__(self, config: dict = None):
+        if config is None:
+            config = self._load_config_file()
+
+        # One detector for every stream; detector settings are always top-level
+        detector_type = config.get("detection_model", "mediapipe")
+        detector_settings = config.get(f"{detector_type}_settings", {})
+        self.detector_workers = config.get("detector_workers", 0)
+        self.detector_handle = DetectorHandle(partial(create_detector, workers=self.detector_workers),
+                                              detector_type, detector_settings)
+        self.scheduler = None
+        if self.detector_workers == 0:
+            # A pool already spreads frames over workers; in-process detectors need a scheduler
+            shared = config.get("shared_inference", {})
+            self.scheduler = InferenceScheduler(self.detector_handle,
+                                                max_batch=shared.get("max_batch", 4),
+                                                max_wait=shared.get("max_wait_ms", 10) / 1000.0,
+                                                max_age=shared.get("max_frame_age_ms", 250) / 1000.0)
+
+        self.streams: Dict[str, Streamer] = {}
+        self._lock = threading.Lock()
+        self.add_stream("default", config=config)
+        for stream_id in config.get("streams", {}):
+            self.add_stream(stream_id, config=config)
+
+    @staticmethod
+    def _load_config_file() -> dict:
+        try:
+            with open(CONFIG_PATH, "r") as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Error loading config: {e}")
+            return {}
+
+    @staticmethod
+    def _save_stream_config(stream_id: str, stream_config: dict = None):
+        """Write (or with None, delete) config["streams"][stream_id]"""
+        try:
+            with open(CONFIG_PATH, "r") as f:
+                data = json.load(f)
+            streams = data.setdefault("streams", {})
+            if stream_config is None:
+                streams.pop(stream_id, None)
+            else:
+                streams[stream_id] = stream_config
+            with open(CONFIG_PATH, "w") as f:
+                json.dump(data, f, indent=4)
+        except Exception as e:
+            print(f"Error saving stream config: {e}")
+
+    def get(self, stream_id: str) -> Streamer:
+        """Streamer of a stream; KeyError if there is none"""
+        return self.streams[stream_id]
+
+    def add_stream(self, stream_id: str, video_url: str = None, config: dict = None,
+                   start: bool = False, save: bool = False) -> Streamer:
+        """
+        Create a stream pipeline sharing the common detector.
+
+        Args:
+            video_url: source of the stream (else config["streams"][id]["video_url"])
+            config: parsed config, read from disk if None
+            start: start capturing right away
+            save: persist the stream in roi_config.json
+        """
+        if not STREAM_ID_PATTERN.match(stream_id):
+            raise ValueError(f"Invalid stream id: {stream_id}")
+        with self._lock:
+            if stream_id in self.streams:
+                raise ValueError(f"Stream already exists: {stream_id}")
+            if config is None:
+                config = self._load_config_file()
+            if video_url:
+                config.setdefault("streams", {}).setdefault(stream_id, {})["video_url"] = video_url
+            streamer = Streamer(stream_id, config, detector_handle=self.detector_handle,
+                                scheduler=self.scheduler)
+            self.streams[stream_id] = streamer
+
+        if save:
+            self._save_stream_config(stream_id, config.get("streams", {}).get(stream_id, {}))
+        if start:
+            streamer.start_stream()
+        print(f"Stream added: {stream_id}")
+        return streamer
+
+    def remove_stream(self, stream_id: str, save: bool = True):
+        """Stop and drop a stream (the default stream always stays)"""
+        if stream_id == "default":
+            raise ValueError("The default stream cannot be removed")
+        with self._lock:
+            streamer = self.streams.pop(stream_id)
+        streamer.stop_stream()
+        if streamer.analyzer.scheduler is not None:
+            # Leave the shared scheduler
+            streamer.analyzer.scheduler.close()
+        else:
+            # Frames it left on the shared pools would keep them from ever being closed
+            for detector in [self.detector_handle.detector] + list(self.detector_handle.retired):
+                if isinstance(detector, DetectorPool):
+                    detector.discard_channel(stream_id)
+        if save:
+            self._save_stream_config(stream_id, None)
+        print(f"Stream removed: {stream_id}")
+
+    def list_streams(self) -> List[dict]:
+        return [{
+            "id": stream_id,
+            "url": streamer.current_url,
+            "running": streamer.running,
+            "stats": streamer.current_stats,
+            "inference": self.get_inference_stats(stream_id)
+        } for stream_id, streamer in list(self.streams.items())]
+
+    def get_inference_stats(self, stream_id: str) -> dict:
+        """Achieved detection fps, latency and drop counts of a stream's scheduler share"""
+        if self.scheduler is None:
+            return {}
+        return self.scheduler.get_stats()["streams"].get(stream_id, {})
+
+    def set_budget(self, stream_id: str, target_fps: float = None, priority: float = None, save: bool = False):
+        """Change a stream's inference budget (None keeps the current value)"""
+        if self.scheduler is None:
+            raise ValueError("Inference budgets need detector_workers = 0 (shared scheduler)")
+        self.get(stream_id)
+        self.scheduler.set_budget(stream_id, target_fps, priority)
+        if save:
+            budget = {key: value for key, value in (("target_fps", target_fps), ("priority", priority))
+                      if value is not None}
+            try:
+                with open(CONFIG_PATH, "r") as f:
+                    data = json.load(f)
+                if stream_id == "default":
+                    data.setdefault("inference_budget", {}).update(budget)
+                else:
+                    data.setdefault("streams", {}).setdefault(stream_id, {}).setdefault(
+                        "inference_budget", {}).update(budget)
+                with open(CONFIG_PATH, "w") as f:
+                    json.dump(data, f, indent=4)
+            except Exception as e:
+                print(f"Error saving inference budget: {e}")
+
+    def start_all(self):
+        for streamer in list(self.streams.values()):
+            streamer.start_stream()
+
+    def stop_all(self):
+        for streamer in list(self.streams.values()):
+            streamer.stop_stream()
+        if self.scheduler is not None:
+            self.scheduler.close()
+        else:
+            self.detector_handle.close()
+
+    def set_detector(self, detector_type: str, settings: dict = None) -> str:
+        """Switch the detector shared by every stream (see DetectorHandle.set_detector)"""
+        return self.detector_handle.set_detector(detector_type, settings)
+
+    def set_calibration(self, stream_id: str, calib):
+        """
+        Calibrate one stream's camera. The default stream's calibration is also
+        the fallback of streams that have none of their own.
+        """
+        self.get(stream_id).set_calibration(calib)
+        if stream_id == "default":
+            for streamer in list(self.streams.values()):
+                if streamer.stream_id != "default" and not streamer.own_calibration:
+                    streamer.calibration = calib
+                    streamer.analyzer.apply_calibration(calib)
+
+# Global Instance
+stream_manager = StreamManager()
@@ -4,31 +4,119 @@ import json
 import time
 from fastapi.responses import StreamingResponse
 from analyzer import UrbanFlowAnalyzer
+from calibration import CalibrationSettings, load_calibration, save_calibration
 from capture_frame import get_stream_url, VIDEO_URL
+from pipeline import FramePacket, MicroBatchStage, PipelineStage, StageStats
+from frame_hub import FrameHub
+from jpeg_encoder import RenditionEncoder
+from stats_hub import StatsHub
+from track_frames import pack_track_frame
+from frame_context import FrameBufferPool
+from skip_controller import AdaptiveSkipController
+
+# "server" draws tracks into the JPEG, "client" streams the raw frame and the
+# browser draws from the /tracks frames (drawing becomes a debug option)
+OVERLAY_MODES = ("server", "client")
+
+def stream_config(config: dict, stream_id: str) -> dict:
+    """Settings of one stream: the top-level config overridden by config["streams"][stream_id]"""
+    merged = {key: value for key, value in config.items() if key != "streams"}
+    merged.update(config.get("streams", {}).get(stream_id, {}))
+    return merged
 
 class Streamer:
-    def __init__(self):
+    def __init__(self, stream_id: str = "default", config: dict = None,
+                 detector_handle=None, scheduler=None):
+        """
+        One camera feed: capture, inference and encode pipeline.
+        
+        Args:
+            stream_id: name of the stream ("default" is the top-level config)
+            config: parsed roi_config.json, loaded from disk if None
+            detector_handle: detector shared with other streams (see StreamManager)
+            scheduler: InferenceScheduler shared with other streams; the stream registers
+                       with its inference_budget (target_fps, priority)
+        """
+        self.stream_id = stream_id
         # Load config first to get model settings
-        config = self._load_config_file()
+        if config is None:
+            config = self._load_config_file()
+        # Camera geometry is never inherited from the default stream
+        own_config = config if stream_id == "default" else config.get("streams", {}).get(stream_id, {})
+        config = stream_config(config, stream_id)
+        if scheduler is not None:
+            # Fair share of the shared detector; frames over target_fps are dropped
+            budget = config.get("inference_budget", {})
+            scheduler = scheduler.register(stream_id, target_fps=budget.get("target_fps", 0),
+                                           priority=budget.get("priority", 1.0))
         
         # Initialize analyzer with configured model
         detector_type = config.get("detection_model", "mediapipe")
         detector_settings = config.get(f"{detector_type}_settings", {})
-        self.analyzer = UrbanFlowAnalyzer(detector_type, detector_settings)
+        # detector_workers > 0 moves detection into worker processes (see detector_pool.py)
+        self.analyzer = UrbanFlowAnalyzer(detector_type, detector_settings,
+                                          config.get("motion_settings", {}),
+                                          detector_workers=config.get("detector_workers", 0),
+                                          detector_handle=detector_handle, scheduler=scheduler,
+                                          stream_id=stream_id)
+        # Per-camera calibration (height, tilt, FOV) and ROI; streams without their own
+        # calibration use the default stream's calibration_config.json
+        self.own_calibration = "calibration" in own_config
+        self.calibration = (CalibrationSettings(**own_config["calibration"]) if self.own_calibration
+                            else load_calibration())
+        self.analyzer.apply_calibration(self.calibration)
+        if own_config.get("roi_points"):
+            self.analyzer.update_roi(own_config["roi_points"])
+        # Calibration grid overlay; turn off in production to save drawing time
+        self.analyzer.show_grid = config.get("show_grid", True)
+        self.overlay_mode = config.get("overlay_mode", "server")
+        if self.overlay_mode not in OVERLAY_MODES:
+            print(f"Unknown overlay_mode {self.overlay_mode}, using server")
+            self.overlay_mode = "server"
+        # Capture time of analyzed frames by seq, for the track frame timestamps
+        self._capture_times = {}
         
-        self.active_websockets = []
+        # Stats WebSockets: pushed when a frame changes them (see StatsHub)
+        self.stats_hub = StatsHub(queue_size=config.get("stats_queue_size", 8))
         self.current_stats = {}
+        # Binary track frames for client-side overlays (latest frame only, see track_frames.py)
+        self.track_hub = FrameHub()
         
         # Singleton Capture State
         self.current_url = config.get("video_url", "https://www.youtube.com/watch?v=u4UZ4UvZXrg")
         self.cap = None
         self.running = False
         self.lock = asyncio.Lock()
-        self.new_frame_event = asyncio.Event()
-        self.latest_jpeg = None
+        # /video_feed renditions (full/preview/thumbnail), each encoded only while watched
+        self.video = RenditionEncoder.from_config(config)
         
         # Configuration
         self.skip_frames = config.get("skip_frames", 2)
+        # "fixed" uses skip_frames as-is, "adaptive" tunes it from measured latency
+        self.skip_mode = config.get("skip_mode", "fixed")
+        self.skip_controller = AdaptiveSkipController.from_config(config, self.skip_frames)
+        
+        # Staged pipeline: the decoder (capture thread) sends every frame to the
+        # annotate/encode stage and every (skip_frames + 1)-th frame to inference.
+        # Stages are connected by bounded queues that drop the oldest frame,
+        # so a slow detector never stalls the decoder or the video feed.
+        queue_size = config.get("pipeline_queue_size", 2)
+        self.decode_stats = StageStats()
+        self.encode_pool = FrameBufferPool(depth=1)  # encode stage only
+        self.encode_stage = PipelineStage("encode", self._encode_frame, maxsize=queue_size)
+        # inference_batch.max_batch > 1 groups analyzed frames into one detector call,
+        # waiting at most max_wait_ms for a batch to fill
+        batch_config = config.get("inference_batch", {})
+        max_batch = batch_config.get("max_batch", 1)
+        if max_batch > 1:
+            self.inference_stage = MicroBatchStage("inference", self._infer_batch, max_batch=max_batch,
+                                                   max_wait=batch_config.get("max_wait_ms", 20) / 1000.0,
+                                                   maxsize=queue_size)
+        else:
+            self.inference_stage = PipelineStage("inference", self._infer_frame, maxsize=queue_size)
+        # With a detector pool the inference stage only submits frames; the
+        # track thread takes results back in frame order and runs the tracker
+        self.track_stats = StageStats()
 
     def _load_config_file(self):
         """Load configuration from file"""
@@ -41,60 +129,96 @@ class Streamer:
 
     def load_config(self):
         """Reload configuration"""
-        config = self._load_config_file()
+        config = stream_config(self._load_config_file(), self.stream_id)
         self.skip_frames = config.get("skip_frames", 2)
+        self.skip_mode = config.get("skip_mode", "fixed")
+        self.skip_controller = AdaptiveSkipController.from_config(config, self.skip_frames)
         if "video_url" in config and config["video_url"]:
             self.current_url = config["video_url"]
 
-    async def add_websocket(self, websocket):
+    async def add_websocket(self, websocket, channels=None):
+        """Serve a stats WebSocket (channels: "stats", "tracks") until it disconnects"""
+        await self.stats_hub.serve(websocket, channels)
+
+    async def add_track_websocket(self, websocket, max_fps=None):
+        """Send every analyzed frame's tracks as a binary track frame until the client leaves"""
         await websocket.accept()
-        self.active_websockets.append(websocket)
+        frames = self.track_hub.subscribe(max_fps)
         try:
-            while True:
-                await websocket.receive_text()
-        except:
-            if websocket in self.active_websockets:
-                self.active_websockets.remove(websocket)
-
-    async def broadcast_stats(self):
-        if not self.active_websockets:
-            return
-            
-        message = json.dumps(self.current_stats)
-        to_remove = []
-        for ws in self.active_websockets:
-            try:
-                await ws.send_text(message)
-            except:
-                to_remove.append(ws)
-        
-        for ws in to_remove:
-            self.active_websockets.remove(ws)
+            async for payload in frames:
+                await websocket.send_bytes(payload)
+        except Exception:
+            pass
+        finally:
+            await frames.aclose()
 
     def start_stream(self):
         if self.running:
             return
         self.running = True
-        # Run the blocking capture loop in a separate thread
+        # Downstream workers first so the decoder never feeds a dead stage
+        self.encode_stage.start()
+        self.inference_stage.start()
         import threading
+        if self.analyzer.detector_workers > 0:
+            self.track_thread = threading.Thread(target=self._track_loop, daemon=True)
+            self.track_thread.start()
+        # Run the blocking capture loop in a separate thread
         self.capture_thread = threading.Thread(target=self._capture_loop, daemon=True)
         self.capture_thread.start()
         print("Streamer background thread started.")
 
-    def update_stream_url(self, new_url):
-        print(f"Updating stream URL to: {new_url}")
-        self.current_url = new_url
+    def stop_stream(self):
         self.running = False # Stop current loop
         if hasattr(self, 'capture_thread'):
             self.capture_thread.join(timeout=2.0)
+        self.inference_stage.stop()
+        if getattr(self, 'track_thread', None) is not None:
+            self.track_thread.join(timeout=2.0)
+            self.track_thread = None
+        self.encode_stage.stop()
+
+    def update_stream_url(self, new_url):
+        print(f"Updating stream URL to: {new_url}")
+        self.current_url = new_url
+        self.stop_stream()
         
         self.start_stream() # Restart with new URL
         
-        # Save to config
+        self._save_setting("video_url", new_url)
+
+    def set_overlay_mode(self, mode: str):
+        """Switch between server-drawn and client-drawn overlays (takes effect on the next frame)"""
+        if mode not in OVERLAY_MODES:
+            raise ValueError(f"Unknown overlay mode: {mode}")
+        self.overlay_mode = mode
+        self._save_setting("overlay_mode", mode)
+
+    def set_calibration(self, calib: CalibrationSettings):
+        """Apply and save this stream's camera calibration (calibration_config.json for the default stream)"""
+        # New camera params invalidate the projector and the cached ground grid
+        self.analyzer.apply_calibration(calib)
+        self.calibration = calib
+        if self.stream_id == "default":
+            save_calibration(calib)
+        else:
+            self.own_calibration = True
+            self._save_setting("calibration", calib.dict())
+
+    def set_roi(self, points):
+        """Apply and save this stream's ROI polygon (points in percent of the frame)"""
+        self.analyzer.update_roi(points)
+        self._save_setting("roi_points", points)
+
+    def _save_setting(self, key, value):
+        """Save a setting of this stream (top level for the default stream)"""
         try:
             with open("roi_config.json", "r") as f:
                 data = json.load(f)
-            data["video_url"] = new_url
+            if self.stream_id == "default":
+                data[key] = value
+            else:
+                data.setdefault("streams", {}).setdefault(self.stream_id, {})[key] = value
             with open("roi_config.json", "w") as f:
                 json.dump(data, f, indent=4)
         except:
@@ -115,8 +239,29 @@ class Streamer:
                 print(f"Seek error: {e}")
 
 
+    def get_pipeline_stats(self):
+        """Queue depth and per-stage latency for each pipeline stage"""
+        decode = self.decode_stats.to_dict()
+        decode.update({"queue_depth": 0, "queue_capacity": 0, "dropped": 0})
+        stats = {
+            "decode": decode,
+            "inference": self.inference_stage.get_stats(),
+            "encode": self.encode_stage.get_stats(),
+        }
+        stats["encode"]["overlay_mode"] = self.overlay_mode
+        stats["encode"]["jpeg_encoder"] = self.video.encoder.backend
+        stats["encode"]["renditions"] = self.video.get_stats()
+        if self.analyzer.detector_workers > 0:
+            stats["track"] = self.track_stats.to_dict()
+            stats["detector_pool"] = self.analyzer.detector.get_stats()
+        if self.analyzer.scheduler is not None:
+            # This stream's share of the detector, and the shared totals
+            stats["scheduler"] = self.analyzer.scheduler.get_stats()
+        return stats
+
     def _capture_loop(self):
-        print(f"Starting capture loop for {self.current_url}")
+        """Decode stage: drains the source in real time and feeds the inference queue"""
+        print(f"[{self.stream_id}] Starting capture loop for {self.current_url}")
         
         # 1. Get Stream URL (Blocking network call)
         try:
@@ -128,8 +273,18 @@ class Streamer:
             return
 
         frame_count = 0
+        last_analyzed = 0
+        
+        # Pace file/VOD sources to their native rate; live sources block in read()
+        # so the deadline simply never makes us sleep.
+        source_fps = self.cap.get(cv2.CAP_PROP_FPS)
+        frame_interval = 1.0 / source_fps if 0 < source_fps <= 120 else 0.0
+        if frame_interval:
+            self.analyzer.source_fps = source_fps
+        next_deadline = time.perf_counter()
         
         while self.running and self.cap.isOpened():
+            read_start = time.perf_counter()
             success, frame = self.cap.read()
             if not success:
                 print("Frame read failed, attempting reconnect...")
@@ -139,62 +294,133 @@ class Streamer:
                     self.cap = cv2.VideoCapture(get_stream_url(self.current_url))
                 except:
                     pass
+                next_deadline = time.perf_counter()
                 continue
+            self.decode_stats.record(time.perf_counter() - read_start)
 
             frame_count += 1
             
             # --- Frame Skipping Logic ---
-            if frame_count % (self.skip_frames + 1) != 0:
-                # Still update the jpeg for fluid video, but SKIP processing?
-                # Actually, if we skip processing, we should verify if we want to show the RAW frame or the last processed frame.
-                # Use raw frame for smoothness usually, but overlays might lag.
-                # Let's process every Nth frame, and for others just overlay the LAST known stats/boxes?
-                # For now: SIMPLEST implementation: Just skip the loop entirely (video FPS drops).
-                # User asked for "Optimization (Skip frames)" separately.
-                # Better approach for smooth video + low CPU:
-                # 1. Always encode/broadcast the frame for video.
-                # 2. Only run `analyzer.process_frame` every N frames.
-                
-                # Check previous frame stats to re-draw? 
-                # Analyzer handles state, but drawing happens IN process_frame.
-                # Modifying analyzer to separate drawing is risky right now.
-                # FALLBACK: Just continue (skip this frame entirely).
-                continue
-            
-            # --- Processing ---
-            annotated_frame, state = self.analyzer.process_frame(frame)
-            
-            # Update Stats
-            self.current_stats = {
-                "total_in": state.total_in,
-                "total_out": state.total_out,
-                "currently_tracked": state.currently_tracked
-            }
+            # Every frame is annotated and encoded for fluid video; only every
+            # (skip_frames + 1)-th frame runs detection. Skipped frames are drawn
+            # with the tracks extrapolated from the last analyzed frame.
+            packet = FramePacket(frame_count, frame, time.time())
+            if frame_count - last_analyzed > self.skip_frames:
+                last_analyzed = frame_count
+                packet.analyze = True
+                self._capture_times[frame_count] = packet.captured_at
+                self.inference_stage.submit(packet)
+            self.encode_stage.submit(packet)
             
-            # Encode
-            ret, buffer = cv2.imencode('.jpg', annotated_frame)
-            if ret:
-                self.latest_jpeg = buffer.tobytes()
-                # Notify async consumers
-                # In a thread, we can't await asyncio.Event directly for the main loop?
-                # Actually, generate_frames is async generator? No, it's usually sync generator in FastAPI.
-                # Standard pattern: usage of sleep or Event.
-                pass
+            if frame_interval:
+                next_deadline += frame_interval
+                delay = next_deadline - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                elif delay < -frame_interval:
+                    # Fell behind (slow network); don't try to catch up in a burst
+                    next_deadline = time.perf_counter()
         
         self.cap.release()
         print("Capture loop ended.")
 
-    async def frame_generator(self):
-        while True:
-            if self.latest_jpeg:
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + self.latest_jpeg + b'\r\n')
-                await asyncio.sleep(1.0 / 20) # Limit broadcast FPS to ~20 to save bandwidth
+    def _infer_frame(self, packet):
+        """Inference stage: detection and tracking"""
+        if self.analyzer.detector_workers > 0:
+            # Detector pool: motion estimation here, detection in a worker, tracking in _track_loop
+            self.analyzer.submit_frame(packet.frame, packet.seq)
+            return None
+        
+        state = self.analyzer.analyze(packet.frame, packet.seq)
+        if state is not None:
+            self._publish_state(state, self.inference_stage.stats.fps)
+        return None
+
+    def _infer_batch(self, packets):
+        """Inference stage with micro-batching: one detector call for several frames"""
+        if self.analyzer.detector_workers > 0:
+            for packet in packets:
+                self.analyzer.submit_frame(packet.frame, packet.seq)
+            return None
+        
+        state = self.analyzer.analyze_batch([p.frame for p in packets], [p.seq for p in packets])
+        if state is not None:
+            self._publish_state(state, self.inference_stage.stats.fps)
+        return None
+
+    def _track_loop(self):
+        """Detector pool only: track detection results in frame order as workers return them"""
+        while self.running:
+            state = self.analyzer.collect_frame(timeout=0.1)
+            if state is None:
+                continue
+            self.track_stats.record(self.analyzer.last_track_latency)
+            self._publish_state(state, self.track_stats.fps)
+
+    def _publish_state(self, state, processing_fps):
+        """Adaptive skip update and stats for one analyzed frame"""
+        if self.skip_mode == "adaptive":
+            source_fps = self.decode_stats.fps or self.analyzer.source_fps
+            self.skip_frames = self.skip_controller.update(
+                self.analyzer.last_process_latency,
+                self.analyzer.last_detect_latency,
+                source_fps
+            )
+        
+        # Update Stats
+        self.current_stats = {
+            "total_in": state.total_in,
+            "total_out": state.total_out,
+            "currently_tracked": state.currently_tracked,
+            "skip_frames": self.skip_frames,
+            "skip_mode": self.skip_mode,
+            "processing_fps": round(processing_fps, 1)
+        }
+        self.stats_hub.publish_stats(self.current_stats)
+        
+        # Per-track payloads, only built while someone subscribes to them
+        render_state = self.analyzer.render_state
+        if render_state is not None:
+            # Frames up to this one are done (or were dropped)
+            captured_at = self._capture_times.pop(render_state.seq, None)
+            for seq in [s for s in list(self._capture_times) if s < render_state.seq]:
+                self._capture_times.pop(seq, None)
+        if render_state is not None and self.track_hub.clients:
+            self.track_hub.publish_raw(pack_track_frame(render_state, self.analyzer.projector, captured_at))
+        if render_state is not None and self.stats_hub.wants("tracks"):
+            self.stats_hub.publish_tracks(render_state.seq, {
+                "ids": render_state.ids.tolist(),
+                "centroids": render_state.centroids.astype(int).tolist(),
+                "bboxes": render_state.bboxes.astype(int).tolist(),
+                "speeds": [round(speed, 1) for speed in render_state.speeds.tolist()]
+            })
+
+    def _encode_frame(self, packet):
+        """Annotate/encode stage: draw the latest tracks and JPEG-encode for the MJPEG feed"""
+        if not self.video.clients:
+            # Nobody watches the MJPEG feed; skip drawing and encoding altogether
+            return None
+        
+        if self.overlay_mode == "server":
+            # Frames only this stage sees are drawn in place; frames shared with the
+            # inference stage are copied into a reused canvas instead of a new array
+            if packet.analyze:
+                canvas = self.encode_pool.get("canvas", packet.frame.shape)
             else:
-                await asyncio.sleep(0.1)
+                canvas = packet.frame
+            packet.annotated = self.analyzer.render(packet.frame, seq=packet.seq, canvas=canvas)
+        else:
+            # Client overlays: the raw frame, annotations go out as track frames
+            packet.annotated = packet.frame
+        # Encoded once per watched rendition, shared by its /video_feed clients;
+        # seq/timestamp align it with /tracks
+        self.video.publish(packet.annotated, packet.seq, packet.captured_at)
+        return None
 
-# Global Instance
-streamer_instance = Streamer()
+    def frame_generator(self, max_fps=None, rendition=None):
+        """MJPEG chunks of a rendition (default: full); KeyError for an unknown one"""
+        target = self.video.get(rendition) if rendition else self.video.default
+        return target.hub.subscribe(max_fps)
 
-def get_video_stream():
-    return StreamingResponse(streamer_instance.frame_generator(), media_type="multipart/x-mixed-replace; boundary=frame")
+    def get_video_stream(self, max_fps=None, rendition=None):
+        return StreamingResponse(self.frame_generator(max_fps, rendition), media_type="multipart/x-mixed-replace; boundary=frame")
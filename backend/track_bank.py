@@ -0,0 +1,235 @@
+import numpy as np
+
+# Constant-velocity Kalman model shared by every track: state (x, y, vx, vy), measurement (x, y)
+TRANSITION = np.array([[1, 0, 1, 0], [0, 1, 0, 1], [0, 0, 1, 0], [0, 0, 0, 1]], np.float32)
+
+# Process noise: assume objects can change velocity reasonably fast
+PROCESS_NOISE = np.diag(np.array([0.1, 0.1, 0.2, 2.0], np.float32)) * 0.05
+
+# Measurement noise: detectors are usually pretty accurate, but can jitter
+MEASUREMENT_NOISE = np.diag(np.array([0.5, 0.5], np.float32)) * 0.1
+
+def unroll_history(history, head, offset):
+    """
+    Turn ring-buffer trails into pixel coordinates, oldest first.
+
+    Args:
+        history: (n, H, 2) ring buffers in camera-compensated coordinates
+        head: (n,) next write position of each ring
+        offset: cumulative camera shift to add back
+
+    Returns:
+        (n, H, 2) int32 array, right-aligned (the newest point is [:, -1])
+    """
+    size = history.shape[1]
+    order = (head[:, None] + np.arange(size)[None, :]) % size
+    ordered = np.take_along_axis(history, order[:, :, None], axis=1)
+    return (ordered + np.asarray(offset, np.float32)).astype(np.int32)
+
+class TrackBank:
+    """
+    Structure-of-arrays storage for every live track.
+
+    Row i of each array belongs to the same track; rows [0, len) are live.
+    Kalman predict/correct, camera-shift compensation and speed smoothing run
+    as a handful of vectorized operations over all rows instead of one
+    cv2.KalmanFilter per object. Removing tracks compacts the arrays, so row
+    indices are only stable until the next update.
+
+    Trails and speed samples live in fixed-size ring buffers. Trail points are
+    stored relative to the cumulative camera shift (`camera_offset`), so a
+    camera pan only updates that offset instead of rewriting every point; it
+    is added back when a trail is read.
+    """
+
+    HISTORY_LENGTH = 50
+    SPEED_HISTORY_LENGTH = 10
+
+    def __init__(self, capacity: int = 64):
+        self.size = 0
+        self.camera_offset = np.zeros(2, np.float64)
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        self.capacity = capacity
+        self.ids = np.zeros(capacity, np.int64)
+        self.state = np.zeros((capacity, 4), np.float32)        # x, y, vx, vy (posterior)
+        self.covariance = np.zeros((capacity, 4, 4), np.float32)
+        self.bboxes = np.zeros((capacity, 4), np.float32)       # x1, y1, x2, y2
+        self.disappeared = np.zeros(capacity, np.int32)
+        self.age = np.zeros(capacity, np.int32)
+        self.speed = np.zeros(capacity, np.float32)             # smoothed km/h
+        # Rolling speed window (ring buffer); unused slots stay 0 so the sum is the window sum
+        self.speed_history = np.zeros((capacity, self.SPEED_HISTORY_LENGTH), np.float32)
+        self.speed_head = np.zeros(capacity, np.int32)
+        self.speed_count = np.zeros(capacity, np.int32)
+        # Trail ring buffer in camera-compensated coordinates; history_head is the next write slot
+        self.history = np.zeros((capacity, self.HISTORY_LENGTH, 2), np.float32)
+        self.history_head = np.zeros(capacity, np.int32)
+        self.history_length = np.zeros(capacity, np.int32)
+
+    _ARRAYS = ("ids", "state", "covariance", "bboxes", "disappeared", "age", "speed",
+               "speed_history", "speed_head", "speed_count",
+               "history", "history_head", "history_length")
+
+    def _grow(self, needed):
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        old = {name: getattr(self, name) for name in self._ARRAYS}
+        self._allocate(capacity)
+        for name, array in old.items():
+            getattr(self, name)[:self.size] = array[:self.size]
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def centroids(self):
+        return self.state[:self.size, :2]
+
+    @property
+    def velocities(self):
+        return self.state[:self.size, 2:]
+
+    def add(self, ids, centroids, bboxes):
+        """Append new tracks with zero velocity and zero covariance"""
+        count = len(ids)
+        if count == 0:
+            return
+        if self.size + count > self.capacity:
+            self._grow(self.size + count)
+
+        rows = slice(self.size, self.size + count)
+        centroids = np.asarray(centroids, np.float32).reshape(-1, 2)
+        self.ids[rows] = ids
+        self.state[rows, :2] = centroids
+        self.state[rows, 2:] = 0
+        self.covariance[rows] = 0
+        self.bboxes[rows] = np.asarray(bboxes, np.float32).reshape(-1, 4)
+        self.disappeared[rows] = 0
+        self.age[rows] = 0
+        self.speed[rows] = 0
+        self.speed_history[rows] = 0
+        self.speed_head[rows] = 0
+        self.speed_count[rows] = 0
+        self.history[rows, 0] = centroids - self.camera_offset
+        self.history_head[rows] = 1
+        self.history_length[rows] = 1
+        self.size += count
+
+    def remove(self, mask):
+        """Drop the rows where mask is True, keeping the others in order"""
+        keep = ~np.asarray(mask, bool)
+        kept = int(keep.sum())
+        if kept == self.size:
+            return
+        for name in self._ARRAYS:
+            array = getattr(self, name)
+            array[:kept] = array[:self.size][keep]
+        self.size = kept
+
+    def shift(self, dx, dy):
+        """Move every track by the camera shift (trails follow through camera_offset)"""
+        if dx == 0 and dy == 0:
+            return
+        self.camera_offset += (dx, dy)
+        self.state[:self.size, :2] += np.array([dx, dy], np.float32)
+
+    def predict(self):
+        """Kalman predict for all tracks; appends the prediction to each trail"""
+        n = self.size
+        if n == 0:
+            return
+        self.state[:n] = self.state[:n] @ TRANSITION.T
+        self.covariance[:n] = TRANSITION @ self.covariance[:n] @ TRANSITION.T + PROCESS_NOISE
+
+        head = self.history_head[:n]
+        self.history[np.arange(n), head] = self.state[:n, :2] - self.camera_offset
+        self.history_head[:n] = (head + 1) % self.HISTORY_LENGTH
+        np.minimum(self.history_length[:n] + 1, self.HISTORY_LENGTH, out=self.history_length[:n])
+
+    def correct(self, rows, measurements, bboxes):
+        """Kalman correct for the matched rows with (k, 2) centroid measurements"""
+        if len(rows) == 0:
+            return
+        z = np.asarray(measurements, np.float32).reshape(-1, 2)
+        P = self.covariance[rows]
+
+        # H selects (x, y), so H P H^T is the top-left block and P H^T the first two columns
+        S = P[:, :2, :2] + MEASUREMENT_NOISE
+        K = P[:, :, :2] @ np.linalg.inv(S)
+        innovation = z - self.state[rows, :2]
+
+        self.state[rows] += (K @ innovation[:, :, None])[:, :, 0]
+        self.covariance[rows] = P - K @ P[:, :2, :]
+
+        self.bboxes[rows] = np.asarray(bboxes, np.float32).reshape(-1, 4)
+        self.disappeared[rows] = 0
+        self.age[rows] += 1
+        # Latest trail point becomes the smoothed position
+        last = (self.history_head[rows] - 1) % self.HISTORY_LENGTH
+        self.history[rows, last] = self.state[rows, :2] - self.camera_offset
+
+    def push_speeds(self, rows, speeds):
+        """Add speed samples for matched rows and refresh their rolling mean"""
+        if len(rows) == 0:
+            return
+        head = self.speed_head[rows]
+        self.speed_history[rows, head] = speeds
+        self.speed_head[rows] = (head + 1) % self.SPEED_HISTORY_LENGTH
+        self.speed_count[rows] = np.minimum(self.speed_count[rows] + 1, self.SPEED_HISTORY_LENGTH)
+        self.speed[rows] = self.speed_history[rows].sum(axis=1) / self.speed_count[rows]
+
+    def trail(self, row):
+        """Trail of one track in current pixel coordinates as an (L, 2) array, oldest first"""
+        length = self.history_length[row]
+        order = (self.history_head[row] - length + np.arange(length)) % self.HISTORY_LENGTH
+        return self.history[row, order] + self.camera_offset.astype(np.float32)
+
+    def items(self):
+        """(obj_id, TrackView) pairs, for code that expects the old objects dict"""
+        for row in range(self.size):
+            yield int(self.ids[row]), TrackView(self, row)
+
+    def values(self):
+        return [view for _, view in self.items()]
+
+    def keys(self):
+        return [int(i) for i in self.ids[:self.size]]
+
+class TrackView:
+    """Read-only view of one TrackBank row, valid until the next tracker update"""
+
+    def __init__(self, bank, row):
+        self.bank = bank
+        self.row = row
+        self.obj_id = int(bank.ids[row])
+
+    @property
+    def centroid(self):
+        return self.bank.state[self.row, :2].copy()
+
+    @property
+    def velocity(self):
+        return self.bank.state[self.row, 2:].copy()
+
+    @property
+    def bbox(self):
+        return tuple(int(v) for v in self.bank.bboxes[self.row])
+
+    @property
+    def history(self):
+        return self.bank.trail(self.row)
+
+    @property
+    def current_speed(self):
+        return float(self.bank.speed[self.row])
+
+    @property
+    def disappeared_count(self):
+        return int(self.bank.disappeared[self.row])
+
+    @property
+    def age(self):
+        return int(self.bank.age[self.row])
@@ -0,0 +1,87 @@
+"""
+Binary track frames for the /tracks WebSocket (one message per analyzed frame).
+
+Little-endian. A 32-byte header:
+    magic       4s   b"MILT"
+    version     u8   TRACK_FRAME_VERSION
+    flags       u8   reserved (0)
+    record_size u16  bytes per track record (skip unknown trailing fields)
+    seq         u32  source frame number of the snapshot
+    count       u32  number of records
+    timestamp   f64  capture time (seconds since epoch) of the analyzed frame,
+                     matching the X-Timestamp of its MJPEG part
+    width       u16  analyzed frame width (pixels)
+    height      u16  analyzed frame height
+    frame_step  u16  source frames between the last two analyzed frames
+    reserved    u16
+
+followed by `count` fixed-width TRACK_RECORD records:
+    id          u32
+    bbox        4 x i16  x1, y1, x2, y2 (pixels)
+    centroid    2 x i16  Kalman position (pixels)
+    velocity    2 x f32  pixels per analyzed frame (extrapolate with / frame_step)
+    ground      2 x f32  ground-plane x, z in meters (NaN if above the horizon)
+    speed       f32      km/h
+"""
+
+import struct
+import time
+import numpy as np
+
+TRACK_FRAME_MAGIC = b"MILT"
+TRACK_FRAME_VERSION = 1
+TRACK_FRAME_HEADER = struct.Struct("<4sBBHIIdHHHH")
+TRACK_RECORD = np.dtype([
+    ("id", "<u4"),
+    ("bbox", "<i2", (4,)),
+    ("centroid", "<i2", (2,)),
+    ("velocity", "<f4", (2,)),
+    ("ground", "<f4", (2,)),
+    ("speed", "<f4"),
+])
+
+def pack_track_frame(render_state, projector=None, timestamp: float = None) -> bytes:
+    """
+    Pack a RenderState into a binary track frame, straight from its arrays.
+
+    Args:
+        render_state: tracker snapshot from UrbanFlowAnalyzer
+        projector: CameraProjector for ground positions (NaN without one)
+        timestamp: capture time of the analyzed frame (default: now)
+    """
+    n = len(render_state.ids)
+    width, height = render_state.frame_size
+    records = np.empty(n, dtype=TRACK_RECORD)
+    if n:
+        records["id"] = render_state.ids
+        records["bbox"] = np.clip(render_state.bboxes, -32768, 32767)
+        records["centroid"] = np.clip(render_state.centroids, -32768, 32767)
+        records["velocity"] = render_state.velocities
+        records["speed"] = render_state.speeds
+        records["ground"] = np.nan
+        if projector is not None and width:
+            ground, valid = projector.pixels_to_ground(render_state.centroids, width, height)
+            records["ground"][valid] = ground[valid]
+
+    header = TRACK_FRAME_HEADER.pack(TRACK_FRAME_MAGIC, TRACK_FRAME_VERSION, 0, TRACK_RECORD.itemsize,
+                                     render_state.seq & 0xFFFFFFFF, n,
+                                     time.time() if timestamp is None else timestamp,
+                                     min(width, 0xFFFF), min(height, 0xFFFF),
+                                     min(render_state.frame_step, 0xFFFF), 0)
+    return header + records.tobytes()
+
+def unpack_track_frame(payload: bytes):
+    """Inverse of pack_track_frame: (header dict, TRACK_RECORD array)"""
+    (magic, version, flags, record_size, seq, count, timestamp,
+     width, height, frame_step, _) = TRACK_FRAME_HEADER.unpack_from(payload)
+    if magic != TRACK_FRAME_MAGIC:
+        raise ValueError("Not a track frame")
+    if record_size < TRACK_RECORD.itemsize:
+        raise ValueError(f"Unsupported track frame version {version}")
+    header = {"version": version, "flags": flags, "seq": seq, "timestamp": timestamp,
+              "width": width, "height": height, "frame_step": frame_step}
+    # Later versions may append fields to each record; read only the known ones
+    rows = np.frombuffer(payload, dtype=np.uint8, count=count * record_size,
+                         offset=TRACK_FRAME_HEADER.size).reshape(count, record_size)
+    records = rows[:, :TRACK_RECORD.itemsize].copy().view(TRACK_RECORD).reshape(count)
+    return header, records
@@ -1,9 +1,10 @@
 from scipy.spatial import distance as dist
 from collections import OrderedDict
 import numpy as np
+from association import associate
 
 class CentroidTracker:
-    def __init__(self, maxDisappeared=40, maxDistance=50):
+    def __init__(self, maxDisappeared=40, maxDistance=50, association="greedy"):
         # Initialize the next unique object ID along with two ordered
         # dictionaries used to keep track of mapping a given object
         # ID to its centroid and number of consecutive frames it has
@@ -20,6 +21,9 @@ class CentroidTracker:
         # Max distance between centroids to associate
         self.maxDistance = maxDistance
 
+        # Matching backend: "greedy" or "hungarian" (see association.py)
+        self.association = association
+
     def register(self, centroid):
         # when registering an object we use the next available object
         # ID to store the centroid
@@ -82,17 +86,10 @@ class CentroidTracker:
             # object centroid
             D = dist.cdist(np.array(objectCentroids), inputCentroids)
 
-            # in order to perform this matching we must (1) find the
-            # smallest value in each row and then (2) sort the row
-            # indexes based on their minimum values so that the row
-            # with the smallest value is at the *front* of the index
-            # list
-            rows = D.min(axis=1).argsort()
-
-            # next, we perform a similar process on the columns by
-            # finding the smallest value in each column and then
-            # sorting using the previously computed row index list
-            cols = D.argmin(axis=1)[rows]
+            # match rows (objects) to columns (inputs) with the
+            # configured association backend -- pairs further apart
+            # than the maximum distance are never associated
+            rows, cols = associate(D, self.maxDistance, self.association)
 
             # in order to determine if we need to update, register,
             # or deregister an object we need to keep track of which
@@ -100,23 +97,10 @@ class CentroidTracker:
             usedRows = set()
             usedCols = set()
 
-            # loop over the combination of the (row, column) index
-            # tuples
+            # loop over the matched (row, column) index tuples
             for (row, col) in zip(rows, cols):
-                # if we have already examined either the row or
-                # column value before, ignore it
-                # val = D[row][col]
-                if row in usedRows or col in usedCols:
-                    continue
-                
-                # if the distance between centroids is greater than
-                # the maximum distance, do not associate the two
-                if D[row][col] > self.maxDistance:
-                    continue
-
-                # otherwise, grab the object ID for the current row,
-                # set its new centroid, and reset the disappeared
-                # counter
+                # grab the object ID for the current row, set its new
+                # centroid, and reset the disappeared counter
                 objectID = objectIDs[row]
                 self.objects[objectID] = inputCentroids[col]
                 self.disappeared[objectID] = 0
@@ -1,238 +1,235 @@
-import cv2
 import numpy as np
-
-class TrackedObject:
-    def __init__(self, obj_id, centroid, bbox):
-        self.obj_id = obj_id
-        self.centroid = np.array(centroid, dtype=np.float32)
-        self.bbox = bbox  # (x1, y1, x2, y2)
-        self.history = [self.centroid]
-        self.disappeared_count = 0
-        self.age = 0
-        self.current_speed = 0.0
-        self.speed_history = []
-        
-        # Kalman Filter for smoothing (Optimized Parameters)
-        self.kalman = cv2.KalmanFilter(4, 2)
-        # Measurement matrix (we only measure x, y)
-        self.kalman.measurementMatrix = np.array([[1, 0, 0, 0], [0, 1, 0, 0]], np.float32)
-        # Transition matrix (constant velocity model)
-        self.kalman.transitionMatrix = np.array([[1, 0, 1, 0], [0, 1, 0, 1], [0, 0, 1, 0], [0, 0, 0, 1]], np.float32)
-        
-        # Process noise: assume objects can change velocity reasonably fast
-        self.kalman.processNoiseCov = np.array([
-            [0.1, 0, 0, 0], 
-            [0, 0.1, 0, 0], 
-            [0, 0, 0.2, 0], 
-            [0, 0, 0, 02.]
-        ], np.float32) * 0.05
-        
-        # Measurement noise: detectors are usually pretty accurate, but can jitter
-        self.kalman.measurementNoiseCov = np.array([
-            [0.5, 0],
-            [0, 0.5]
-        ], np.float32) * 0.1
-        
-        # Initial state
-        self.kalman.statePre = np.array([[centroid[0]], [centroid[1]], [0], [0]], np.float32)
-        self.kalman.statePost = np.array([[centroid[0]], [centroid[1]], [0], [0]], np.float32)
-
-    def predict(self):
-        prediction = self.kalman.predict()
-        self.centroid = np.array([prediction[0, 0], prediction[1, 0]], dtype=np.float32)
-        self.history.append(self.centroid)
-        if len(self.history) > 50: # Limit history length
-            self.history.pop(0)
-        return self.centroid
-
-    def update(self, measurement, bbox):
-        self.disappeared_count = 0
-        self.age += 1
-        self.bbox = bbox
-        mes = np.array([[np.float32(measurement[0])], [np.float32(measurement[1])]])
-        self.kalman.correct(mes)
-        
-        # Update centroid with corrected state (smoothed)
-        self.centroid = np.array([self.kalman.statePost[0, 0], self.kalman.statePost[1, 0]], dtype=np.float32)
-        # Update latest history point to the smoothed one
-        self.history[-1] = self.centroid
+from association import associate_sparse
+from track_bank import TrackBank
+from detector_base import DetectionBatch
+
+def _overlap(a, b, generalized=False):
+    """
+    IoU (or GIoU) of (..., 4) box arrays a and b, broadcast against each other.
+    Boxes are (x1, y1, x2, y2).
+    """
+    xi1 = np.maximum(a[..., 0], b[..., 0])
+    yi1 = np.maximum(a[..., 1], b[..., 1])
+    xi2 = np.minimum(a[..., 2], b[..., 2])
+    yi2 = np.minimum(a[..., 3], b[..., 3])
+    inter = np.clip(xi2 - xi1, 0, None) * np.clip(yi2 - yi1, 0, None)
+
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    union = area_a + area_b - inter
+    iou = np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+    if not generalized:
+        return iou
+
+    # Smallest enclosing box
+    xc1 = np.minimum(a[..., 0], b[..., 0])
+    yc1 = np.minimum(a[..., 1], b[..., 1])
+    xc2 = np.maximum(a[..., 2], b[..., 2])
+    yc2 = np.maximum(a[..., 3], b[..., 3])
+    enclose = (xc2 - xc1) * (yc2 - yc1)
+
+    penalty = np.divide(enclose - union, enclose, out=np.zeros_like(inter), where=enclose > 0)
+    return iou - penalty
+
+def _as_boxes(boxes):
+    return np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+
+def iou_matrix(boxes_a, boxes_b):
+    """
+    Pairwise IoU between two sets of (x1, y1, x2, y2) boxes.
+    boxes_a: (N, 4), boxes_b: (M, 4) -> (N, M) float32
+    """
+    # Broadcast (N, 1) against (1, M)
+    return _overlap(_as_boxes(boxes_a)[:, None], _as_boxes(boxes_b)[None, :])
+
+def giou_matrix(boxes_a, boxes_b):
+    """
+    Pairwise Generalized IoU (range -1..1) between two sets of (x1, y1, x2, y2) boxes.
+    Unlike IoU it keeps decreasing as non-overlapping boxes move apart.
+    """
+    return _overlap(_as_boxes(boxes_a)[:, None], _as_boxes(boxes_b)[None, :], generalized=True)
+
+def iou_pairs(boxes_a, boxes_b, generalized=False):
+    """IoU (or GIoU) of boxes_a[i] with boxes_b[i]: (K, 4), (K, 4) -> (K,) float32"""
+    return _overlap(_as_boxes(boxes_a), _as_boxes(boxes_b), generalized)
 
 class AdvancedTracker:
-    def __init__(self, max_disappeared=40, max_distance=100):
+    def __init__(self, max_disappeared=40, max_distance=100, iou_metric="iou", association="greedy"):
         self.next_obj_id = 0
-        self.objects = {}  # id -> TrackedObject
+        self.bank = TrackBank()  # all track state, one row per object
         self.max_disappeared = max_disappeared
         self.max_distance = max_distance
-
-    def register(self, centroid, bbox):
-        self.objects[self.next_obj_id] = TrackedObject(self.next_obj_id, centroid, bbox)
-        self.next_obj_id += 1
+        self.iou_metric = iou_metric  # "iou" or "giou"
+        self.association = association  # "greedy" or "hungarian"
+        # Gate on the combined cost from _dist_matrix: 1.0 is a pair max_distance
+        # pixels apart with no box overlap
+        self.max_cost = 1.0
+
+    @property
+    def objects(self):
+        """id -> TrackView mapping of the live tracks"""
+        return dict(self.bank.items())
+
+    def register(self, centroids, bboxes):
+        count = len(centroids)
+        ids = np.arange(self.next_obj_id, self.next_obj_id + count)
+        self.bank.add(ids, centroids, bboxes)
+        self.next_obj_id += count
 
     def deregister(self, obj_id):
-        del self.objects[obj_id]
-
-        return self.objects
+        self.bank.remove(self.bank.ids[:len(self.bank)] == obj_id)
 
     def update(self, detections, camera_shift=(0, 0), projector=None, frame_width=1280, frame_height=720, fps=30):
         """
         updates track with new detections.
-        detections: list of tuples (centroid, bbox)
+        detections: DetectionBatch, or list of tuples (centroid, bbox)
             centroid: (x, y)
             bbox: (x1, y1, x2, y2) normalized 0-1
         camera_shift: (dx, dy) how much the background moved since last frame
         projector: CameraProjector instance for 3D projection
+        
+        Returns the TrackBank (supports len() and .items() like the old objects dict)
         """
+        bank = self.bank
         
         # 1. Predict new positions for existing objects
-        # Compensation: shift existing tracks by the camera movement
-        for obj_id, obj in self.objects.items():
-            # Apply camera compensation to the state BEFORE prediction
-            # If scene moved by (dx, dy), the object should also move by (dx, dy) 
-            # effectively keeping it 'still' relative to the world, but moving in pixel coords
-            
-            # Update history to shift with camera
-            obj.history = [(h[0] + camera_shift[0], h[1] + camera_shift[1]) for h in obj.history]
-            
-            # Shift centroid and Kalman state
-            shift_matrix = np.array([[camera_shift[0]], [camera_shift[1]], [0], [0]], np.float32)
-            obj.kalman.statePost += shift_matrix
-            
-            obj.predict()
-            obj.disappeared_count += 1
+        # Compensation: shift existing tracks by the camera movement BEFORE prediction.
+        # If scene moved by (dx, dy), the object should also move by (dx, dy)
+        # effectively keeping it 'still' relative to the world, but moving in pixel coords
+        bank.shift(camera_shift[0], camera_shift[1])
+        bank.predict()
+        bank.disappeared[:len(bank)] += 1
+        
+        # Decay speed if not updated
+        bank.speed[:len(bank)] *= 0.95
+
+        if len(detections) > 0:
+            # 2. Match detections to existing objects
+            if isinstance(detections, DetectionBatch):
+                input_centroids = detections.centers.astype(np.float32)
+                input_bboxes = detections.xyxy
+            else:
+                input_centroids = np.array([d[0] for d in detections], dtype=np.float32)
+                input_bboxes = np.array([d[1] for d in detections], dtype=np.float32)
             
-            # Decay speed if not updated
-            obj.current_speed = getattr(obj, 'current_speed', 0) * 0.95
-
-        if len(detections) == 0:
-            # If no detections, mark all as disappeared
-            for obj_id in list(self.objects.keys()):
-                if self.objects[obj_id].disappeared_count > self.max_disappeared:
-                    self.deregister(obj_id)
-            return self.objects
-
-        # 2. Match detections to existing objects
-        input_centroids = np.array([d[0] for d in detections])
+            if len(bank) == 0:
+                self.register(input_centroids, input_bboxes)
+            else:
+                # Robust cost (Euclidean + IoU), only for pairs close enough to match
+                pair_rows, pair_cols, costs = self._pair_costs(bank.centroids, bank.bboxes[:len(bank)],
+                                                               input_centroids, input_bboxes)
+
+                # Gated assignment (greedy or Hungarian, see association.py)
+                rows, cols = associate_sparse(pair_rows, pair_cols, costs, (len(bank), len(detections)),
+                                              self.max_cost, self.association)
+
+                # --- SPEED CALCULATION ---
+                # The prediction step (above) shifted the old centroid by `camera_shift`, so
+                # the predicted centroid is where the object would be in the CURRENT frame
+                # coordinates if it didn't move in the world. The difference to the new
+                # detection is the motion of the object RELATIVE TO THE GROUND.
+                speeds = self._ground_speeds(bank.centroids[rows], input_centroids[cols],
+                                             projector, frame_width, frame_height, fps)
+                bank.push_speeds(rows, speeds)
+
+                bank.correct(rows, input_centroids[cols], input_bboxes[cols])
+
+                # Register new objects
+                unused = np.ones(len(detections), bool)
+                unused[cols] = False
+                self.register(input_centroids[unused], input_bboxes[unused])
+
+        # Deregister missing objects
+        bank.remove(bank.disappeared[:len(bank)] > self.max_disappeared)
+
+        return bank
+
+    def _ground_speeds(self, prev_centroids, new_centroids, projector, frame_width, frame_height, fps):
+        """Speed (km/h) of each matched pair between compensated previous and new centroids"""
+        speeds = np.zeros(len(new_centroids), np.float32)
         
-        if len(self.objects) == 0:
-            for i in range(len(detections)):
-                self.register(input_centroids[i], detections[i][1])
+        if projector and frame_width > 0:
+            # Project both point sets to the ground in one call each
+            # Point A: Estimated position if it stood still (Compensated Old Pos)
+            p1_ground, p1_valid = projector.pixels_to_ground(prev_centroids, frame_width, frame_height)
+            # Point B: Actual new position
+            p2_ground, p2_valid = projector.pixels_to_ground(new_centroids, frame_width, frame_height)
+            
+            # Distance in meters; Speed (m/s) = dist_m * FPS
+            dist_m = np.linalg.norm(p2_ground - p1_ground, axis=1)
+            speeds[:] = np.where(p1_valid & p2_valid, dist_m * fps * 3.6, 0.0)
         else:
-            object_ids = list(self.objects.keys())
-            object_centroids = np.array([obj.centroid for obj in self.objects.values()])
-
-            # Calculate robust distance matrix (Euclidean + IoU)
-            D = self._dist_matrix(object_centroids, object_bboxes, input_centroids, input_bboxes)
-
-            # hungarian algorithm like matching (simple greedy here based on sort)
-            rows = D.min(axis=1).argsort()
-            cols = D.argmin(axis=1)[rows]
-
-            used_rows = set()
-            used_cols = set()
-
-            for (row, col) in zip(rows, cols):
-                if row in used_rows or col in used_cols:
-                    continue
+            # Fallback to pixel speed estimation (rough)
+            # Rough scale: 100px ~ 1m? Very inaccurate without depth
+            speeds[:] = np.linalg.norm(new_centroids - prev_centroids, axis=1) * 0.1 # dummy scale
+        
+        return speeds
+    
+    def _candidate_pairs(self, object_centroids, input_centroids):
+        """
+        (rows, cols) of the track/detection pairs at most 2 * max_distance apart.
 
-                if D[row, col] > self.max_distance:
+        Farther pairs cost over max_cost whatever their overlap, so they are never
+        looked at: detections are bucketed into a grid of that cell size and each
+        track is only compared with the detections of its 3x3 neighbouring cells.
+        This keeps the per-track cost flat as the crowd grows instead of building
+        the full N x M matrix.
+        """
+        reach = 2.0 * self.max_distance
+        track_cells = np.floor(object_centroids / reach).astype(np.int64)
+        input_cells = np.floor(input_centroids / reach).astype(np.int64)
+        # Shift cells to >= 1 so neighbour keys never wrap into another row of the grid
+        origin = np.minimum(track_cells.min(axis=0), input_cells.min(axis=0)) - 1
+        track_cells -= origin
+        input_cells -= origin
+        width = max(track_cells[:, 0].max(), input_cells[:, 0].max()) + 2
+
+        input_keys = input_cells[:, 0] + input_cells[:, 1] * width
+        by_key = np.argsort(input_keys, kind="stable")
+        sorted_keys = input_keys[by_key]
+
+        rows, cols = [], []
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                keys = (track_cells[:, 0] + dx) + (track_cells[:, 1] + dy) * width
+                first = np.searchsorted(sorted_keys, keys, side="left")
+                counts = np.searchsorted(sorted_keys, keys, side="right") - first
+                total = counts.sum()
+                if not total:
                     continue
-
-                object_id = object_ids[row]
-                
-                # --- SPEED CALCULATION START ---
-                # We use the corrected centroid vs new input centroid, removing camera shift influence
-                # The 'prev_c' from the tracker is where the object WAS in the previous frame's coordinate system.
-                # 'new_c' is where it IS in the current frame's coordinate system.
-                # BUT, the camera itself moved. 'camera_shift' tells us how much the WORLD moved in the camera view (roughly).
-                # Actually, simpler logic:
-                # 1. Take previous centroid (before this frame update, but ALREADY COMPENSATED for camera move?)
-                # NO. The tracker prediction step (above) shifted the old centroid by `camera_shift`.
-                # So `self.objects[object_id].centroid` is now an ESTIMATE of where the object should be 
-                # in the CURRENT frame coordinates if it didn't move in the world.
-                # `new_c` is where it actually IS in the CURRENT frame coordinates.
-                # So the difference `new_c - obj.centroid` is the motion of the object RELATIVE TO THE GROUND (in pixels).
-                
-                prev_c_compensated = self.objects[object_id].centroid 
-                new_c = input_centroids[col]
-                
-                # Pixel vector
-                vec_px = new_c - prev_c_compensated
-                
-                real_speed_kmh = 0.0
-                
-                if projector and frame_width > 0:
-                    # Project both points to ground
-                    # Point A: Estimated position if it stood still (Compensated Old Pos)
-                    p1_ground = projector.pixel_to_ground(prev_c_compensated[0], prev_c_compensated[1], frame_width, frame_height)
-                    # Point B: Actual new position
-                    p2_ground = projector.pixel_to_ground(new_c[0], new_c[1], frame_width, frame_height)
-                    
-                    if p1_ground is not None and p2_ground is not None:
-                        # Distance in meters
-                        dx = p2_ground[0] - p1_ground[0]
-                        dz = p2_ground[1] - p1_ground[1]
-                        dist_m = np.sqrt(dx*dx + dz*dz)
-                        
-                        # Speed = Distance / Time
-                        # FPS is frames per second. 
-                        # Frame time = 1/FPS
-                        # Speed (m/s) = dist_m * FPS
-                        speed_mps = dist_m * fps
-                        real_speed_kmh = speed_mps * 3.6
-                else:
-                    # Fallback to pixel speed estimation (rough)
-                    pixel_speed = np.linalg.norm(vec_px)
-                    # Rough scale: 100px ~ 1m? Very inaccurate without depth
-                    real_speed_kmh = pixel_speed * 0.1 # dummy scale
-                
-                # Smooth speed using helpers (rolling average)
-                self.objects[object_id].speed_history.append(real_speed_kmh)
-                if len(self.objects[object_id].speed_history) > 10:
-                    self.objects[object_id].speed_history.pop(0)
-                
-                self.objects[object_id].current_speed = np.mean(self.objects[object_id].speed_history)
-                
-                # --- SPEED CALCULATION END ---
-
-                self.objects[object_id].update(input_centroids[col], detections[col][1])
-
-                used_rows.add(row)
-                used_cols.add(col)
-
-            # Register new objects
-            unused_cols = set(range(0, D.shape[1])).difference(used_cols)
-            for col in unused_cols:
-                self.register(input_centroids[col], detections[col][1])
-
-            # Deregister missing objects
-            for obj_id in list(self.objects.keys()):
-                 if self.objects[obj_id].disappeared_count > self.max_disappeared:
-                    self.deregister(obj_id)
-
-        return self.objects
-    
-    def _dist_matrix(self, object_centroids, object_bboxes, input_centroids, input_bboxes):
-        # Euclidean distance matrix
-        D_euc = np.linalg.norm(object_centroids[:, None, :] - input_centroids[None, :, :], axis=2)
+                # Expand each track's [first, first + count) range of detections
+                offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+                rows.append(np.repeat(np.arange(len(keys)), counts))
+                cols.append(by_key[np.repeat(first, counts) + offsets])
+        if not rows:
+            return np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp)
+        rows, cols = np.concatenate(rows), np.concatenate(cols)
+        # Neighbouring cells also hold detections up to 2 * reach away
+        near = np.sum((object_centroids[rows] - input_centroids[cols]) ** 2, axis=1) <= reach * reach
+        return rows[near], cols[near]
+
+    def _pair_costs(self, object_centroids, object_bboxes, input_centroids, input_bboxes):
+        """Combined cost from centroid distance and box overlap, for the candidate pairs only"""
+        rows, cols = self._candidate_pairs(object_centroids, input_centroids)
         
-        # IoU distance matrix (1.0 - IoU)
-        N = len(object_bboxes)
-        M = len(input_bboxes)
-        D_iou = np.zeros((N, M), dtype=np.float32)
+        # Euclidean distance of each pair
+        D_euc = np.linalg.norm(object_centroids[rows] - input_centroids[cols], axis=1)
         
-        for i in range(N):
-            for j in range(M):
-                D_iou[i, j] = 1.0 - self._calculate_iou(object_bboxes[i], input_bboxes[j])
+        # Overlap distance in 0..1: 1 - IoU, or (1 - GIoU) / 2
+        if self.iou_metric == "giou":
+            D_iou = (1.0 - iou_pairs(object_bboxes[rows], input_bboxes[cols], generalized=True)) * 0.5
+        else:
+            D_iou = 1.0 - iou_pairs(object_bboxes[rows], input_bboxes[cols])
         
         # Combined metric: weighted sum of Euclidean and IoU distance
         # Normalize Euclidean by max_distance to keep them in similar range
         D_euc_norm = D_euc / self.max_distance
         
         # If IoU is good, we strongly prefer it. If IoU is 0 (no overlap), Euclidean takes over.
-        return 0.5 * D_euc_norm + 0.5 * D_iou
+        return rows, cols, 0.5 * D_euc_norm + 0.5 * D_iou
 
     def _calculate_iou(self, bbox1, bbox2):
-        """Calculate Intersection over Union of two bounding boxes (x1, y1, x2, y2)"""
+        """Calculate Intersection over Union of two bounding boxes (x1, y1, x2, y2) (scalar reference)"""
         x1_1, y1_1, x2_1, y2_1 = bbox1
         x1_2, y1_2, x2_2, y2_2 = bbox2
         
@@ -1,6 +1,16 @@
 import requests
 import time
 
+def wait_for_model(url, timeout=60):
+    """The new model loads in the background; poll until it is swapped in"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        data = requests.get(url).json()
+        if data.get("status", {}).get("state") != "loading":
+            return data
+        time.sleep(0.5)
+    return requests.get(url).json()
+
 def test_switch():
     url = "http://localhost:8000/model"
     
@@ -26,8 +36,7 @@ def test_switch():
     print(f"Status: {r.status_code}, Response: {r.json()}")
 
     # Verify
-    r = requests.get(url)
-    print(f"Model after switch: {r.json()}")
+    print(f"Model after switch: {wait_for_model(url)}")
 
     # Switch back to MediaPipe
     print("\nSwitching to mediapipe...")
@@ -42,8 +51,7 @@ def test_switch():
     print(f"Status: {r.status_code}, Response: {r.json()}")
 
     # Verify
-    r = requests.get(url)
-    print(f"Model after switching back: {r.json()}")
+    print(f"Model after switching back: {wait_for_model(url)}")
 
 if __name__ == "__main__":
     test_switch()
@@ -2,6 +2,7 @@ import React, { useEffect, useState } from 'react';
 import DashboardOverlay from './components/DashboardOverlay';
 import MaskOverlay from './components/MaskOverlay';
 import PerspectiveOverlay from './components/PerspectiveOverlay';
+import TrackOverlay from './components/TrackOverlay';
 import VideoControls from './components/VideoControls';
 import './App.css';
 
@@ -9,6 +10,15 @@ function App() {
   const [stats, setStats] = useState({ total_in: 0, total_out: 0, currently_tracked: 0 });
   const [isConnected, setIsConnected] = useState(false);
   const [mode, setMode] = useState('LIVE'); // 'LIVE', 'MASK', 'CALIB'
+  // 'server' draws overlays into the video, 'client' draws them here from /tracks
+  const [overlayMode, setOverlayMode] = useState('server');
+
+  useEffect(() => {
+    fetch('http://localhost:8000/overlay')
+      .then(res => res.json())
+      .then(data => setOverlayMode(data.mode))
+      .catch(e => console.error(e));
+  }, []);
 
   // Centralized Tracker Settings State
   const [trackerSettings, setTrackerSettings] = useState({
@@ -83,7 +93,13 @@ function App() {
       const ws = new WebSocket('ws://localhost:8000/ws');
       ws.onopen = () => setIsConnected(true);
       ws.onmessage = (e) => {
-        try { setStats(JSON.parse(e.data)); } catch (err) { }
+        try {
+          // Stats arrive as deltas of the keys that changed; "full" resets them
+          const msg = JSON.parse(e.data);
+          if (msg.channel === 'stats') {
+            setStats(prev => msg.full ? msg.data : { ...prev, ...msg.data });
+          }
+        } catch (err) { }
       };
       ws.onclose = () => {
         setIsConnected(false);
@@ -111,6 +127,9 @@ function App() {
         />
       </div>
 
+      {/* Tracks drawn in the browser (overlay_mode "client") */}
+      <TrackOverlay isActive={overlayMode === 'client'} streamId="default" />
+
       {/* 2. Aesthetic Gradient Overlay */}
       <div className="gradient-overlay" />
 
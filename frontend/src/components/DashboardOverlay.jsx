@@ -26,6 +26,11 @@ export default function DashboardOverlay({ stats, settings, onSettingsChange, on
             confidence: 0.25,
             iou_threshold: 0.45,
             model_size: 'n'
+        },
+        onnx: {
+            confidence: 0.25,
+            iou_threshold: 0.45,
+            model_size: 'n'
         }
     });
 
@@ -133,7 +138,7 @@ export default function DashboardOverlay({ stats, settings, onSettingsChange, on
                         <div style={{ display: 'flex', flexDirection: 'column', gap: '1rem' }}>
                             {/* Model Selection */}
                             <div className="settings-group">
-                                <Tooltip text="Nesne algılama için kullanılacak model: MediaPipe (hızlı) veya YOLOv8 (daha doğru)">
+                                <Tooltip text="Nesne algılama için kullanılacak model: MediaPipe (hızlı), YOLOv8 (daha doğru) veya YOLOv8 ONNX (CPU'da daha hızlı YOLOv8)">
                                     <label className="settings-label">Detection Model</label>
                                 </Tooltip>
                                 <select
@@ -143,6 +148,7 @@ export default function DashboardOverlay({ stats, settings, onSettingsChange, on
                                 >
                                     <option value="mediapipe">MediaPipe (EfficientDet)</option>
                                     <option value="yolov8">YOLOv8</option>
+                                    <option value="onnx">YOLOv8 (ONNX Runtime)</option>
                                 </select>
                             </div>
 
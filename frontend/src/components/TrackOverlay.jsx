@@ -0,0 +1,130 @@
+import React, { useEffect, useRef } from 'react';
+import { decodeTrackFrame } from '../trackFrame';
+
+// Track frames kept for alignment (enough to cover the latency delay)
+const MAX_FRAMES = 16;
+// The lowest latency seen is forgotten after this many ms, so it follows the network
+const LATENCY_WINDOW = 5000;
+
+// Latest frame captured at or before `time` (seconds), else the oldest one
+const frameAt = (frames, time) => {
+    for (let i = frames.length - 1; i >= 0; i--) {
+        if (frames[i].timestamp <= time) return frames[i];
+    }
+    return frames[0];
+};
+
+// Client-side overlay: draws the /tracks binary frames over the raw video feed
+// (backend overlay_mode "client"), so the server no longer draws into the JPEG.
+//
+// The MJPEG <img> does not expose its X-Frame-Seq/X-Timestamp part headers, so
+// alignment is approximate: the video is assumed to run behind capture by the
+// lowest latency seen on the track frames (arrival - capture timestamp), and
+// tracks are drawn for that moment, moved along their Kalman velocity between
+// analyzed frames like the server-side renderer does.
+const TrackOverlay = ({ isActive, streamId = 'default' }) => {
+    const canvasRef = useRef(null);
+
+    useEffect(() => {
+        if (!isActive) return;
+        let ws;
+        let retry;
+        let animation;
+        let closed = false;
+        const frames = [];
+        let latency = null;
+        let latencySince = 0;
+        let frameInterval = 1 / 25; // seconds per source frame, measured from seq/timestamp
+
+        const receive = (frame) => {
+            const now = Date.now() / 1000;
+            const last = frames[frames.length - 1];
+            if (last && frame.seq > last.seq && frame.timestamp > last.timestamp) {
+                frameInterval = (frame.timestamp - last.timestamp) / (frame.seq - last.seq);
+            }
+            const measured = now - frame.timestamp;
+            if (latency === null || measured < latency || now * 1000 - latencySince > LATENCY_WINDOW) {
+                latency = measured;
+                latencySince = now * 1000;
+            }
+            frames.push(frame);
+            if (frames.length > MAX_FRAMES) frames.shift();
+        };
+
+        const draw = () => {
+            animation = requestAnimationFrame(draw);
+            const canvas = canvasRef.current;
+            if (!canvas || !frames.length) return;
+            // Capture time of the video frame on screen now
+            const shown = Date.now() / 1000 - latency;
+            const frame = frameAt(frames, shown);
+            if (!frame.width) return;
+
+            const cw = canvas.clientWidth;
+            const ch = canvas.clientHeight;
+            if (canvas.width !== cw || canvas.height !== ch) {
+                canvas.width = cw;
+                canvas.height = ch;
+            }
+
+            // Same mapping as the video's object-fit: cover
+            const scale = Math.max(cw / frame.width, ch / frame.height);
+            const ox = (cw - frame.width * scale) / 2;
+            const oy = (ch - frame.height * scale) / 2;
+
+            // Source frames since the analyzed one, capped like the server (2 analyzed steps)
+            const frameStep = frame.frameStep || 1;
+            const steps = Math.min(Math.max((shown - frame.timestamp) / frameInterval, 0), 2 * frameStep);
+
+            const ctx = canvas.getContext('2d');
+            ctx.clearRect(0, 0, cw, ch);
+            ctx.lineWidth = 2;
+            ctx.font = '12px monospace';
+            for (const t of frame.tracks) {
+                // Velocity is in pixels per analyzed frame
+                const dx = (t.velocity[0] * steps) / frameStep;
+                const dy = (t.velocity[1] * steps) / frameStep;
+                const [x1, y1, x2, y2] = t.bbox;
+                ctx.strokeStyle = '#00ff00';
+                ctx.strokeRect(ox + (x1 + dx) * scale, oy + (y1 + dy) * scale, (x2 - x1) * scale, (y2 - y1) * scale);
+
+                const cx = ox + (t.centroid[0] + dx) * scale;
+                const cy = oy + (t.centroid[1] + dy) * scale;
+                ctx.fillStyle = '#00ff00';
+                ctx.beginPath();
+                ctx.arc(cx, cy, 4, 0, 2 * Math.PI);
+                ctx.fill();
+                ctx.fillText(`ID: ${t.id}`, cx - 10, cy - 25);
+                ctx.fillStyle = '#ffff00';
+                ctx.fillText(`${t.speed.toFixed(1)} km/h`, cx - 20, cy - 10);
+            }
+        };
+
+        const connect = () => {
+            const path = streamId === 'default' ? '/tracks' : `/streams/${streamId}/tracks`;
+            ws = new WebSocket(`ws://localhost:8000${path}`);
+            ws.binaryType = 'arraybuffer';
+            ws.onmessage = (e) => {
+                const frame = decodeTrackFrame(e.data);
+                if (frame) receive(frame);
+            };
+            ws.onclose = () => {
+                if (!closed) retry = setTimeout(connect, 3000);
+            };
+        };
+        connect();
+        animation = requestAnimationFrame(draw);
+
+        return () => {
+            closed = true;
+            clearTimeout(retry);
+            cancelAnimationFrame(animation);
+            if (ws) ws.close();
+        };
+    }, [isActive, streamId]);
+
+    if (!isActive) return null;
+    return <canvas ref={canvasRef} className="track-overlay" />;
+};
+
+export default TrackOverlay;
@@ -0,0 +1,41 @@
+// Decoder for the binary track frames sent on /tracks (format in backend/track_frames.py)
+
+const MAGIC = 'MILT';
+const HEADER_SIZE = 32;
+
+export const decodeTrackFrame = (buffer) => {
+  const view = new DataView(buffer);
+  const magic = String.fromCharCode(
+    view.getUint8(0), view.getUint8(1), view.getUint8(2), view.getUint8(3)
+  );
+  if (magic !== MAGIC) return null;
+
+  const recordSize = view.getUint16(6, true);
+  const count = view.getUint32(12, true);
+  const frame = {
+    version: view.getUint8(4),
+    seq: view.getUint32(8, true),
+    timestamp: view.getFloat64(16, true),
+    width: view.getUint16(24, true),
+    height: view.getUint16(26, true),
+    frameStep: view.getUint16(28, true),
+    tracks: new Array(count),
+  };
+
+  // Fixed-width records; fields added by later versions are skipped via recordSize
+  for (let i = 0; i < count; i++) {
+    const o = HEADER_SIZE + i * recordSize;
+    frame.tracks[i] = {
+      id: view.getUint32(o, true),
+      bbox: [
+        view.getInt16(o + 4, true), view.getInt16(o + 6, true),
+        view.getInt16(o + 8, true), view.getInt16(o + 10, true),
+      ],
+      centroid: [view.getInt16(o + 12, true), view.getInt16(o + 14, true)],
+      velocity: [view.getFloat32(o + 16, true), view.getFloat32(o + 20, true)],
+      ground: [view.getFloat32(o + 24, true), view.getFloat32(o + 28, true)],
+      speed: view.getFloat32(o + 32, true),
+    };
+  }
+  return frame;
+};